@@ -0,0 +1,19 @@
+import json
+import os
+from typing import Any
+
+def write_atomic(path: str, data: bytes, mode: int = 0o666):
+    """
+    Replaces the file at path with data in one step, so readers see the old
+    or the new contents, never a partial write. ``mode`` (less the umask)
+    applies when the file is created.
+    """
+    tmp_path = path + ".tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def save_json(path: str, data: Any):
+    """Atomically writes data as indented JSON (see write_atomic())."""
+    write_atomic(path, json.dumps(data, indent=2).encode("utf-8"))
@@ -0,0 +1,172 @@
+import argparse
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+from atomic_file import save_json
+from browser_automator import add_har_arguments, configure_har, get_browser_automator
+from fixture_server import FixtureServer
+from metrics import metrics, percentile
+from overleaf_agent import OverleafAgent
+from research_agent import ResearchAgent
+from scan_glaciereq import scan_page
+
+OPERATIONS = ["search", "summarize", "scan", "overleaf"]
+
+def build_operations(base_url: str, pages: int) -> Dict[str, Callable[[int], Awaitable]]:
+    """One coroutine factory per agent operation, each pointed at the fixture server."""
+    browser_automator = get_browser_automator()
+    # No cache, and no fingerprints: fixture URLs must not reach the persistent cross-mission store.
+    research = ResearchAgent(cache=None, fingerprints=None, browser=browser_automator)
+    research.search_url = f"{base_url}/search?q={{query}}"
+    overleaf = OverleafAgent(browser=browser_automator)
+    overleaf.base_url = base_url
+    org_url = f"{base_url}/orgs/bench/repositories"
+
+    async def search(i: int):
+        async with browser_automator.acquire_page() as page:
+            results = await research.search_google(f"benchmark query {i}", page=page)
+        if not results:
+            raise RuntimeError("No search results")
+
+    async def summarize(i: int):
+        async with browser_automator.acquire_page() as page:
+            await research.summarize_page(f"{base_url}/article/{i}", page=page)
+
+    async def scan(i: int):
+        result = await scan_page(org_url, i % pages + 1)
+        if not result["repos"]:
+            raise RuntimeError("Empty listing page")
+
+    async def publish(i: int):
+        async with browser_automator.acquire_page() as page:
+            await overleaf.create_project(f"Benchmark {i}", page=page)
+            await overleaf.inject_latex(f"\\documentclass{{article}}\n\\begin{{document}}\nRun {i}\n\\end{{document}}\n",
+                                        page=page)
+            compiled = await overleaf.compile_pdf(timeout=60.0, page=page)
+        if compiled["status"] != "success":
+            raise RuntimeError(f"Compile status {compiled['status']}")
+
+    return {"search": search, "summarize": summarize, "scan": scan, "overleaf": publish}
+
+async def run_level(operation: Callable[[int], Awaitable], concurrency: int, iterations: int) -> Dict:
+    """Runs ``iterations`` calls with at most ``concurrency`` in flight; returns throughput and latency stats."""
+    slots = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def timed(i: int):
+        nonlocal errors
+        async with slots:
+            started = time.perf_counter()
+            try:
+                await operation(i)
+            except Exception:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(timed(i) for i in range(iterations)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "iterations": iterations,
+        "errors": errors,
+        "elapsed": round(elapsed, 3),
+        "ops_per_sec": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50": round(percentile(latencies, 0.50), 4),
+        "p95": round(percentile(latencies, 0.95), 4),
+    }
+
+async def run_benchmarks(operations: List[str], levels: List[int], iterations: int, server: FixtureServer,
+                         warmup: int = 2) -> List[Dict]:
+    """
+    Benchmarks each operation at each concurrency level against the fixture server.
+
+    The browser is launched (never attached to the daemon) with one pooled tab
+    per concurrent operation, and ``warmup`` untimed calls run before each level.
+    Per-host rate control is off for the run: its adaptive limit would cap the
+    concurrency under test and carry throttling from one level into the next.
+    """
+    factories = build_operations(server.base_url, server.pages)
+    browser_automator = get_browser_automator()
+    await browser_automator.start(headless=True, pool_size=max(levels), attach=False)
+    rate_control, browser_automator.rate_control = browser_automator.rate_control, None
+    results = []
+    try:
+        for name in operations:
+            for concurrency in levels:
+                for i in range(warmup):
+                    try:
+                        await factories[name](iterations + i)
+                    except Exception as e:
+                        print(f"⚠️ Warm-up of {name} failed: {e}")
+                result = {"operation": name, **await run_level(factories[name], concurrency, iterations)}
+                print(f"⏱️  {name:<10} c={concurrency:<3} {result['ops_per_sec']:>8.2f} ops/s  "
+                      f"p50 {result['p50'] * 1000:>8.1f} ms  p95 {result['p95'] * 1000:>8.1f} ms  "
+                      f"errors {result['errors']}")
+                results.append(result)
+    finally:
+        await browser_automator.close()
+        browser_automator.rate_control = rate_control
+    return results
+
+def save_results(path: str, settings: Dict, results: List[Dict]):
+    save_json(path, {"settings": settings, "results": results})
+
+def main(argv: Optional[Sequence[str]] = None):
+    logging.basicConfig(level=logging.INFO)
+    browser_automator = get_browser_automator()
+    parser = argparse.ArgumentParser(description="Benchmark the ops agents offline against local fixture pages.")
+    parser.add_argument("--ops", default=",".join(OPERATIONS), help=f"Comma-separated subset of {','.join(OPERATIONS)}")
+    parser.add_argument("--concurrency", default="1,4,8", help="Comma-separated concurrency levels")
+    parser.add_argument("--iterations", type=int, default=20, help="Timed calls per operation and level")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds the fixture server adds to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many extra random seconds per response")
+    parser.add_argument("--article-kb", type=int, default=200, help="Approximate size of the article pages")
+    parser.add_argument("--results-per-page", type=int, default=10)
+    parser.add_argument("--repos-per-page", type=int, default=30)
+    parser.add_argument("--pages", type=int, default=10, help="Listing pages the fixture serves")
+    parser.add_argument("--compile-latency", type=float, default=0.5)
+    parser.add_argument("--port", type=int, default=0,
+                        help="Fixture server port (0 picks a free one; fix it to replay a recorded HAR)")
+    parser.add_argument("--binary-path", default=browser_automator.binary_path)
+    parser.add_argument("--json", metavar="FILE", help="Write settings and results to FILE")
+    parser.add_argument("--metrics", metavar="FILE", help="Also record per-span timings and write them to FILE")
+    add_har_arguments(parser)
+    args = parser.parse_args(argv)
+    configure_har(args)
+    metrics.start_from_env()
+
+    operations = [op.strip() for op in args.ops.split(",") if op.strip()]
+    unknown = set(operations) - set(OPERATIONS)
+    if unknown:
+        parser.error(f"unknown operations: {', '.join(sorted(unknown))}")
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    browser_automator.binary_path = args.binary_path
+    if args.metrics:
+        metrics.enable()
+
+    server = FixtureServer(latency=args.latency, jitter=args.jitter, article_kb=args.article_kb,
+                           results_per_page=args.results_per_page, repos_per_page=args.repos_per_page,
+                           pages=args.pages, compile_latency=args.compile_latency, port=args.port)
+    print(f"🧪 Fixture server at {server.start()}")
+    try:
+        results = asyncio.run(run_benchmarks(operations, levels, args.iterations, server, args.warmup))
+    finally:
+        server.stop()
+
+    if args.json:
+        settings = {key: value for key, value in vars(args).items() if key not in ("json", "metrics")}
+        save_results(args.json, settings, results)
+        print(f"💾 Results saved to {args.json}")
+    if args.metrics:
+        metrics.export_json(args.metrics)
+        print(f"💾 Span timings saved to {args.metrics}")
+
+if __name__ == "__main__":
+    main()
@@ -1,119 +1,597 @@
+from __future__ import annotations
+
+import argparse
 import asyncio
 import logging
-from typing import Optional, Dict, Any, List
-from playwright.async_api import async_playwright, Browser, BrowserContext, Page
+import os
+import re
+import weakref
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional, Dict, Any, List, AsyncIterator, Tuple, Union
+import browser_daemon
+from browser_daemon import BROWSER_ARGS, DEFAULT_BINARY, USER_AGENT
+from metrics import host_of, metrics
+from rate_control import RateController, RetryableError, parse_retry_after, rate_controller
+
+if TYPE_CHECKING:
+    # Playwright is imported when a browser starts, so commands without a browser don't pay for it.
+    from playwright.async_api import Browser, BrowserContext, Page, Route
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("browser-automator")
 
+@dataclass(frozen=True)
+class NavigationProfile:
+    """
+    How navigate() loads a page.
+
+    wait_until is a Playwright load state ("commit", "domcontentloaded", "load"
+    or "networkidle"); wait_for_selector additionally waits for an element.
+    Requests whose resource type is in block_resource_types, or whose URL
+    matches one of the block_url_patterns regexes, are aborted. timeout is in
+    milliseconds (None keeps Playwright's default).
+    """
+    wait_until: str = "networkidle"
+    wait_for_selector: Optional[str] = None
+    block_resource_types: Tuple[str, ...] = ()
+    block_url_patterns: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+
+    @property
+    def blocks_requests(self) -> bool:
+        return bool(self.block_resource_types or self.block_url_patterns)
+
+    def blocks(self, resource_type: str, url: str) -> bool:
+        if resource_type in self.block_resource_types:
+            return True
+        return any(re.search(pattern, url) for pattern in self.block_url_patterns)
+
+TRACKER_PATTERNS = (
+    r"google-analytics\.com", r"googletagmanager\.com", r"doubleclick\.net", r"googlesyndication\.com",
+    r"facebook\.net", r"connect\.facebook\.com", r"hotjar\.com", r"segment\.(io|com)", r"scorecardresearch\.com",
+)
+
+# "full" loads everything, like a user would; "text" is enough for DOM text extraction.
+PROFILES: Dict[str, NavigationProfile] = {
+    "full": NavigationProfile(),
+    "text": NavigationProfile(
+        wait_until="domcontentloaded",
+        block_resource_types=("image", "media", "font", "stylesheet"),
+        block_url_patterns=TRACKER_PATTERNS,
+        timeout=15000,
+    ),
+}
+
+# Readability-style extraction that runs inside the page. It picks the main
+# content root (article/main, else the best-scoring text container), skips
+# navigation/ads/boilerplate, and stops collecting once max_chars is reached,
+# so only the budgeted text crosses the Playwright channel. When that yields
+# less than minChars (script-built or unusually marked-up pages), the text of
+# document.body.innerText is taken instead.
+MAIN_CONTENT_JS = """({ maxChars, structured, maxLinks, minChars }) => {
+    const SKIP_TAGS = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'NAV', 'ASIDE', 'FOOTER', 'HEADER', 'FORM',
+                               'IFRAME', 'SVG', 'BUTTON', 'TEMPLATE', 'SELECT', 'INPUT', 'TEXTAREA']);
+    const SKIP_ROLES = new Set(['navigation', 'banner', 'contentinfo', 'complementary', 'dialog', 'menu']);
+    const BOILERPLATE = /(^|[\\s_-])(nav|navbar|menu|footer|header|sidebar|aside|ad|ads|advert|banner|promo|sponsor|social|share|comments?|cookie|related|newsletter|popup|modal|breadcrumbs?)([\\s_-]|$)/i;
+    const TEXT_BLOCKS = new Set(['P', 'LI', 'BLOCKQUOTE', 'PRE', 'DD', 'DT', 'FIGCAPTION', 'TD']);
+    const HEADINGS = new Set(['H1', 'H2', 'H3', 'H4', 'H5', 'H6']);
+    const BLOCK_SELECTOR = 'p, div, section, article, ul, ol, li, table, blockquote, pre, h1, h2, h3, h4, h5, h6';
+
+    const clean = text => (text || '').replace(/\\s+/g, ' ').trim();
+    const classOf = el => typeof el.className === 'string' ? el.className : '';
+    const isBoilerplate = el =>
+        SKIP_TAGS.has(el.tagName) ||
+        SKIP_ROLES.has(el.getAttribute('role')) ||
+        el.getAttribute('aria-hidden') === 'true' ||
+        el.hidden ||
+        BOILERPLATE.test(classOf(el) + ' ' + (el.id || ''));
+    const linkDensity = el => {
+        const total = clean(el.textContent).length;
+        if (!total) return 1;
+        let linked = 0;
+        el.querySelectorAll('a').forEach(a => { linked += clean(a.textContent).length; });
+        return linked / total;
+    };
+
+    let root = document.querySelector('article, main, [role="main"]');
+    if (!root) {
+        const scores = new Map();
+        document.querySelectorAll('p, pre, blockquote, td').forEach(block => {
+            const text = clean(block.textContent);
+            if (text.length < 25) return;
+            const score = 1 + text.split(',').length + Math.min(text.length / 100, 3);
+            const parent = block.parentElement;
+            if (parent) scores.set(parent, (scores.get(parent) || 0) + score);
+            if (parent && parent.parentElement) {
+                scores.set(parent.parentElement, (scores.get(parent.parentElement) || 0) + score / 2);
+            }
+        });
+        let best = 0;
+        scores.forEach((score, el) => {
+            const adjusted = score * (1 - linkDensity(el));
+            if (adjusted > best) { best = adjusted; root = el; }
+        });
+    }
+    root = root || document.body;
+
+    const parts = [];
+    const sections = [];
+    const links = [];
+    let used = 0;
+    let truncated = false;
+
+    const take = (type, text, extra) => {
+        if (!text || truncated) return;
+        const remaining = maxChars - used;
+        if (text.length > remaining) {
+            text = text.slice(0, Math.max(remaining, 0));
+            truncated = true;
+        }
+        if (!text) return;
+        parts.push(text);
+        used += text.length + 1;
+        if (structured) sections.push(Object.assign({ type, text }, extra || {}));
+    };
+    const collectLinks = el => {
+        if (!structured) return;
+        el.querySelectorAll('a[href]').forEach(a => {
+            if (links.length < maxLinks && a.href.startsWith('http')) {
+                links.push({ text: clean(a.textContent).slice(0, 200), href: a.href });
+            }
+        });
+    };
+
+    const walk = el => {
+        for (const child of el.childNodes) {
+            if (truncated) return;
+            if (child.nodeType === Node.TEXT_NODE) {
+                // Bare text beside the element children, e.g. <div>Intro<p>...</p></div>.
+                take('paragraph', clean(child.textContent));
+                continue;
+            }
+            if (child.nodeType !== Node.ELEMENT_NODE || isBoilerplate(child)) continue;
+            if (HEADINGS.has(child.tagName)) {
+                take('heading', clean(child.textContent), { level: Number(child.tagName[1]) });
+            } else if (TEXT_BLOCKS.has(child.tagName) || !child.querySelector(BLOCK_SELECTOR)) {
+                const text = clean(child.textContent);
+                if (text.length < 200 && linkDensity(child) > 0.5) continue;
+                take('paragraph', text);
+                collectLinks(child);
+            } else {
+                walk(child);
+            }
+        }
+    };
+    walk(root);
+
+    if (used < Math.min(minChars, maxChars) && document.body) {
+        const fallback = document.body.innerText.split('\\n').map(clean).filter(Boolean);
+        if (fallback.join(' ').length > used) {
+            parts.length = 0;
+            sections.length = 0;
+            used = 0;
+            truncated = false;
+            fallback.forEach(line => take('paragraph', line));
+        }
+    }
+
+    const canonicalLink = document.querySelector('link[rel="canonical"]');
+    const result = {
+        title: document.title, url: location.href, canonical: canonicalLink ? canonicalLink.href : null,
+        text: parts.join('\\n'), truncated,
+    };
+    if (structured) {
+        result.sections = sections;
+        result.links = links;
+    }
+    return result;
+}"""
+
+def get_profile(profile: Union[str, NavigationProfile, None], default: str = "full") -> NavigationProfile:
+    if isinstance(profile, NavigationProfile):
+        return profile
+    return PROFILES[profile or default]
+
+HAR_MODES = ("record", "replay")
+
+def add_har_arguments(parser: argparse.ArgumentParser):
+    """Adds the --record-har/--replay-har/--har-strict flags shared by the browser scripts."""
+    har = parser.add_mutually_exclusive_group()
+    har.add_argument("--record-har", metavar="FILE", help="Record all browser traffic to FILE (.har or .zip)")
+    har.add_argument("--replay-har", metavar="FILE", help="Serve browser requests from a recorded FILE")
+    parser.add_argument("--har-strict", action="store_true",
+                        help="When replaying, fail requests missing from the archive instead of going to the network")
+
+def configure_har(options: argparse.Namespace):
+    """Applies the parsed HAR flags to the shared browser and removes them from options."""
+    record, replay, strict = options.record_har, options.replay_har, options.har_strict
+    for name in ("record_har", "replay_har", "har_strict"):
+        delattr(options, name)
+    if record:
+        get_browser_automator().use_har(record, "record")
+    elif replay:
+        get_browser_automator().use_har(replay, "replay", strict=strict)
+
 class BrowserAutomator:
     """
     Controls the Comet Browser (or Chromium) using Playwright.
     Provides high-level automation capabilities for agentic workflows.
+
+    Besides the single shared ``page``, a bounded pool of pages can be checked
+    out with ``acquire_page()`` so several navigations run in parallel inside
+    one browser process.
+
+    If a browser daemon (see browser_daemon.py) is running, ``start()`` attaches
+    to it over CDP instead of launching a new browser, and ``close()`` only
+    closes this client's pages.
+
+    ``use_har()`` records the session's traffic to a HAR archive, or replays a
+    recorded archive instead of going to the network (see use_har()).
     """
-    
-    def __init__(self, binary_path: str = "/Applications/Comet.app/Contents/MacOS/Comet"):
+
+    def __init__(self, binary_path: str = DEFAULT_BINARY,
+                 pool_size: int = 8, isolated_contexts: bool = False, default_profile: str = "full"):
         self.binary_path = binary_path
         self.playwright = None
         self.browser: Optional[Browser] = None
         self.context: Optional[BrowserContext] = None
         self.page: Optional[Page] = None
-        
-    async def start(self, headless: bool = False):
-        """Launches the browser."""
+        # True when connected to the browser daemon rather than owning the browser.
+        self.attached = False
+        self._owns_context = True
+
+        # Page pool: idle pages wait in the queue, the semaphore bounds checkouts.
+        self.pool_size = pool_size
+        self.isolated_contexts = isolated_contexts
+        self._pool_idle: Optional[asyncio.Queue] = None
+        self._pool_slots: Optional[asyncio.Semaphore] = None
+        self._pool_pages: List[Page] = []
+
+        # Navigation profile currently applied to each page, and pages with the blocking route installed.
+        self.default_profile = default_profile
+        self._page_profiles: "weakref.WeakKeyDictionary[Page, NavigationProfile]" = weakref.WeakKeyDictionary()
+        self._routed_pages: "weakref.WeakSet[Page]" = weakref.WeakSet()
+
+        # HAR record/replay (see use_har()).
+        self.har_path: Optional[str] = None
+        self.har_mode: Optional[str] = None
+        self.har_strict = False
+
+        # Per-host concurrency, retries and circuit breaking for navigations (None disables).
+        self.rate_control: Optional[RateController] = rate_controller
+
+    def use_har(self, path: Optional[str], mode: str = "replay", strict: bool = False):
+        """
+        Records traffic to, or replays it from, the HAR archive at ``path``.
+
+        In "record" mode every request of the session is written to ``path``
+        when the browser closes (a .zip path stores bodies as separate files).
+        In "replay" mode requests are answered from the archive; unmatched
+        requests go to the network, or fail when ``strict`` is set. Takes
+        effect at the next start(). ``path=None`` turns HAR handling off.
+        """
+        if path and mode not in HAR_MODES:
+            raise ValueError(f"Unknown HAR mode '{mode}', expected one of {HAR_MODES}")
+        self.har_path = path
+        self.har_mode = mode if path else None
+        self.har_strict = strict
+
+    def _record_options(self) -> Dict[str, Any]:
+        if self.har_mode != "record":
+            return {}
+        directory = os.path.dirname(os.path.abspath(self.har_path))
+        os.makedirs(directory, exist_ok=True)
+        return {
+            "record_har_path": self.har_path,
+            "record_har_content": "attach" if self.har_path.endswith(".zip") else "embed",
+        }
+
+    @property
+    def _isolating(self) -> bool:
+        # One recording context captures the whole session, so recording shares it.
+        return self.isolated_contexts and self.har_mode != "record"
+
+    async def start(self, headless: bool = False, pool_size: Optional[int] = None,
+                    isolated_contexts: Optional[bool] = None, attach: bool = True):
+        """Attaches to the browser daemon if one is healthy, otherwise launches the browser."""
+        if pool_size is not None:
+            self.pool_size = pool_size
+        if isolated_contexts is not None:
+            self.isolated_contexts = isolated_contexts
+
+        endpoint = browser_daemon.endpoint_if_running() if attach else None
+        if endpoint:
+            await self._attach(endpoint)
+            return
+
         logger.info(f"🚀 Launching browser (Headless: {headless})...")
-        
+
         # Verify binary exists
-        import os
         if not os.path.exists(self.binary_path):
             logger.error(f"❌ Binary not found at {self.binary_path}")
             raise FileNotFoundError(f"Please set the correct chrome binary path. Could not find: {self.binary_path}")
 
+        from playwright.async_api import async_playwright
         self.playwright = await async_playwright().start()
-        
+
         try:
             # Try launching the specific binary (Comet)
             # Add User-Agent to avoid simple bot detection
-            user_agent = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-            
             # Use standard launch() which is more robust against custom startup pages than persistent_context
             self.browser = await self.playwright.chromium.launch(
                 executable_path=self.binary_path,
                 headless=headless,
-                args=[
-                    "--no-sandbox", 
-                    "--disable-infobars", 
-                    "--disable-blink-features=AutomationControlled",
-                    "--ignore-certificate-errors",
-                    "--no-first-run",
-                    f"--user-agent={user_agent}"
-                ]
+                args=BROWSER_ARGS
             )
-            
+
             # Create a context with the user agent
-            self.context = await self.browser.new_context(
-                user_agent=user_agent,
-                viewport={"width": 1280, "height": 720},
-                ignore_https_errors=True
-            )
+            self.context = await self.new_context(**self._record_options())
             self.page = await self.context.new_page()
+            self._reset_pool()
             logger.info(f"✅ Launched Comet Browser from {self.binary_path}")
-            
+
         except Exception as e:
             logger.error(f"❌ Failed to launch Comet: {e}")
             raise e
 
-    async def navigate(self, url: str):
-        """Navigates to a URL."""
-        if not self.page:
+    async def _attach(self, endpoint: str):
+        """Connects to the warm browser daemon and reuses its default (logged-in) context."""
+        logger.info(f"🔌 Attaching to browser daemon at {endpoint}...")
+        from playwright.async_api import async_playwright
+        self.playwright = await async_playwright().start()
+        try:
+            self.browser = await self.playwright.chromium.connect_over_cdp(endpoint)
+        except Exception:
+            await self.playwright.stop()
+            raise
+        self.attached = True
+        if self.browser.contexts and not self.har_mode:
+            self.context = self.browser.contexts[0]
+            self._owns_context = False
+        else:
+            # Recording and replay need a context of our own.
+            self.context = await self.new_context(**self._record_options())
+        self.page = await self.context.new_page()
+        self._reset_pool()
+        browser_daemon.touch()
+        logger.info("✅ Attached to browser daemon")
+
+    async def new_context(self, **overrides) -> BrowserContext:
+        """Creates a browser context with the default agent settings."""
+        if not self.browser:
+            raise RuntimeError("Browser not started. Call start() first.")
+        options: Dict[str, Any] = {
+            "user_agent": USER_AGENT,
+            "viewport": {"width": 1280, "height": 720},
+            "ignore_https_errors": True,
+        }
+        options.update(overrides)
+        context = await self.browser.new_context(**options)
+        if self.har_mode == "replay":
+            await context.route_from_har(self.har_path, not_found="abort" if self.har_strict else "fallback")
+        return context
+
+    def _reset_pool(self):
+        self._pool_idle = asyncio.Queue()
+        self._pool_slots = asyncio.Semaphore(self.pool_size)
+        self._pool_pages = []
+
+    async def _open_pool_page(self) -> Page:
+        if self._isolating:
+            context = await self.new_context()
+        else:
+            context = self.context
+        page = await context.new_page()
+        self._pool_pages.append(page)
+        return page
+
+    async def _discard_pool_page(self, page: Page):
+        if page in self._pool_pages:
+            self._pool_pages.remove(page)
+        try:
+            if self._isolating:
+                await page.context.close()
+            elif not page.is_closed():
+                await page.close()
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to close pooled page: {e}")
+
+    @asynccontextmanager
+    async def acquire_page(self) -> AsyncIterator[Page]:
+        """
+        Checks a page out of the pool for the duration of the ``async with`` block.
+
+        At most ``pool_size`` pages are handed out at once; further callers wait
+        until a page is returned. Pages are reused across checkouts and get their
+        own context each when ``isolated_contexts`` is set.
+        """
+        if not self.browser or self._pool_slots is None:
             raise RuntimeError("Browser not started. Call start() first.")
+
+        # This checkout belongs to the current pool, even if close() or a restart replaces it meanwhile.
+        slots, idle = self._pool_slots, self._pool_idle
+        await slots.acquire()
+        page = None
+        healthy = False
+        try:
+            while not idle.empty():
+                candidate = idle.get_nowait()
+                if not candidate.is_closed():
+                    page = candidate
+                    break
+                await self._discard_pool_page(candidate)
+            if page is None:
+                page = await self._open_pool_page()
+            yield page
+            healthy = not page.is_closed()
+        finally:
+            if page is not None:
+                if healthy and self._pool_slots is slots:
+                    idle.put_nowait(page)
+                else:
+                    # The caller failed mid-navigation, or the pool was closed; don't
+                    # hand a page in an unknown state to the next caller.
+                    await self._discard_pool_page(page)
+            slots.release()
+
+    def _resolve_page(self, page: Optional[Page]) -> Page:
+        page = page or self.page
+        if not page:
+            raise RuntimeError("Browser not started. Call start() first.")
+        return page
+
+    async def _route_request(self, page: Page, route: Route):
+        profile = self._page_profiles.get(page)
+        request = route.request
+        if profile is not None and profile.blocks(request.resource_type, request.url):
+            await route.abort()
+        else:
+            await route.fallback()
+
+    async def _apply_profile(self, page: Page, profile: NavigationProfile):
+        """Installs request blocking on the page only while its profile blocks something."""
+        self._page_profiles[page] = profile
+        if profile.blocks_requests and page not in self._routed_pages:
+            await page.route("**/*", lambda route: self._route_request(page, route))
+            self._routed_pages.add(page)
+        elif not profile.blocks_requests and page in self._routed_pages:
+            await page.unroute("**/*")
+            self._routed_pages.discard(page)
+
+    async def navigate(self, url: str, page: Optional[Page] = None,
+                       profile: Union[str, NavigationProfile, None] = None, timeout: Optional[float] = None):
+        """
+        Navigates to a URL.
+
+        ``profile`` (a NavigationProfile or a name from PROFILES) selects the
+        wait condition and request blocking; ``timeout`` (ms) overrides the
+        profile's timeout for this call.
+
+        With ``rate_control`` set, the load runs in a slot of the host's
+        concurrency limit; timeouts, network errors and HTTP 429/503 answers
+        are retried with backoff, and an open circuit raises CircuitOpenError.
+        The profile's wait_for_selector runs after the slot is released, so a
+        page that lacks the element fails once instead of throttling the host.
+        """
+        page = self._resolve_page(page)
+        profile = get_profile(profile, self.default_profile)
+        timeout = timeout if timeout is not None else profile.timeout
+        await self._apply_profile(page, profile)
         logger.info(f"🌐 Navigating to: {url}")
-        await self.page.goto(url)
-        await self.page.wait_for_load_state("networkidle")
+        host = host_of(url)
 
-    async def click(self, selector: str):
+        async def load():
+            with metrics.span("browser.navigate", host=host):
+                response = await page.goto(url, wait_until=profile.wait_until, timeout=timeout)
+                if response is not None and response.status in (429, 503):
+                    raise RetryableError(f"HTTP {response.status} from {url}", throttle=True,
+                                         retry_after=parse_retry_after(response.headers.get("retry-after")))
+
+        if self.rate_control is None:
+            await load()
+        else:
+            await self.rate_control.call_async(host, load)
+        if profile.wait_for_selector:
+            with metrics.span("browser.wait", host=host):
+                await page.wait_for_selector(profile.wait_for_selector, timeout=timeout)
+
+    @staticmethod
+    def _page_span(name: str, page: Page):
+        """metrics.span tagged with the page's host, which is only looked up while metrics are enabled."""
+        return metrics.span(name, host=host_of(page.url)) if metrics.enabled else metrics.span(name)
+
+    async def click(self, selector: str, page: Optional[Page] = None):
         """Clicks an element."""
-        if not self.page:
-            raise RuntimeError("Browser not started.")
+        page = self._resolve_page(page)
         logger.info(f"🖱️ Clicking: {selector}")
-        await self.page.click(selector)
+        with self._page_span("browser.click", page):
+            await page.click(selector)
 
-    async def type(self, selector: str, text: str):
+    async def type(self, selector: str, text: str, page: Optional[Page] = None):
         """Types text into an element."""
-        if not self.page:
-            raise RuntimeError("Browser not started.")
+        page = self._resolve_page(page)
         logger.info(f"⌨️ Typing into {selector}")
-        await self.page.fill(selector, text)
+        with self._page_span("browser.type", page):
+            await page.fill(selector, text)
 
-    async def extract_text(self, selector: str) -> str:
+    async def extract_text(self, selector: str, page: Optional[Page] = None) -> str:
         """Extracts text from an element."""
-        if not self.page:
-            raise RuntimeError("Browser not started.")
-        return await self.page.inner_text(selector)
+        page = self._resolve_page(page)
+        with self._page_span("browser.extract", page):
+            return await page.inner_text(selector)
+
+    async def evaluate(self, expression: str, arg: Any = None, page: Optional[Page] = None) -> Any:
+        """Evaluates JavaScript in the page and returns the result."""
+        page = self._resolve_page(page)
+        with self._page_span("browser.evaluate", page):
+            return await page.evaluate(expression, arg)
+
+    async def extract_main_content(self, page: Optional[Page] = None, max_chars: int = 4000,
+                                   structured: bool = False, max_links: int = 50,
+                                   min_chars: int = 200) -> Dict[str, Any]:
+        """
+        Extracts the page's main content, capped at ``max_chars`` inside the page.
 
-    async def get_title(self) -> str:
+        If the main content yields fewer than ``min_chars`` characters, the
+        page's whole visible text (document.body.innerText) is used instead.
+
+        Returns ``title``, ``url``, ``canonical`` (the page's rel=canonical link,
+        or None), ``text`` and ``truncated``; with ``structured``
+        also ``sections`` (headings/paragraphs in order) and up to ``max_links`` links.
+        """
+        page = self._resolve_page(page)
+        with self._page_span("browser.extract", page):
+            return await page.evaluate(MAIN_CONTENT_JS, {
+                "maxChars": max_chars, "structured": structured, "maxLinks": max_links, "minChars": min_chars,
+            })
+
+    async def get_title(self, page: Optional[Page] = None) -> str:
         """Gets page title."""
-        if not self.page:
-            raise RuntimeError("Browser not started.")
-        return await self.page.title()
+        page = self._resolve_page(page)
+        return await page.title()
 
-    async def screenshot(self, path: str):
+    async def screenshot(self, path: str, page: Optional[Page] = None):
         """Takes a screenshot."""
-        if not self.page:
-            raise RuntimeError("Browser not started.")
+        page = self._resolve_page(page)
         logger.info(f"📸 Saving screenshot to {path}")
-        await self.page.screenshot(path=path)
+        await page.screenshot(path=path)
 
     async def close(self):
         """Closes the browser."""
-        if self.context:
-            await self.context.close()
-        if self.browser:
-            await self.browser.close()
+        for page in list(self._pool_pages):
+            await self._discard_pool_page(page)
+        self._pool_slots = None
+        if self.attached:
+            # Leave the daemon's browser and its shared context running.
+            if self.page and not self.page.is_closed():
+                await self.page.close()
+            if self.context and self._owns_context:
+                await self.context.close()
+            browser_daemon.touch()
+        else:
+            if self.context:
+                await self.context.close()
+            if self.browser:
+                await self.browser.close()
         if self.playwright:
             await self.playwright.stop()
+        self.attached = False
+        self._owns_context = True
+        if self.har_mode == "record":
+            logger.info(f"💾 Recorded traffic to {self.har_path}")
         logger.info("🛑 Browser closed.")
 
-# Singleton for easy import
-browser_automator = BrowserAutomator()
+_browser_automator: Optional[BrowserAutomator] = None
+
+def get_browser_automator() -> BrowserAutomator:
+    """The shared BrowserAutomator, created on first use."""
+    global _browser_automator
+    if _browser_automator is None:
+        _browser_automator = BrowserAutomator()
+    return _browser_automator
+
+def __getattr__(name: str):
+    # Keeps `from browser_automator import browser_automator` working without an import-time instance.
+    if name == "browser_automator":
+        return get_browser_automator()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
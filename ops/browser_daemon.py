@@ -0,0 +1,202 @@
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import Dict, Optional
+
+from atomic_file import save_json
+
+DEFAULT_BINARY = "/Applications/Comet.app/Contents/MacOS/Comet"
+DEFAULT_PORT = 9222
+DEFAULT_IDLE_TIMEOUT = 30 * 60
+CHECK_INTERVAL = 15
+
+STATE_DIR = os.path.expanduser("~/.cache/udc")
+STATE_FILE = os.path.join(STATE_DIR, "browser_daemon.json")
+LAST_USED_FILE = os.path.join(STATE_DIR, "browser_daemon.last_used")
+# A persistent profile keeps cookies and logins across jobs.
+PROFILE_DIR = os.path.join(STATE_DIR, "browser-profile")
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+BROWSER_ARGS = [
+    "--no-sandbox",
+    "--disable-infobars",
+    "--disable-blink-features=AutomationControlled",
+    "--ignore-certificate-errors",
+    "--no-first-run",
+    f"--user-agent={USER_AGENT}",
+]
+
+# Fields every state file holds; a file missing any of them is ignored.
+STATE_KEYS = ("pid", "browser_pid", "port", "endpoint")
+
+# Targets a fresh browser shows that don't count as work in progress.
+IDLE_URLS = ("about:blank", "chrome://newtab/", "chrome://new-tab-page/")
+
+def _get_json(url: str, timeout: float = 1.0):
+    import urllib.request
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.load(response)
+
+def health(port: int = DEFAULT_PORT) -> Optional[Dict]:
+    """Returns the DevTools /json/version info if a browser answers on the port."""
+    try:
+        return _get_json(f"http://127.0.0.1:{port}/json/version")
+    except Exception:
+        return None
+
+def read_state() -> Optional[Dict]:
+    """The running daemon's state, or None if there is none or the file is unreadable."""
+    try:
+        with open(STATE_FILE, "r") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(state, dict) or not all(key in state for key in STATE_KEYS):
+        return None
+    return state
+
+def write_state(state: Dict):
+    # Written aside and renamed, so clients never read a half-written file.
+    os.makedirs(STATE_DIR, exist_ok=True)
+    save_json(STATE_FILE, state)
+
+def clear_state():
+    try:
+        os.remove(STATE_FILE)
+    except FileNotFoundError:
+        pass
+
+def endpoint_if_running() -> Optional[str]:
+    """The CDP endpoint of a healthy daemon, or None if there is none to attach to."""
+    state = read_state()
+    if state and health(state["port"]):
+        return state["endpoint"]
+    return None
+
+def touch():
+    """Records client activity so the daemon doesn't shut down under a job."""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    with open(LAST_USED_FILE, "a"):
+        pass
+    os.utime(LAST_USED_FILE, None)
+
+def seconds_since_use() -> float:
+    try:
+        return time.time() - os.path.getmtime(LAST_USED_FILE)
+    except OSError:
+        return float("inf")
+
+def is_idle(port: int, idle_timeout: float) -> bool:
+    """Idle means no open work pages and no client activity for idle_timeout seconds."""
+    if seconds_since_use() < idle_timeout:
+        return False
+    try:
+        targets = _get_json(f"http://127.0.0.1:{port}/json/list")
+    except Exception:
+        return False
+    return not any(t.get("type") == "page" and t.get("url") not in IDLE_URLS for t in targets)
+
+def run_daemon(binary_path: str = DEFAULT_BINARY, port: int = DEFAULT_PORT, headless: bool = True,
+               idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+    """Launches the browser with remote debugging and supervises it until it idles out or is stopped."""
+    if endpoint_if_running():
+        print(f"✅ Browser daemon already running at {read_state()['endpoint']}")
+        return
+
+    args = [binary_path, f"--remote-debugging-port={port}", f"--user-data-dir={PROFILE_DIR}", *BROWSER_ARGS]
+    if headless:
+        args.append("--headless=new")
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    browser = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.time() + 30
+    while not health(port):
+        if browser.poll() is not None or time.time() > deadline:
+            browser.kill()
+            raise RuntimeError(f"Browser did not open a DevTools endpoint on port {port}")
+        time.sleep(0.2)
+
+    endpoint = f"http://127.0.0.1:{port}"
+    write_state({"pid": os.getpid(), "browser_pid": browser.pid, "port": port,
+                 "endpoint": endpoint, "started": time.time(), "idle_timeout": idle_timeout})
+    touch()
+    print(f"🚀 Browser daemon listening at {endpoint} (idle shutdown after {idle_timeout}s)")
+
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        while browser.poll() is None:
+            time.sleep(CHECK_INTERVAL)
+            if is_idle(port, idle_timeout):
+                print("💤 Idle timeout reached, shutting down.")
+                break
+    finally:
+        if browser.poll() is None:
+            browser.terminate()
+            try:
+                browser.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                browser.kill()
+        clear_state()
+        print("🛑 Browser daemon stopped.")
+
+def stop_daemon() -> bool:
+    state = read_state()
+    if not state:
+        return False
+    try:
+        os.kill(state["pid"], signal.SIGTERM)
+        return True
+    except ProcessLookupError:
+        pass
+    # The daemon died without cleaning up. Its browser may have gone too and the pid
+    # been reused, so only signal browser_pid while a browser still answers on the port.
+    if health(state["port"]):
+        try:
+            os.kill(state["browser_pid"], signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    clear_state()
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-lived browser that ops scripts attach to over CDP.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    start_parser = sub.add_parser("start", help="Run the daemon")
+    start_parser.add_argument("--binary-path", default=DEFAULT_BINARY)
+    start_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    start_parser.add_argument("--headed", dest="headless", action="store_false")
+    start_parser.add_argument("--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT,
+                              help="Seconds without clients before the daemon exits")
+    start_parser.add_argument("--detach", action="store_true", help="Run in the background")
+    sub.add_parser("stop", help="Stop the running daemon")
+    sub.add_parser("status", help="Print health information")
+    args = parser.parse_args()
+
+    if args.command == "start":
+        if args.detach:
+            command = [sys.executable, os.path.abspath(__file__), "start", "--binary-path", args.binary_path,
+                       "--port", str(args.port), "--idle-timeout", str(args.idle_timeout)]
+            if not args.headless:
+                command.append("--headed")
+            subprocess.Popen(command, start_new_session=True,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            print("🚀 Browser daemon starting in the background.")
+        else:
+            run_daemon(args.binary_path, args.port, args.headless, args.idle_timeout)
+    elif args.command == "stop":
+        print("🛑 Stopping browser daemon." if stop_daemon() else "ℹ️ No browser daemon running.")
+    else:
+        state = read_state()
+        info = health(state["port"]) if state else None
+        if not info:
+            print("❌ Browser daemon not running.")
+        else:
+            print(f"✅ {info.get('Browser')} at {state['endpoint']}, "
+                  f"idle for {seconds_since_use():.0f}s (timeout {state['idle_timeout']:.0f}s)")
+
+if __name__ == "__main__":
+    main()
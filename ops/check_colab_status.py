@@ -1,6 +1,7 @@
 import asyncio
+import logging
 import os
-from processing_orchestrator import processing_orchestrator
+from processing_orchestrator import get_processing_orchestrator
 
 async def main():
     print("☁️ --- Colab Bridge Status Check ---")
@@ -16,7 +17,7 @@ async def main():
     
     try:
         # Simple execution test
-        result = await processing_orchestrator.execute_code("print('Hello from Antigravity!')", backend="colab")
+        result = await get_processing_orchestrator().execute_code("print('Hello from Antigravity!')", backend="colab")
         
         if result.get("status") == "success":
             print("\n✅ Connection Successful!")
@@ -29,4 +30,5 @@ async def main():
         print(f"\n❌ Connection Error: {e}")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     asyncio.run(main())
@@ -0,0 +1,256 @@
+import argparse
+import html
+import json
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+
+WORDS = ("agent latency browser cache throughput model index research vector kernel pipeline compile "
+         "network render queue signal memory paper result dataset benchmark scheduler thread process").split()
+
+# Minimal stand-in for the Overleaf editor: a .cm-content element exposing a
+# CodeMirror 6-like view (state.doc.toString() and dispatch({changes})), and a
+# Recompile button that POSTs to <project>/compile like the real editor.
+EDITOR_JS = """
+let doc = "\\\\documentclass{article}\\n\\\\begin{document}\\nDraft\\n\\\\end{document}\\n";
+const content = document.querySelector('.cm-content');
+const render = () => { content.textContent = doc; };
+const view = {
+    get state() { return { doc: { toString: () => doc } }; },
+    dispatch({ changes }) { doc = doc.slice(0, changes.from) + changes.insert + doc.slice(changes.to); render(); },
+};
+content.cmView = { rootView: { view } };
+render();
+document.querySelector('.recompile-button').addEventListener('click', () => {
+    fetch(location.pathname + '/compile', { method: 'POST', body: JSON.stringify({ doc }) });
+});
+"""
+
+PROJECT_LIST_JS = """
+document.querySelector('.new-project-button').addEventListener('click', () => {
+    document.querySelector('.new-project-menu').hidden = false;
+});
+document.querySelector('.menu-item-blank-project').addEventListener('click', () => {
+    document.querySelector('.new-project-modal').hidden = false;
+});
+document.querySelector('.modal-create-project-button').addEventListener('click', () => {
+    location.href = '/project/' + Math.random().toString(16).slice(2, 14);
+});
+"""
+
+def words(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+def page(title: str, body: str, head: str = "") -> str:
+    return (f"<!doctype html><html><head><meta charset='utf-8'><title>{html.escape(title)}</title>{head}</head>"
+            f"<body>{body}</body></html>")
+
+class FixtureServer:
+    """
+    Local web server with synthetic versions of the sites the ops agents visit.
+
+    - ``/search?q=...``: Google-style results (``div.g`` with ``h3`` and a link)
+      pointing at the article pages.
+    - ``/article/<n>``: heavy article of about ``article_kb`` KB with navigation,
+      ads, images and a stylesheet around the main text.
+    - ``/orgs/<name>/repositories?page=<n>``: GitHub-style listing with
+      ``repos_per_page`` repos per page over ``pages`` pages.
+    - ``/login``, ``/project`` and ``/project/<id>``: mock Overleaf project list
+      and editor; ``POST /project/<id>/compile`` answers after
+      ``compile_latency`` seconds with an output.pdf and output.log.
+    - ``POST /execute``: mock code-execution bridge (see
+      processing_orchestrator.HTTPBridgeBackend); every snippet received is
+      appended to ``executed`` and answered as a success without running it.
+
+    Every response is delayed by ``latency`` seconds, plus up to ``jitter``
+    seconds of random extra delay. Content is deterministic per URL.
+    """
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.0, article_kb: int = 200,
+                 results_per_page: int = 10, repos_per_page: int = 30, pages: int = 10,
+                 compile_latency: float = 0.5, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.article_kb = article_kb
+        self.results_per_page = results_per_page
+        self.repos_per_page = repos_per_page
+        self.pages = pages
+        self.compile_latency = compile_latency
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self.executed: List[str] = []
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> str:
+        """Serves from a daemon thread and returns the base URL (a free port is picked when port is 0)."""
+        fixtures = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                fixtures._handle(self, "GET")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                fixtures._handle(self, "POST", self.rfile.read(length) if length else b"")
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FixtureServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handle(self, request: BaseHTTPRequestHandler, method: str, body: bytes = b""):
+        url = urllib.parse.urlsplit(request.path)
+        params = urllib.parse.parse_qs(url.query)
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+        try:
+            status, content_type, content = self._route(method, url.path, params, body)
+        except (KeyError, ValueError):
+            status, content_type, content = 400, "text/plain", "Bad request"
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        request.send_response(status)
+        request.send_header("Content-Type", content_type)
+        request.send_header("Content-Length", str(len(data)))
+        request.send_header("Cache-Control", "no-store")
+        request.end_headers()
+        request.wfile.write(data)
+
+    def _route(self, method: str, path: str, params, body: bytes = b"") -> Tuple[int, str, object]:
+        parts = [part for part in path.split("/") if part]
+        if method == "POST" and path == "/execute":
+            self.executed.append(json.loads(body)["code"])
+            return 200, "application/json", json.dumps({"status": "success", "stdout": "", "duration": 0.0})
+        if method == "POST" and len(parts) == 3 and parts[0] == "project" and parts[2] == "compile":
+            time.sleep(self.compile_latency)
+            return 200, "application/json", json.dumps(self.compile_result(parts[1]))
+        if path == "/search":
+            return 200, "text/html", self.search_page(params.get("q", [""])[0])
+        if len(parts) == 2 and parts[0] == "article":
+            return 200, "text/html", self.article_page(int(parts[1]))
+        if len(parts) == 3 and parts[0] == "orgs" and parts[2] == "repositories":
+            return 200, "text/html", self.listing_page(parts[1], int(params.get("page", ["1"])[0]))
+        if path == "/login":
+            return 200, "text/html", page("Log in", "<form><input name='email'><input name='password' type='password'>"
+                                                    "<button type='submit'>Log in</button></form>")
+        if path == "/project":
+            return 200, "text/html", self.project_list_page()
+        if len(parts) == 2 and parts[0] == "project":
+            return 200, "text/html", self.editor_page(parts[1])
+        if len(parts) == 4 and parts[0] == "project" and parts[2] == "output":
+            if parts[3] == "output.log":
+                return 200, "text/plain", "This is pdfTeX (fixture)\nOutput written on output.pdf (1 page).\n"
+            return 200, "application/pdf", b"%PDF-1.4\n%fixture\n%%EOF\n"
+        if parts and parts[0] == "asset":
+            if path.endswith(".css"):
+                return 200, "text/css", "body { font-family: sans-serif; }\n" * 200
+            return 200, "image/png", bytes(16 * 1024)
+        return 404, "text/plain", "Not found"
+
+    def search_page(self, query: str) -> str:
+        rng = random.Random(query)
+        results = []
+        for i in range(self.results_per_page):
+            n = rng.randrange(100000)
+            results.append(
+                f"<div class='g'><a href='/article/{n}'><h3>{html.escape(words(rng, 6).title())}</h3></a>"
+                f"<div class='snippet'>{words(rng, 30)}</div></div>")
+        return page(f"{query} - Search", f"<div id='search'>{''.join(results)}</div>")
+
+    def article_page(self, n: int) -> str:
+        rng = random.Random(n)
+        nav = "".join(f"<li><a href='/article/{rng.randrange(100000)}'>{words(rng, 2)}</a></li>" for _ in range(40))
+        paragraphs = []
+        size = 0
+        while size < self.article_kb * 1024:
+            paragraph = f"<p>{words(rng, 120)}.</p>"
+            if len(paragraphs) % 5 == 0:
+                paragraph += f"<h2>{words(rng, 4)}</h2><img src='/asset/{n}-{len(paragraphs)}.png'>"
+            paragraphs.append(paragraph)
+            size += len(paragraph)
+        body = (f"<header><nav><ul>{nav}</ul></nav></header>"
+                f"<div class='ad-banner'>{words(rng, 20)}</div>"
+                f"<article><h1>{words(rng, 6).title()}</h1>{''.join(paragraphs)}</article>"
+                f"<aside class='related'>{words(rng, 80)}</aside><footer>{words(rng, 30)}</footer>")
+        return page(f"Article {n}", body, "<link rel='stylesheet' href='/asset/style.css'>")
+
+    def listing_page(self, org: str, page_number: int) -> str:
+        items = []
+        first = (page_number - 1) * self.repos_per_page
+        for i in range(first, first + self.repos_per_page if page_number <= self.pages else first):
+            rng = random.Random(i)
+            items.append(
+                f"<li><h3><a itemprop='name codeRepository' href='/{org}/repo-{i}'>repo-{i}</a></h3>"
+                f"<p itemprop='description'>{words(rng, 12)}</p>"
+                f"<relative-time datetime='2026-01-{1 + i % 28:02d}T00:00:00Z'></relative-time></li>")
+        links = "".join(f"<a href='?page={n}'>{n}</a>" for n in range(1, self.pages + 1) if n != page_number)
+        pagination = (f"<div class='pagination'><em class='current' data-total-pages='{self.pages}'>"
+                      f"{page_number}</em>{links}</div>")
+        return page(f"{org} repositories", f"<div id='org-repositories'><ul>{''.join(items)}</ul></div>{pagination}")
+
+    def project_list_page(self) -> str:
+        body = ("<button class='btn btn-primary new-project-button'>New Project</button>"
+                "<div class='new-project-menu' hidden><a class='menu-item-blank-project' href='#'>Blank Project</a></div>"
+                "<div class='new-project-modal' hidden><input name='projectName'>"
+                "<button class='btn btn-primary modal-create-project-button'>Create</button></div>")
+        return page("Your Projects", body + f"<script>{PROJECT_LIST_JS}</script>")
+
+    def editor_page(self, project_id: str) -> str:
+        body = ("<div class='cm-editor'><div class='cm-content' contenteditable='true'></div></div>"
+                "<button class='recompile-button'>Recompile</button>")
+        return page(f"Project {project_id}", body + f"<script>{EDITOR_JS}</script>")
+
+    def compile_result(self, project_id: str) -> dict:
+        return {
+            "status": "success",
+            "outputFiles": [
+                {"path": "output.pdf", "url": f"/project/{project_id}/output/output.pdf", "type": "pdf"},
+                {"path": "output.log", "url": f"/project/{project_id}/output/output.log", "type": "log"},
+            ],
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the benchmark fixtures for manual runs.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many extra random seconds")
+    parser.add_argument("--article-kb", type=int, default=200)
+    parser.add_argument("--compile-latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    server = FixtureServer(latency=args.latency, jitter=args.jitter, article_kb=args.article_kb,
+                           compile_latency=args.compile_latency, port=args.port)
+    print(f"🧪 Fixtures at {server.start()} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
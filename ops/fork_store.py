@@ -0,0 +1,228 @@
+import json
+import os
+import re
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Mapping, Optional
+from metrics import host_of, metrics
+from rate_control import CircuitOpenError, RetryableError, parse_retry_after, rate_controller
+
+API_DUMPS = ["repos_user.json", "repos_org.json"]
+PARENTS_FILE = "fork_parents.json"
+OBJECTS_DIR = ".objects"
+API_HOST = "api.github.com"
+
+def load_api_records() -> Dict[str, Dict]:
+    """Maps html_url to the GitHub API record from the repos_*.json dumps."""
+    records = {}
+    for filename in API_DUMPS:
+        if not os.path.exists(filename):
+            continue
+        with open(filename, "r") as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            for r in data:
+                records[r["html_url"]] = r
+    return records
+
+class QuotaExhaustedError(Exception):
+    """The GitHub API quota is used up; not retried, since the reset can be up to an hour away."""
+
+def rate_limit_wait(headers: Mapping[str, str]) -> Optional[float]:
+    """Seconds the GitHub API asks to wait: Retry-After, or until X-RateLimit-Reset once the quota is used up."""
+    retry_after = parse_retry_after(headers.get("Retry-After"))
+    if retry_after is not None:
+        return retry_after
+    if headers.get("X-RateLimit-Remaining") == "0":
+        try:
+            return max(0.0, float(headers.get("X-RateLimit-Reset")) - time.time())
+        except (TypeError, ValueError):
+            return None
+    return None
+
+def fetch_source(full_name: str, token: Optional[str] = None) -> Optional[Dict]:
+    """
+    Asks the GitHub API for the root (source) repository of a fork network.
+
+    Requests go through the shared rate controller; rate-limit answers are
+    retried after the wait the API asks for, capped at the controller's
+    max_delay. An exhausted quota is not retried: the fork then has no
+    known upstream and is cloned on its own.
+    """
+    import urllib.error
+    import urllib.request
+    request = urllib.request.Request(f"https://{API_HOST}/repos/{full_name}")
+    request.add_header("Accept", "application/vnd.github+json")
+    if token:
+        request.add_header("Authorization", f"Bearer {token}")
+
+    def attempt() -> Dict:
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return json.load(response)
+        except urllib.error.HTTPError as e:
+            wait = rate_limit_wait(e.headers)
+            if e.headers.get("X-RateLimit-Remaining") == "0" and not e.headers.get("Retry-After"):
+                raise QuotaExhaustedError(f"GitHub API quota used up, resets in {wait or 0:.0f}s") from e
+            # GitHub signals rate limits with 429, or with 403 plus the headers above.
+            if e.code in (429, 503) or (e.code == 403 and wait is not None):
+                raise RetryableError(f"HTTP {e.code} from {API_HOST}", throttle=True, retry_after=wait) from e
+            raise
+
+    try:
+        data = rate_controller.call(API_HOST, attempt)
+    except Exception as e:
+        print(f"⚠️  Could not resolve upstream of {full_name}: {e}")
+        return None
+    source = data.get("source") or data.get("parent")
+    if not source:
+        return None
+    return {"full_name": source["full_name"], "clone_url": source["clone_url"]}
+
+def resolve_upstreams(repos: List[Dict], workers: int = 8) -> Dict[str, Dict]:
+    """
+    Returns {repo url: {"full_name", "clone_url"}} of the network root for every fork.
+
+    The list API used for repos_*.json does not include parent information, so
+    forks are looked up once and cached in fork_parents.json.
+    """
+    cache = {}
+    if os.path.exists(PARENTS_FILE):
+        with open(PARENTS_FILE, "r") as f:
+            cache = json.load(f)
+
+    api_records = load_api_records()
+    pending = []
+    for repo in repos:
+        record = api_records.get(repo["url"], {})
+        is_fork = repo.get("fork", record.get("fork", False))
+        if is_fork and repo["url"] not in cache and record.get("full_name"):
+            pending.append((repo["url"], record["full_name"]))
+
+    if pending:
+        print(f"🔎 Resolving upstreams for {len(pending)} forks...")
+        token = os.environ.get("GITHUB_TOKEN")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            sources = pool.map(lambda item: fetch_source(item[1], token), pending)
+            for (url, _full_name), source in zip(pending, sources):
+                if source:
+                    cache[url] = source
+        with open(PARENTS_FILE, "w") as f:
+            json.dump(cache, f, indent=2, sort_keys=True)
+
+    return cache
+
+def group_by_upstream(repos: List[Dict], upstreams: Dict[str, Dict], min_group: int = 2) -> Dict[str, List[Dict]]:
+    """Groups forks by network root; groups smaller than min_group are dropped."""
+    groups: Dict[str, List[Dict]] = {}
+    for repo in repos:
+        source = upstreams.get(repo["url"])
+        if source:
+            groups.setdefault(source["full_name"], []).append(repo)
+    return {name: members for name, members in groups.items() if len(members) >= min_group}
+
+def reference_path(target_dir: str, upstream: str) -> str:
+    return os.path.join(target_dir, OBJECTS_DIR, upstream.replace("/", "__") + ".git")
+
+# git stderr that means "try again later" rather than "this will never work".
+# HTTP statuses only count in the message git prints for them, not anywhere in a repo name or path.
+THROTTLED_GIT_ERRORS = re.compile(r"returned error: (429|503)\b|rate limit|too many requests", re.IGNORECASE)
+TRANSIENT_GIT_ERRORS = re.compile(
+    r"returned error: 50[024]\b|timed out|could not resolve host|connection (reset|refused|closed)|early eof|"
+    r"rpc failed|unexpected disconnect|remote end hung up|failed to connect|ssl_read|gnutls", re.IGNORECASE)
+
+def git(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(["git", *args], capture_output=True, text=True)
+
+def remote_git(url: str, *args: str) -> subprocess.CompletedProcess:
+    """
+    Runs a git command that talks to url's host through the shared rate controller.
+
+    Rate limits and transient network failures are retried with backoff and
+    shrink the host's concurrency. Returns the last attempt's process; an
+    open circuit yields a failed process without running git.
+    """
+    def attempt() -> subprocess.CompletedProcess:
+        proc = git(*args)
+        if proc.returncode != 0:
+            if THROTTLED_GIT_ERRORS.search(proc.stderr):
+                raise RetryableError(proc.stderr.strip()[-500:], throttle=True)
+            if TRANSIENT_GIT_ERRORS.search(proc.stderr):
+                raise RetryableError(proc.stderr.strip()[-500:])
+        return proc
+
+    try:
+        return rate_controller.call(host_of(url), attempt)
+    except (RetryableError, CircuitOpenError) as e:
+        return subprocess.CompletedProcess(["git", *args], 1, "", str(e))
+
+def ensure_reference(target_dir: str, upstream: str, clone_url: str) -> Dict:
+    """Creates or updates the bare reference repository shared by one fork group."""
+    path = reference_path(target_dir, upstream)
+    result = {"upstream": upstream, "path": path}
+    with metrics.span("git.reference", host=host_of(clone_url), agent="harvest") as span:
+        if os.path.exists(path):
+            proc = remote_git(clone_url, "-C", path, "fetch", "--quiet", "--prune", "origin")
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            proc = remote_git(clone_url, "clone", "--bare", "--quiet", clone_url, path)
+            if proc.returncode == 0:
+                # Member checkouts borrow objects from here: never let git gc prune them.
+                git("-C", path, "config", "gc.auto", "0")
+                git("-C", path, "config", "gc.pruneExpire", "never")
+                git("-C", path, "config", "remote.origin.fetch", "+refs/heads/*:refs/heads/*")
+        if proc.returncode != 0:
+            span.fail()
+    result["status"] = "ok" if proc.returncode == 0 else "failed"
+    if proc.returncode != 0:
+        result["error"] = proc.stderr.strip()[-500:]
+    return result
+
+def list_references(target_dir: str) -> List[str]:
+    objects_dir = os.path.join(target_dir, OBJECTS_DIR)
+    if not os.path.isdir(objects_dir):
+        return []
+    return sorted(os.path.join(objects_dir, name) for name in os.listdir(objects_dir) if name.endswith(".git"))
+
+def repack_reference(path: str) -> bool:
+    """
+    Repacks a shared reference into one pack.
+
+    --keep-unreachable keeps objects no ref points to anymore, because a
+    member checkout may still depend on them through its alternates file.
+    """
+    proc = git("-C", path, "repack", "-a", "-d", "--keep-unreachable", "--quiet")
+    return proc.returncode == 0
+
+def alternates_file(repo_path: str) -> str:
+    return os.path.join(repo_path, ".git", "objects", "info", "alternates")
+
+def dissociate(repo_path: str) -> bool:
+    """
+    Copies borrowed objects into the checkout and drops its alternates link.
+
+    The alternates file is only removed after a full repack succeeded, and it
+    is restored if the repository is not connected without it.
+    """
+    alternates = alternates_file(repo_path)
+    if not os.path.exists(alternates):
+        return True
+    if git("-C", repo_path, "repack", "-a", "-d", "--quiet").returncode != 0:
+        return False
+    backup = alternates + ".bak"
+    os.replace(alternates, backup)
+    if git("-C", repo_path, "fsck", "--connectivity-only", "--no-progress").returncode != 0:
+        os.replace(backup, alternates)
+        return False
+    os.remove(backup)
+    return True
+
+def borrowing_checkouts(target_dir: str) -> List[str]:
+    """Lists harvested checkouts that borrow objects through an alternates file."""
+    paths = []
+    for name in sorted(os.listdir(target_dir)):
+        path = os.path.join(target_dir, name)
+        if name != OBJECTS_DIR and os.path.exists(alternates_file(path)):
+            paths.append(path)
+    return paths
@@ -1,40 +1,257 @@
+import argparse
 import json
+import logging
 import os
-import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence
 
-def bulk_harvest():
+import fork_store
+import manifest_store
+from atomic_file import save_json
+from metrics import host_of, metrics
+
+MANIFEST_FILE = "glaciereq_manifest.json"
+RESULTS_FILE = "harvest_results.json"
+DEFAULT_TARGET_DIR = "~/glaciereq_harvest"
+
+def dir_size(path: str) -> int:
+    """Returns the total size in bytes of all files below path."""
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+def clone_args(url: str, repo_path: str, depth: Optional[int], blob_filter: Optional[str],
+               reference: Optional[str] = None) -> List[str]:
+    args = ["clone", "--quiet"]
+    if reference:
+        args += ["--reference-if-able", reference]
+    if depth:
+        args += ["--depth", str(depth), "--no-single-branch"]
+    if blob_filter:
+        args += [f"--filter={blob_filter}"]
+    return args + [url, repo_path]
+
+def fetch_args(repo_path: str, depth: Optional[int]) -> List[str]:
+    args = ["-C", repo_path, "fetch", "--quiet", "--prune"]
+    if depth:
+        args += ["--depth", str(depth)]
+    return args
+
+def fast_forward_args(repo_path: str) -> List[str]:
+    # Moves HEAD and the working tree to the fetched upstream; refuses if they diverged.
+    return ["-C", repo_path, "merge", "--ff-only", "--quiet", "@{u}"]
+
+def harvest_repo(repo: Dict, target_dir: str, depth: Optional[int] = None,
+                 blob_filter: Optional[str] = None, update: bool = True,
+                 reference: Optional[str] = None) -> Dict:
+    """
+    Clones one repository, or fetches and fast-forwards it if a checkout
+    already exists. A checkout that cannot be fast-forwarded (local commits,
+    or no upstream branch) is reported as failed and left as it is.
+
+    Only fresh clones are measured ("bytes"); walking every existing checkout
+    would make each incremental run a full disk scan.
+
+    With a reference repository the clone borrows its objects through
+    alternates instead of downloading them again.
+    """
+    name = repo['name']
+    url = repo['url']
+    repo_path = os.path.join(target_dir, name)
+    result = {"name": name, "url": url, "path": repo_path}
+    started = time.monotonic()
+
+    if os.path.exists(os.path.join(repo_path, ".git")):
+        if not update:
+            result["action"] = "skip"
+            result["status"] = "skipped"
+        else:
+            result["action"] = "fetch"
+            command = fetch_args(repo_path, depth)
+    elif os.path.exists(repo_path):
+        result["action"] = "skip"
+        result["status"] = "failed"
+        result["error"] = "Path exists but is not a git checkout"
+    else:
+        result["action"] = "clone"
+        command = clone_args(url, repo_path, depth, blob_filter, reference)
+
+    if reference:
+        result["reference"] = reference
+    if "status" not in result:
+        with metrics.span("git." + result["action"], host=host_of(url), agent="harvest") as span:
+            proc = fork_store.remote_git(url, *command)
+            if proc.returncode == 0 and result["action"] == "fetch":
+                proc = fork_store.git(*fast_forward_args(repo_path))
+                if proc.returncode != 0:
+                    proc.stderr = "Cannot fast-forward: " + proc.stderr.strip()
+            if proc.returncode == 0:
+                result["status"] = "ok"
+            else:
+                span.fail()
+                result["status"] = "failed"
+                result["error"] = proc.stderr.strip()[-500:]
+
+    result["duration"] = round(time.monotonic() - started, 3)
+    if result["action"] == "clone" and result["status"] == "ok":
+        result["bytes"] = dir_size(repo_path)
+    return result
+
+def load_results(path: str) -> Dict[str, Dict]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return {r["name"]: r for r in json.load(f)}
+
+def save_results(path: str, results: Dict[str, Dict]):
+    save_json(path, sorted(results.values(), key=lambda r: r["name"]))
+
+def prepare_references(repos: List[Dict], target_dir: str, workers: int, min_group: int) -> Dict[str, str]:
+    """Creates one shared reference per fork group; returns {repo url: reference path}."""
+    upstreams = fork_store.resolve_upstreams(repos, workers)
+    groups = fork_store.group_by_upstream(repos, upstreams, min_group)
+    print(f"🧬 {len(groups)} fork groups share objects ({sum(len(m) for m in groups.values())} repos).")
+
+    references = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(fork_store.ensure_reference, target_dir, upstream, upstreams[members[0]["url"]]["clone_url"]): members
+            for upstream, members in groups.items()
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            if result["status"] != "ok":
+                print(f"⚠️  Reference for {result['upstream']} failed, members clone standalone: {result.get('error', '')}")
+                continue
+            for repo in futures[future]:
+                references[repo["url"]] = result["path"]
+    return references
+
+def repack_shared(target_dir: str = DEFAULT_TARGET_DIR):
+    """Repacks every shared reference without dropping objects members may borrow."""
+    target_dir = os.path.expanduser(target_dir)
+    for path in fork_store.list_references(target_dir):
+        status = "✅" if fork_store.repack_reference(path) else "❌"
+        print(f"{status} Repacked {os.path.basename(path)}")
+
+def dissociate_all(target_dir: str = DEFAULT_TARGET_DIR):
+    """Makes every checkout self-contained so the shared references can be deleted."""
+    target_dir = os.path.expanduser(target_dir)
+    for path in fork_store.borrowing_checkouts(target_dir):
+        status = "✅" if fork_store.dissociate(path) else "❌"
+        print(f"{status} Dissociated {os.path.basename(path)}")
+
+def bulk_harvest(workers: int = 8, depth: Optional[int] = None, blob_filter: Optional[str] = None,
+                 update: bool = True, retry_failed: bool = False, shared_objects: bool = False,
+                 min_group: int = 2, target_dir: str = DEFAULT_TARGET_DIR, results_file: str = RESULTS_FILE,
+                 store_path: Optional[str] = None, query: Optional[Dict] = None):
     print("🚜 --- Bulk Harvesting Glaciereq ---")
-    
-    if not os.path.exists("glaciereq_manifest.json"):
+
+    if not os.path.exists(MANIFEST_FILE) and not store_path:
         print("❌ Manifest not found. Run scan_glaciereq.py first.")
         return
 
-    with open("glaciereq_manifest.json", "r") as f:
-        repos = json.load(f)
-        
-    target_dir = os.path.expanduser("~/glaciereq_harvest")
+    if store_path or query:
+        # Select a slice through the indexed store instead of the whole JSON manifest.
+        with manifest_store.open_store(store_path or manifest_store.STORE_FILE, MANIFEST_FILE) as store:
+            repos = store.query(**(query or {}))
+    else:
+        with open(MANIFEST_FILE, "r") as f:
+            repos = json.load(f)
+
+    target_dir = os.path.expanduser(target_dir)
     if not os.path.exists(target_dir):
         os.makedirs(target_dir)
-        
+
+    results = load_results(results_file)
+    if retry_failed:
+        failed = {name for name, r in results.items() if r.get("status") == "failed"}
+        repos = [r for r in repos if r['name'] in failed]
+
     print(f"📂 Target Directory: {target_dir}")
-    print(f"📦 Found {len(repos)} repositories to harvest.")
-    
-    for repo in repos:
-        name = repo['name']
-        url = repo['url']
-        repo_path = os.path.join(target_dir, name)
-        
-        if os.path.exists(repo_path):
-            print(f"⏭️  Skipping {name} (Already exists)")
-        else:
-            print(f"⬇️  Cloning {name}...")
-            try:
-                subprocess.run(["git", "clone", url, repo_path], check=True)
-                print(f"✅ Cloned {name}")
-            except subprocess.CalledProcessError:
-                print(f"❌ Failed to clone {name}")
-                
+    print(f"📦 Found {len(repos)} repositories to harvest ({workers} workers).")
+
+    references = prepare_references(repos, target_dir, workers, min_group) if shared_objects else {}
+
+    counts = {"ok": 0, "skipped": 0, "failed": 0}
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(harvest_repo, repo, target_dir, depth, blob_filter, update, references.get(repo['url'])): repo
+                for repo in repos
+            }
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # One broken repo must not lose the results of the others.
+                    repo = futures[future]
+                    result = {"name": repo["name"], "url": repo["url"], "path": os.path.join(target_dir, repo["name"]),
+                              "action": "harvest", "status": "failed", "error": f"{type(e).__name__}: {e}"}
+                previous = results.get(result["name"], {})
+                if "bytes" not in result and "bytes" in previous:
+                    # Not re-measured; keep the size from when it was cloned.
+                    result["bytes"] = previous["bytes"]
+                results[result["name"]] = result
+                counts[result["status"]] += 1
+                if result["status"] == "ok" and result["action"] == "clone":
+                    print(f"✅ Cloned {result['name']} ({result['duration']}s, {result['bytes']} bytes)")
+                elif result["status"] == "ok":
+                    print(f"✅ Updated {result['name']} ({result['duration']}s)")
+                elif result["status"] == "skipped":
+                    print(f"⏭️  Skipping {result['name']} (Already exists)")
+                else:
+                    print(f"❌ Failed to {result['action']} {result['name']}: {result.get('error', '')}")
+    finally:
+        # Also written when interrupted, so the repos finished so far are not lost.
+        save_results(results_file, results)
+    print(f"\n📊 {counts['ok']} ok, {counts['skipped']} skipped, {counts['failed']} failed. Results in {results_file}")
     print("\n✨ Harvest Complete!")
 
+def main(argv: Optional[Sequence[str]] = None):
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Clone or update every repository in the manifest.")
+    parser.add_argument("--workers", type=int, default=8, help="Number of parallel git processes")
+    parser.add_argument("--depth", type=int, help="Shallow clone/fetch depth")
+    parser.add_argument("--filter", dest="blob_filter", help="Partial clone filter, e.g. blob:none")
+    parser.add_argument("--no-update", dest="update", action="store_false",
+                        help="Skip existing checkouts instead of fetching them")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="Only harvest repos that failed in the previous results file")
+    parser.add_argument("--shared-objects", action="store_true",
+                        help="Clone forks of the same upstream against one shared reference repository")
+    parser.add_argument("--min-group", type=int, default=2,
+                        help="Smallest fork group that gets a shared reference")
+    parser.add_argument("--repack-shared", action="store_true",
+                        help="Repack the shared references and exit")
+    parser.add_argument("--dissociate", action="store_true",
+                        help="Copy borrowed objects into every checkout and drop the alternates, then exit")
+    parser.add_argument("--target-dir", default=DEFAULT_TARGET_DIR)
+    parser.add_argument("--results", dest="results_file", default=RESULTS_FILE)
+    parser.add_argument("--store", dest="store_path",
+                        help="Select repositories from this indexed manifest store")
+    manifest_store.add_query_arguments(parser)
+    args = parser.parse_args(argv)
+    metrics.start_from_env()
+
+    if args.repack_shared:
+        repack_shared(args.target_dir)
+    elif args.dissociate:
+        dissociate_all(args.target_dir)
+    else:
+        options = vars(args)
+        del options["repack_shared"], options["dissociate"]
+        query = manifest_store.pop_query_args(options)
+        try:
+            bulk_harvest(**options, query=query)
+        except manifest_store.QueryError as e:
+            parser.error(str(e))
+
 if __name__ == "__main__":
-    bulk_harvest()
+    main()
@@ -0,0 +1,245 @@
+import argparse
+import json
+import os
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from merge_manifest import MANIFEST_FILE, iter_json_array, record_key, save_manifest
+
+STORE_FILE = "glaciereq_manifest.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS repos (
+    rowid INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    url TEXT NOT NULL,
+    description TEXT,
+    fork INTEGER,
+    language TEXT,
+    updated_at TEXT,
+    pushed_at TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS repos_url ON repos (url);
+CREATE INDEX IF NOT EXISTS repos_language ON repos (language, fork, pushed_at);
+CREATE INDEX IF NOT EXISTS repos_pushed ON repos (pushed_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS repos_fts USING fts5 (
+    name, description, content='repos', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS repos_ai AFTER INSERT ON repos BEGIN
+    INSERT INTO repos_fts (rowid, name, description) VALUES (new.rowid, new.name, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS repos_ad AFTER DELETE ON repos BEGIN
+    INSERT INTO repos_fts (repos_fts, rowid, name, description) VALUES ('delete', old.rowid, old.name, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS repos_au AFTER UPDATE ON repos BEGIN
+    INSERT INTO repos_fts (repos_fts, rowid, name, description) VALUES ('delete', old.rowid, old.name, old.description);
+    INSERT INTO repos_fts (rowid, name, description) VALUES (new.rowid, new.name, new.description);
+END;
+"""
+
+class QueryError(ValueError):
+    """A selection the store cannot run, such as a blank full-text query."""
+
+def fts_query(text: str) -> str:
+    """
+    Quotes each whitespace-separated term as an FTS5 string, so code like
+    ``os.path`` or ``foo-bar`` matches as a phrase instead of being parsed as
+    query syntax. A trailing ``*`` keeps a term a prefix search.
+    """
+    terms = []
+    for term in text.split():
+        prefix = term.endswith("*") and len(term) > 1
+        term = term.rstrip("*") if prefix else term
+        terms.append('"' + term.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+def manifest_stamp(path: str) -> str:
+    """Modification time and size of a manifest file, recorded to detect changes since the last import."""
+    st = os.stat(path)
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+class ManifestStore:
+    """
+    The repository manifest in SQLite, indexed by language/fork/push date with
+    a full-text index over name and description.
+
+    Records are the same dicts as in glaciereq_manifest.json; the JSON file stays
+    the interchange format via import_json()/export_json().
+    """
+
+    def __init__(self, path: str = STORE_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def upsert(self, records: Iterable[Dict]) -> int:
+        """Inserts or replaces records by key; returns how many were written."""
+        rows = (
+            (record_key(r), r["name"], r["url"], r.get("description"),
+             None if r.get("fork") is None else int(r["fork"]),
+             r.get("language"), r.get("updated_at"), r.get("pushed_at"), json.dumps(r))
+            for r in records
+        )
+        with self.conn:
+            cursor = self.conn.executemany("""
+                INSERT INTO repos (key, name, url, description, fork, language, updated_at, pushed_at, record)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    name = excluded.name, url = excluded.url, description = excluded.description,
+                    fork = excluded.fork, language = excluded.language, updated_at = excluded.updated_at,
+                    pushed_at = excluded.pushed_at, record = excluded.record
+            """, rows)
+        return cursor.rowcount
+
+    def delete(self, keys: Iterable[str]) -> int:
+        with self.conn:
+            cursor = self.conn.executemany("DELETE FROM repos WHERE key = ?", ((k,) for k in keys))
+        return cursor.rowcount
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM repos").fetchone()[0]
+
+    def query(self, language: Optional[str] = None, fork: Optional[bool] = None,
+              pushed_since: Optional[str] = None, text: Optional[str] = None,
+              limit: Optional[int] = None) -> List[Dict]:
+        """
+        Selects records matching all given filters, ordered by name.
+
+        pushed_since is an ISO date/datetime prefix (e.g. "2026-10-01"); every
+        term of text must occur in the name or description (see fts_query()).
+        """
+        sql = "SELECT repos.record FROM repos"
+        where, params = [], []
+        if text:
+            match = fts_query(text)
+            if not match:
+                raise QueryError(f"empty search query {text!r}")
+            sql += " JOIN repos_fts ON repos_fts.rowid = repos.rowid"
+            where.append("repos_fts MATCH ?")
+            params.append(match)
+        if language is not None:
+            where.append("repos.language = ? COLLATE NOCASE")
+            params.append(language)
+        if fork is not None:
+            where.append("repos.fork = ?")
+            params.append(int(fork))
+        if pushed_since:
+            where.append("repos.pushed_at >= ?")
+            params.append(pushed_since)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY repos.name COLLATE NOCASE"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        try:
+            rows = self.conn.execute(sql, params).fetchall()
+        except sqlite3.OperationalError as e:
+            if not text:
+                raise
+            raise QueryError(f"invalid search query {text!r}: {e}") from e
+        return [json.loads(row["record"]) for row in rows]
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def is_current(self, path: str) -> bool:
+        """Whether the store holds the manifest at path as it is on disk now."""
+        return (self.get_meta("manifest_path") == os.path.abspath(path)
+                and self.get_meta("manifest_stamp") == manifest_stamp(path))
+
+    def mark_imported(self, path: str):
+        """Records the manifest at path as mirrored, so open_store() skips re-importing it."""
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                  [("manifest_path", os.path.abspath(path)), ("manifest_stamp", manifest_stamp(path))])
+
+    def import_json(self, path: str = MANIFEST_FILE, replace: bool = True) -> int:
+        """Loads a manifest JSON file; with replace, records missing from the file are deleted."""
+        with self.conn:
+            if replace:
+                self.conn.execute("DELETE FROM repos")
+            count = self.upsert(iter_json_array(path))
+        self.mark_imported(path)
+        return count
+
+    def export_json(self, path: str = MANIFEST_FILE, **filters) -> int:
+        """Writes the (optionally filtered) records in the manifest JSON format."""
+        records = self.query(**filters)
+        save_manifest(records, path)
+        return len(records)
+
+def add_query_arguments(parser: argparse.ArgumentParser):
+    """Adds the manifest selection flags shared by the ops scripts."""
+    group = parser.add_argument_group("selection")
+    group.add_argument("--language", help="Only repositories with this primary language")
+    group.add_argument("--forks", dest="fork", action="store_true", default=None, help="Only forks")
+    group.add_argument("--no-forks", dest="fork", action="store_false", help="Exclude forks")
+    group.add_argument("--pushed-since", help="Only repositories pushed on or after this ISO date")
+    group.add_argument("--search", dest="text", help="Full-text query over name and description")
+    group.add_argument("--limit", type=int, help="Select at most this many repositories")
+
+QUERY_ARGUMENTS = ["language", "fork", "pushed_since", "text", "limit"]
+
+def pop_query_args(options: Dict) -> Dict:
+    """Removes the selection filters from a vars(args) dict and returns those that are set."""
+    return {name: value for name in QUERY_ARGUMENTS
+            if (value := options.pop(name, None)) is not None}
+
+def open_store(path: str = STORE_FILE, manifest_path: str = MANIFEST_FILE) -> ManifestStore:
+    """
+    Opens the store, first re-importing the JSON manifest if the store is empty
+    or the manifest was modified since it was last imported.
+    """
+    store = ManifestStore(path)
+    if os.path.exists(manifest_path) and (store.count() == 0 or not store.is_current(manifest_path)):
+        store.import_json(manifest_path)
+    return store
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Indexed manifest store.")
+    parser.add_argument("--store", default=STORE_FILE)
+    sub = parser.add_subparsers(dest="command", required=True)
+    import_parser = sub.add_parser("import", help="Replace the store contents with a manifest JSON file")
+    import_parser.add_argument("manifest", nargs="?", default=MANIFEST_FILE)
+    export_parser = sub.add_parser("export", help="Write (a selection of) the store as manifest JSON")
+    export_parser.add_argument("manifest", nargs="?", default=MANIFEST_FILE)
+    add_query_arguments(export_parser)
+    query_parser = sub.add_parser("query", help="Print the selected repositories")
+    add_query_arguments(query_parser)
+    args = parser.parse_args(argv)
+    query = pop_query_args(vars(args))
+
+    with ManifestStore(args.store) as store:
+        try:
+            if args.command == "import":
+                store.import_json(args.manifest)
+                print(f"💾 Imported {store.count()} repositories into {args.store}")
+            elif args.command == "export":
+                count = store.export_json(args.manifest, **query)
+                print(f"💾 Exported {count} repositories to {args.manifest}")
+            else:
+                for repo in store.query(**query):
+                    print(f"- {repo['name']}: {repo.get('description') or 'No description'}")
+        except QueryError as e:
+            parser.error(str(e))
+
+if __name__ == "__main__":
+    main()
@@ -1,71 +1,272 @@
+import argparse
 import asyncio
+import hashlib
+import json
 import logging
-from research_agent import research_agent
-from overleaf_agent import overleaf_agent
+import os
+import re
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from atomic_file import save_json
+from browser_automator import add_har_arguments, configure_har
+from metrics import metrics
+from research_agent import get_research_agent
+from overleaf_agent import get_overleaf_agent
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("master-orchestrator")
 
-async def run_mission(topic: str):
+LATEX_SPECIALS = {
+    "\\": r"\textbackslash{}", "&": r"\&", "%": r"\%", "$": r"\$", "#": r"\#", "_": r"\_",
+    "{": r"\{", "}": r"\}", "~": r"\textasciitilde{}", "^": r"\textasciicircum{}",
+}
+
+def latex_escape(text: str) -> str:
+    """Escapes LaTeX special characters so scraped text is typeset literally."""
+    return "".join(LATEX_SPECIALS.get(char, char) for char in text)
+
+def build_report(topic: str, sources: List[Dict]) -> str:
+    """Renders the LaTeX report for a topic from its summarized sources."""
+    summary = "\n".join(
+        f"\\subsection{{{latex_escape(source['title'])}}}\n{latex_escape(source['summary'])}" for source in sources
+    )
+    topic = latex_escape(topic)
+    return f"""
+        \\documentclass{{article}}
+        \\title{{Research Report: {topic}}}
+        \\author{{Antigravity AI}}
+        \\begin{{document}}
+        \\maketitle
+        \\section{{Introduction}}
+        Automated research findings for {topic}.
+        \\section{{Summary}}
+        {summary}
+        \\end{{document}}
+        """
+
+async def run_mission(topic: str, top_n: int = 10, concurrency: int = 5):
     """
     Executes a full agentic mission:
     1. Research a topic using Comet Browser.
-    2. Summarize the findings.
+    2. Summarize the top N findings in parallel tabs.
     3. (Optional) Create an Overleaf project with the findings.
     """
     print(f"\n🤖 --- AGENTIC MISSION START: {topic} ---")
-    
+    research_agent = get_research_agent()
+
     try:
         # 1. Initialize Browser (Single instance shared by agents)
         # We use research_agent's browser reference which is the singleton browser_automator
-        await research_agent.browser.start(headless=False)
-        
-        # 2. Research Phase
-        print(f"\n🔍 Phase 1: Researching '{topic}'...")
-        results = await research_agent.search_google(topic)
-        
-        if not results:
+        await research_agent.browser.start(headless=False, pool_size=concurrency + 1)
+
+        # 2. Research + Analysis Phase (summaries arrive as each page finishes)
+        print(f"\n🔍 Phase 1: Researching '{topic}' (top {top_n} sources)...")
+        print("\n📖 Phase 2: Analyzing Content...")
+        sources = []
+        async for source in research_agent.research_topic(topic, top_n=top_n, concurrency=concurrency):
+            if "error" in source:
+                print(f"   ⚠️ Skipped {source['url']}: {source['error']}")
+                continue
+            print(f"   Found: {source['title']}")
+            print(f"   URL: {source['url']}")
+            print(f"   Summary: {source['summary'][:200]}...")
+            sources.append(source)
+
+        if not sources:
             print("❌ No results found. Aborting.")
             return
 
-        top_result = results[0]
-        print(f"   Found: {top_result['title']}")
-        print(f"   URL: {top_result['url']}")
-        
-        print("\n📖 Phase 2: Analyzing Content...")
-        summary = await research_agent.summarize_page(top_result['url'])
-        print(f"   Summary: {summary[:200]}...")
-        
         # 3. Report Phase (Simulation)
         print("\n📝 Phase 3: Generating Report...")
-        report = f"""
-        \\documentclass{{article}}
-        \\title{{Research Report: {topic}}}
-        \\author{{Antigravity AI}}
-        \\begin{{document}}
-        \\maketitle
-        \\section{{Introduction}}
-        Automated research findings for {topic}.
-        \\section{{Summary}}
-        {summary}
-        \\end{{document}}
-        """
+        report = build_report(topic, sources)
         print("   LaTeX Report Generated.")
-        
+
         # 4. Overleaf Phase (Optional - requires credentials)
         # await overleaf_agent.login("email", "password")
         # await overleaf_agent.create_project(f"Research: {topic}")
         # await overleaf_agent.inject_latex(report)
-        
+
         print("\n✅ MISSION COMPLETE. I am fully connected to Comet.")
         input("\nPress Enter to close the browser and end the session...")
-        
+
     except Exception as e:
         print(f"\n❌ Mission Failed: {e}")
     finally:
         await research_agent.browser.close()
 
+# --- Batch mode -------------------------------------------------------------
+
+PHASES = ["search", "analyze", "report", "overleaf"]
+
+def mission_slug(topic: str) -> str:
+    """File-system safe, collision-free name for a topic's mission files."""
+    slug = re.sub(r"[^a-z0-9]+", "-", topic.lower()).strip("-")[:60]
+    digest = hashlib.sha1(topic.encode("utf-8")).hexdigest()[:8]
+    return f"{slug}-{digest}"
+
+def load_mission(path: str, topic: str) -> Dict:
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return {"topic": topic, "status": "pending", "phases": {}}
+
+def save_mission(path: str, mission: Dict):
+    save_json(path, mission)
+
+def read_topics(path: str) -> List[str]:
+    """One topic per line; blank lines and '#' comments are ignored."""
+    with open(path, "r") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+async def publish_to_overleaf(topic: str, latex: str, credentials: Tuple[str, str],
+                             project_url: Optional[str] = None,
+                             on_created: Optional[Callable[[str], None]] = None) -> Dict:
+    """
+    Publishes latex to an Overleaf project and compiles it.
+
+    A new project is created unless ``project_url`` names one from an earlier
+    attempt, which is reopened instead; ``on_created`` gets the URL of a new
+    project as soon as it exists.
+    """
+    overleaf_agent = get_overleaf_agent()
+    async with overleaf_agent.browser.acquire_page() as page:
+        await overleaf_agent.login(*credentials, page=page)
+        if project_url:
+            await overleaf_agent.open_project(project_url, page=page)
+        else:
+            project_url = await overleaf_agent.create_project(f"Research: {topic}", page=page)
+            if on_created:
+                on_created(project_url)
+        await overleaf_agent.inject_latex(latex, page=page)
+        compiled = await overleaf_agent.compile_pdf(page=page)
+    return {"status": compiled["status"], "project_url": project_url}
+
+async def run_batch_mission(topic: str, out_dir: str, limits: Dict[str, asyncio.Semaphore], top_n: int,
+                            credentials: Optional[Tuple[str, str]]) -> Dict:
+    """
+    Runs one topic through the phase pipeline.
+
+    Every finished phase is checkpointed to ``<out_dir>/<slug>.json``, so a
+    rerun skips phases that already completed and retries the failed one. An
+    Overleaf project is checkpointed as soon as it is created, so a rerun
+    after a failed compile republishes into it instead of creating another.
+    """
+    research_agent = get_research_agent()
+    path = os.path.join(out_dir, mission_slug(topic) + ".json")
+    mission = load_mission(path, topic)
+    if mission["status"] == "complete":
+        return mission
+    phases = mission["phases"]
+
+    try:
+        if "search" not in phases:
+            async with limits["search"]:
+                results = await research_agent.search_cached(topic)
+            if not results:
+                raise RuntimeError("No search results")
+            phases["search"] = {"results": results[:top_n]}
+            save_mission(path, mission)
+
+        if "analyze" not in phases:
+            sources = [source async for source in
+                       research_agent.summarize_results(phases["search"]["results"], slots=limits["analyze"])]
+            # Only checkpoint a usable analysis, so a rerun reads the sources again.
+            if not any("error" not in source for source in sources):
+                raise RuntimeError("None of the sources could be read")
+            phases["analyze"] = {"sources": sources}
+            save_mission(path, mission)
+
+        if "report" not in phases:
+            sources = [source for source in phases["analyze"]["sources"] if "error" not in source]
+            latex = build_report(topic, sources)
+            tex_path = os.path.join(out_dir, mission_slug(topic) + ".tex")
+            with open(tex_path, "w") as f:
+                f.write(latex)
+            phases["report"] = {"latex": latex, "path": tex_path}
+            save_mission(path, mission)
+
+        if "overleaf" not in phases:
+            if credentials:
+                def created(project_url: str):
+                    mission["overleaf_project"] = {"project_url": project_url}
+                    save_mission(path, mission)
+
+                project_url = mission.get("overleaf_project", {}).get("project_url")
+                async with limits["overleaf"]:
+                    published = await publish_to_overleaf(topic, phases["report"]["latex"], credentials,
+                                                          project_url=project_url, on_created=created)
+                # A project that did not compile is not a finished phase; a rerun publishes again.
+                if published["status"] != "success":
+                    raise RuntimeError(f"Compile status {published['status']} for {published['project_url']}")
+                phases["overleaf"] = published
+            else:
+                phases["overleaf"] = {"status": "skipped"}
+
+        mission["status"] = "complete"
+        mission.pop("error", None)
+        print(f"✅ {topic}")
+    except Exception as e:
+        mission["status"] = "failed"
+        mission["error"] = f"{next((p for p in PHASES if p not in phases), 'done')}: {e}"
+        print(f"❌ {topic}: {mission['error']}")
+
+    save_mission(path, mission)
+    return mission
+
+async def run_batch(topics: List[str], out_dir: str = "missions", top_n: int = 10,
+                    search_concurrency: int = 4, analyze_concurrency: int = 8, overleaf_concurrency: int = 1,
+                    headless: bool = True):
+    """
+    Runs many missions headlessly through the search → analyze → report →
+    overleaf pipeline, with a separate concurrency limit per phase.
+
+    The Overleaf phase runs when OVERLEAF_EMAIL and OVERLEAF_PASSWORD are set.
+    """
+    print(f"\n🤖 --- BATCH MISSION START: {len(topics)} topics ---")
+    os.makedirs(out_dir, exist_ok=True)
+
+    limits = {
+        "search": asyncio.Semaphore(search_concurrency),
+        "analyze": asyncio.Semaphore(analyze_concurrency),
+        "overleaf": asyncio.Semaphore(overleaf_concurrency),
+    }
+    email, password = os.environ.get("OVERLEAF_EMAIL"), os.environ.get("OVERLEAF_PASSWORD")
+    credentials = (email, password) if email and password else None
+
+    research_agent = get_research_agent()
+    await research_agent.browser.start(
+        headless=headless, pool_size=search_concurrency + analyze_concurrency + overleaf_concurrency)
+    try:
+        missions = await asyncio.gather(*(
+            run_batch_mission(topic, out_dir, limits, top_n, credentials) for topic in topics
+        ))
+    finally:
+        await research_agent.browser.close()
+
+    complete = sum(1 for m in missions if m["status"] == "complete")
+    print(f"\n📊 {complete}/{len(missions)} missions complete. Results in {out_dir}/")
+    return missions
+
+def main(argv: Optional[Sequence[str]] = None):
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Run research missions.")
+    parser.add_argument("topic", nargs="?", default="Latest breakthroughs in AI agents",
+                        help="Topic for a single interactive mission")
+    parser.add_argument("--batch", metavar="FILE", help="Run every topic in FILE (one per line) headlessly")
+    parser.add_argument("--out", default="missions", help="Directory for per-mission results and checkpoints")
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--search-concurrency", type=int, default=4)
+    parser.add_argument("--analyze-concurrency", type=int, default=8)
+    parser.add_argument("--overleaf-concurrency", type=int, default=1)
+    add_har_arguments(parser)
+    args = parser.parse_args(argv)
+    configure_har(args)
+    metrics.start_from_env()
+
+    if args.batch:
+        asyncio.run(run_batch(read_topics(args.batch), args.out, args.top_n, args.search_concurrency,
+                              args.analyze_concurrency, args.overleaf_concurrency))
+    else:
+        # Example mission
+        asyncio.run(run_mission(args.topic, args.top_n, args.analyze_concurrency))
+
 if __name__ == "__main__":
-    # Example mission
-    asyncio.run(run_mission("Latest breakthroughs in AI agents"))
+    main()
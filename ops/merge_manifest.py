@@ -1,31 +1,297 @@
+import argparse
 import json
 import os
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
-def create_manifest():
-    repos = []
-    seen_urls = set()
+from atomic_file import save_json
 
-    for filename in ["repos_user.json", "repos_org.json"]:
-        if os.path.exists(filename):
+MANIFEST_FILE = "glaciereq_manifest.json"
+SOURCE_FILES = ["repos_user.json", "repos_org.json"]
+
+# GitHub API fields kept in the manifest; the rest of the API object is dropped.
+MANIFEST_FIELDS = ["id", "node_id", "fork", "language", "updated_at", "pushed_at"]
+# Fields only the listing scan writes (see scan_glaciereq.py); kept when an API record replaces the entry.
+LISTING_FIELDS = ["listed_at"]
+# Characters of a non-array source quoted in the error message.
+PAYLOAD_PREVIEW = 300
+
+def iter_json_array(path: str, chunk_size: int = 1 << 16) -> Iterator[Dict]:
+    """
+    Yields the elements of a top-level JSON array one at a time.
+
+    Only the element being decoded and one read chunk are held in memory, so
+    large API dumps are never materialized as a whole. Elements must be
+    separated by exactly one comma and nothing may follow the closing bracket;
+    a corrupt array raises ValueError instead of yielding a partial list.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r") as f:
+        buffer = ""
+        pos = 0
+        eof = False
+
+        def fill() -> bool:
+            nonlocal buffer, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            return True
+
+        def skip_whitespace():
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                    pos += 1
+                if pos < len(buffer) or not fill():
+                    return
+
+        skip_whitespace()
+        if pos >= len(buffer):
+            raise ValueError(f"{path} is empty")
+        if buffer[pos] != "[":
+            # Usually an API error object ({"message": "Not Found", ...}); show it.
+            rest = buffer[pos:] + f.read(chunk_size)
             try:
-                with open(filename, "r") as f:
-                    data = json.load(f)
-                    if isinstance(data, list):
-                        for r in data:
-                            if r["html_url"] not in seen_urls:
-                                repos.append({
-                                    "name": r["name"],
-                                    "url": r["html_url"],
-                                    "description": r.get("description", "No description")
-                                })
-                                seen_urls.add(r["html_url"])
-            except Exception as e:
-                print(f"Error reading {filename}: {e}")
-
-    print(f"Found {len(repos)} unique repositories.")
-    
-    with open("glaciereq_manifest.json", "w") as f:
-        json.dump(repos, f, indent=2)
+                payload = json.dumps(decoder.raw_decode(rest)[0])
+            except ValueError:
+                payload = rest
+            raise ValueError(f"{path} does not contain a JSON array: {payload[:PAYLOAD_PREVIEW]}")
+        pos += 1
+
+        # True right after "[" or ",", where the next token must be an element.
+        expect_element = True
+        count = 0
+        while True:
+            skip_whitespace()
+            if pos >= len(buffer):
+                raise ValueError(f"Unexpected end of {path}")
+            char = buffer[pos]
+            if char == "]":
+                if expect_element and count:
+                    raise ValueError(f"Trailing comma after element {count} of {path}")
+                pos += 1
+                skip_whitespace()
+                if pos < len(buffer):
+                    raise ValueError(f"Unexpected data after the array in {path}: "
+                                     f"{buffer[pos:pos + PAYLOAD_PREVIEW]}")
+                return
+            if not expect_element:
+                if char != ",":
+                    raise ValueError(f"Missing comma after element {count} of {path}")
+                pos += 1
+                expect_element = True
+                continue
+            if char == ",":
+                raise ValueError(f"Missing element {count + 1} of {path}")
+            while True:
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # The element continues past the end of the buffer.
+                    if eof or not fill():
+                        raise
+                    continue
+                # A number cut by the buffer edge ("-4." of "-4.5") still decodes; read on.
+                truncated = end == len(buffer) or (
+                    isinstance(item, (int, float)) and buffer[end] not in ",] \t\r\n")
+                if truncated and not eof and fill():
+                    continue
+                break
+            pos = end
+            expect_element = False
+            count += 1
+            yield item
+
+def record_key(record: Dict) -> str:
+    """Stable identity of a repository: the GraphQL node id, the numeric id, or the URL for legacy entries."""
+    if record.get("node_id"):
+        return record["node_id"]
+    if record.get("id") is not None:
+        return str(record["id"])
+    return record["url"]
+
+def manifest_record(api_record: Dict) -> Dict:
+    record = {
+        "name": api_record["name"],
+        "url": api_record["html_url"],
+        "description": api_record.get("description", "No description"),
+    }
+    for field in MANIFEST_FIELDS:
+        if field in api_record:
+            record[field] = api_record[field]
+    return record
+
+def is_unchanged(existing: Dict, api_record: Dict) -> bool:
+    return (existing.get("updated_at") is not None
+            and existing.get("updated_at") == api_record.get("updated_at")
+            and existing.get("pushed_at") == api_record.get("pushed_at"))
+
+def load_manifest(path: str = MANIFEST_FILE) -> List[Dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        return json.load(f)
+
+def save_manifest(repos: List[Dict], path: str = MANIFEST_FILE):
+    save_json(path, repos)
+
+class ManifestIndex:
+    """The manifest keyed by repository id, with a URL index for entries written before ids were stored."""
+
+    def __init__(self, repos: List[Dict]):
+        self.records: Dict[str, Dict] = {}
+        self.by_url: Dict[str, str] = {}
+        # Keys written or removed since loading, for mirroring into the store.
+        self.dirty = set()
+        self.removed = set()
+        for repo in repos:
+            self._put(record_key(repo), repo)
+
+    def _put(self, key: str, record: Dict):
+        self.records[key] = record
+        self.by_url[record["url"]] = key
+
+    def find(self, key: str, url: str) -> Tuple[Optional[str], Optional[Dict]]:
+        if key in self.records:
+            return key, self.records[key]
+        legacy_key = self.by_url.get(url)
+        if legacy_key is not None:
+            return legacy_key, self.records[legacy_key]
+        return None, None
+
+    def upsert(self, api_record: Dict) -> Tuple[str, str]:
+        """Applies one API record; returns (key, "added" | "changed" | "unchanged")."""
+        new_key = record_key(api_record)
+        old_key, existing = self.find(new_key, api_record["html_url"])
+        if existing is not None and is_unchanged(existing, api_record):
+            return old_key, "unchanged"
+        record = manifest_record(api_record)
+        for field in LISTING_FIELDS:
+            if existing is not None and field in existing:
+                record[field] = existing[field]
+        if old_key is not None:
+            # Also upgrades URL-keyed legacy entries to their id.
+            self.remove(old_key)
+        self._put(new_key, record)
+        self.dirty.add(new_key)
+        return new_key, "added" if existing is None else "changed"
+
+    def update_listing(self, listing: Dict) -> Tuple[str, str]:
+        """
+        Applies one scraped listing entry (name, url, description, listed_at).
+
+        Listings carry no id, so they are matched by URL and merged into the
+        existing record; returns (key, "added" | "changed" | "unchanged").
+        """
+        key, existing = self.find(listing["url"], listing["url"])
+        if existing is not None:
+            if all(existing.get(field) == value for field, value in listing.items()):
+                return key, "unchanged"
+            existing.update(listing)
+            self.dirty.add(key)
+            return key, "changed"
+        self._put(listing["url"], dict(listing))
+        self.dirty.add(listing["url"])
+        return listing["url"], "added"
+
+    def remove(self, key: str):
+        record = self.records.pop(key)
+        self.by_url.pop(record["url"], None)
+        self.dirty.discard(key)
+        self.removed.add(key)
+
+    def values(self) -> List[Dict]:
+        return list(self.records.values())
+
+def merge_sources(index: ManifestIndex, sources: List[str], prune: bool = True) -> Dict[str, int]:
+    """Streams the API dumps into the index and returns added/changed/unchanged/removed counts."""
+    counts = {"added": 0, "changed": 0, "unchanged": 0, "removed": 0}
+    seen = set()
+    complete = True
+
+    for filename in sources:
+        if not os.path.exists(filename):
+            # Its repositories were not seen, so they must not be pruned.
+            print(f"Source {filename} not found, skipping pruning.")
+            complete = False
+            continue
+        try:
+            for api_record in iter_json_array(filename):
+                if not isinstance(api_record, dict) or "html_url" not in api_record:
+                    continue
+                key = record_key(api_record)
+                if key in seen:
+                    continue
+                key, status = index.upsert(api_record)
+                seen.add(key)
+                counts[status] += 1
+        except Exception as e:
+            print(f"Error reading {filename}, skipping pruning: {e}")
+            complete = False
+
+    # Only drop entries when every source was read; a truncated dump must not wipe the manifest.
+    if prune and complete:
+        for key in [k for k in index.records if k not in seen]:
+            index.remove(key)
+            counts["removed"] += 1
+    return counts
+
+def create_manifest(sources: List[str] = SOURCE_FILES, manifest_path: str = MANIFEST_FILE, prune: bool = True,
+                    store_path: Optional[str] = None, subset_path: Optional[str] = None,
+                    query: Optional[Dict] = None):
+    """
+    Merges the sources into the manifest JSON and, with store_path, mirrors
+    the same changes into the indexed store. With subset_path, the records
+    matching query are additionally written there as manifest JSON.
+    """
+    index = ManifestIndex(load_manifest(manifest_path))
+    counts = merge_sources(index, sources, prune)
+
+    print(f"Found {len(index.records)} unique repositories "
+          f"({counts['added']} added, {counts['changed']} changed, "
+          f"{counts['unchanged']} unchanged, {counts['removed']} removed).")
+
+    modified = bool(counts["added"] or counts["changed"] or counts["removed"])
+    if not (store_path or subset_path):
+        if modified:
+            save_manifest(index.values(), manifest_path)
+        return counts
+
+    from manifest_store import STORE_FILE, open_store
+    # Opened before the manifest is rewritten, so the store mirrors the previous
+    # manifest and only the changes need applying rather than a full re-import.
+    with open_store(store_path or STORE_FILE, manifest_path) as store:
+        store.delete(index.removed)
+        store.upsert(index.records[key] for key in index.dirty)
+        if modified:
+            save_manifest(index.values(), manifest_path)
+            store.mark_imported(manifest_path)
+        if subset_path:
+            count = store.export_json(subset_path, **(query or {}))
+            print(f"Wrote {count} selected repositories to {subset_path}.")
+    return counts
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Merge GitHub API repository dumps into the manifest.")
+    parser.add_argument("sources", nargs="*", default=SOURCE_FILES)
+    parser.add_argument("--manifest", dest="manifest_path", default=MANIFEST_FILE)
+    parser.add_argument("--keep-removed", dest="prune", action="store_false",
+                        help="Keep manifest entries that no longer appear in any source")
+    parser.add_argument("--store", dest="store_path",
+                        help="Also apply the changes to this indexed manifest store")
+    parser.add_argument("--subset", dest="subset_path",
+                        help="Write the repositories matching the selection flags to this JSON file")
+    from manifest_store import QueryError, add_query_arguments, pop_query_args
+    add_query_arguments(parser)
+    options = vars(parser.parse_args(argv))
+    query = pop_query_args(options)
+    try:
+        create_manifest(**options, query=query)
+    except QueryError as e:
+        parser.error(str(e))
 
 if __name__ == "__main__":
-    create_manifest()
+    main()
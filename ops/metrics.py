@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import atexit
+import bisect
+import contextvars
+import functools
+import logging
+import os
+import re
+import threading
+import time
+import urllib.parse
+from collections import deque
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from atomic_file import save_json
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+# Upper bounds (seconds) of the latency histogram buckets.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Recent samples kept per series for percentile estimates.
+RESERVOIR_SIZE = 2048
+
+logger = logging.getLogger("metrics")
+
+# Agent name attached to spans recorded below a @metrics.timed(..., agent=...) call.
+current_agent: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_agent", default=None)
+
+def host_of(url: Optional[str]) -> str:
+    try:
+        return urllib.parse.urlsplit(url or "").hostname or "-"
+    except ValueError:
+        return "-"
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class _Series:
+    __slots__ = ("count", "errors", "total", "min", "max", "buckets", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.samples = deque(maxlen=RESERVOIR_SIZE)
+
+    def add(self, seconds: float, error: bool):
+        self.count += 1
+        self.errors += error
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.samples.append(seconds)
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted samples."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def fail(self):
+        pass
+
+_NOOP_SPAN = _NoopSpan()
+
+class _Span:
+    __slots__ = ("metrics", "key", "started", "failed")
+
+    def __init__(self, metrics: "Metrics", key: Tuple):
+        self.metrics = metrics
+        self.key = key
+        self.failed = False
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics._record(self.key, time.perf_counter() - self.started, self.failed or exc_type is not None)
+        return False
+
+    def fail(self):
+        """Counts the sample as an error without raising (e.g. a non-zero exit status)."""
+        self.failed = True
+
+class Metrics:
+    """
+    Timing spans with per-series histograms for the ops hot paths.
+
+    Disabled by default: ``span()`` then hands back a shared no-op context
+    manager, so instrumented code pays one attribute check. Enable with
+    ``UDC_METRICS=1`` (or ``enable()``). ``UDC_METRICS_FILE`` writes a JSON
+    snapshot at exit and ``UDC_METRICS_PORT`` serves Prometheus text format
+    on ``/metrics``; both only take effect once an entry point calls
+    ``start_from_env()``, so importing the module never binds a port.
+    """
+
+    def __init__(self):
+        self.enabled = os.environ.get("UDC_METRICS", "").lower() in ("1", "true", "yes")
+        self._series: Dict[Tuple, _Series] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._started = False
+
+    def start_from_env(self):
+        """
+        Registers the ``UDC_METRICS_FILE`` export and serves ``UDC_METRICS_PORT``.
+
+        Called by the CLI ``main()`` functions only, never at import time, so
+        worker processes and concurrent jobs do not fight over the port. A
+        port that is already taken is logged and skipped.
+        """
+        if not self.enabled or self._started:
+            return
+        self._started = True
+        if os.environ.get("UDC_METRICS_FILE"):
+            atexit.register(self.export_json, os.environ["UDC_METRICS_FILE"])
+        if os.environ.get("UDC_METRICS_PORT"):
+            port = int(os.environ["UDC_METRICS_PORT"])
+            try:
+                self.serve(port)
+            except OSError as e:
+                logger.warning(f"⚠️ Not serving metrics on port {port}: {e}")
+
+    def enable(self, enabled: bool = True):
+        self.enabled = enabled
+
+    def span(self, name: str, **tags: Any):
+        """Times the ``with`` block as one sample of ``name``; exceptions count as errors."""
+        if not self.enabled:
+            return _NOOP_SPAN
+        if "agent" not in tags:
+            tags["agent"] = current_agent.get() or "-"
+        return _Span(self, (name, tuple(sorted((k, str(v)) for k, v in tags.items()))))
+
+    def timed(self, name: str, agent: Optional[str] = None):
+        """Decorator for coroutine methods: times each call and tags nested spans with ``agent``."""
+        def decorate(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return await fn(*args, **kwargs)
+                token = current_agent.set(agent) if agent else None
+                try:
+                    with self.span(name):
+                        return await fn(*args, **kwargs)
+                finally:
+                    if token is not None:
+                        current_agent.reset(token)
+            return wrapper
+        return decorate
+
+    def _record(self, key: Tuple, seconds: float, error: bool):
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series()
+            series.add(seconds, error)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """One entry per (name, tags) series with counts and latency percentiles in seconds."""
+        # Spans keep recording while this runs, so copy each series under the lock.
+        with self._lock:
+            items = sorted((key, (s.count, s.errors, s.total, s.min, s.max, list(s.samples)))
+                           for key, s in self._series.items())
+        snapshot = []
+        for (name, tags), (count, errors, total, low, high, samples) in items:
+            samples.sort()
+            snapshot.append({
+                "name": name,
+                "tags": dict(tags),
+                "count": count,
+                "errors": errors,
+                "sum": round(total, 6),
+                "min": round(low, 6),
+                "max": round(high, 6),
+                "mean": round(total / count, 6),
+                "p50": round(percentile(samples, 0.50), 6),
+                "p90": round(percentile(samples, 0.90), 6),
+                "p95": round(percentile(samples, 0.95), 6),
+                "p99": round(percentile(samples, 0.99), 6),
+            })
+        return snapshot
+
+    def export_json(self, path: str):
+        save_json(path, self.snapshot())
+
+    def prometheus_text(self) -> str:
+        """Renders every series as a Prometheus histogram plus an error counter."""
+        with self._lock:
+            items = sorted((key, (s.count, s.errors, s.total, list(s.buckets))) for key, s in self._series.items())
+        # Prometheus wants all samples of a metric family together.
+        families: Dict[str, Tuple[List[str], List[str]]] = {}
+        for (name, tags), (count, errors, total, buckets) in items:
+            metric = "udc_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+            histogram, counter = families.setdefault(metric, ([], []))
+            labels = ",".join(f'{k}="{escape_label(v)}"' for k, v in tags)
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS + (float("inf"),), buckets):
+                cumulative += bucket
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                histogram.append(f'{metric}_seconds_bucket{{{labels}{"," if labels else ""}le="{le}"}} {cumulative}')
+            histogram.append(f"{metric}_seconds_sum{{{labels}}} {total}")
+            histogram.append(f"{metric}_seconds_count{{{labels}}} {count}")
+            counter.append(f"{metric}_errors_total{{{labels}}} {errors}")
+
+        lines = []
+        for metric, (histogram, counter) in families.items():
+            lines.append(f"# TYPE {metric}_seconds histogram")
+            lines.extend(histogram)
+            lines.append(f"# TYPE {metric}_errors_total counter")
+            lines.extend(counter)
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serves the Prometheus text on http://host:port/metrics from a daemon thread."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+metrics = Metrics()
@@ -0,0 +1,166 @@
+import argparse
+import importlib
+import logging
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Sequence
+
+# Subcommand -> (module whose main(argv) runs it, help). A module is only imported when its command runs,
+# so short jobs like `merge` never load the browser stack.
+COMMANDS = {
+    "scan": ("scan_glaciereq", "Scan the repository listing into the manifest (browser)"),
+    "merge": ("merge_manifest", "Merge GitHub API repository dumps into the manifest"),
+    "harvest": ("harvest_glaciereq", "Clone or update every repository in the manifest"),
+    "research": ("master_orchestrator", "Run research missions (browser)"),
+    "overleaf": ("run_overleaf_job", "Create an Overleaf project (browser)"),
+}
+
+def run_command(command: str, argv: Sequence[str]):
+    """Runs a subcommand's module main() with the remaining arguments."""
+    module_name = COMMANDS[command][0]
+    # Usage and errors of the module's parser read "ops.py <command>".
+    sys.argv[0] = f"{os.path.basename(sys.argv[0])} {command}"
+    importlib.import_module(module_name).main(list(argv))
+
+def _size(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+def print_status():
+    """One line per piece of local state: browser daemon, caches, manifest, checkouts, sessions, bridge."""
+    import browser_daemon
+    state = browser_daemon.read_state()
+    info = browser_daemon.health(state["port"]) if state else None
+    if info:
+        print(f"✅ Browser daemon: {info.get('Browser')} at {state['endpoint']}, "
+              f"idle for {browser_daemon.seconds_since_use():.0f}s")
+    else:
+        print("❌ Browser daemon: not running")
+
+    from page_cache import DEFAULT_CACHE_PATH, PageCache
+    if os.path.exists(os.path.expanduser(DEFAULT_CACHE_PATH)):
+        cache = PageCache()
+        cache_info = cache.info()
+        cache.close()
+        print(f"💾 Page cache: {cache_info['entries']} entries, {_size(cache_info['bytes'])}")
+    else:
+        print("💾 Page cache: empty")
+
+    from source_dedupe import DEFAULT_STORE_PATH, FingerprintStore
+    if os.path.exists(os.path.expanduser(DEFAULT_STORE_PATH)):
+        store = FingerprintStore()
+        print(f"🔖 Source fingerprints: {store.count()}")
+        store.close()
+    else:
+        print("🔖 Source fingerprints: none")
+
+    from merge_manifest import MANIFEST_FILE, load_manifest
+    if os.path.exists(MANIFEST_FILE):
+        print(f"📚 Manifest: {len(load_manifest(MANIFEST_FILE))} repositories in {MANIFEST_FILE}")
+    else:
+        print(f"📚 Manifest: {MANIFEST_FILE} not found")
+
+    from harvest_glaciereq import RESULTS_FILE, load_results
+    results = load_results(RESULTS_FILE)
+    if results:
+        counts: Dict[str, int] = {}
+        for result in results.values():
+            status = result.get("status", "unknown")
+            counts[status] = counts.get(status, 0) + 1
+        print("📦 Last harvest: " + ", ".join(f"{count} {status}" for status, count in sorted(counts.items())))
+    else:
+        print("📦 Last harvest: no results")
+
+    from repo_indexer import INDEX_FILE, RepoIndex
+    if os.path.exists(INDEX_FILE):
+        with RepoIndex(INDEX_FILE) as index:
+            totals = index.stats()
+        print(f"🗂️  Repo index: {totals['repos']} repos, {totals['files']} files, {_size(totals['bytes'])}")
+    else:
+        print("🗂️  Repo index: not built")
+
+    from session_store import DEFAULT_SESSION_DIR
+    session_dir = os.path.expanduser(DEFAULT_SESSION_DIR)
+    sessions = [name for name in os.listdir(session_dir) if name.endswith(".state")] if os.path.isdir(session_dir) else []
+    print(f"🔑 Stored Overleaf sessions: {len(sessions)}")
+
+    bridge = os.environ.get("COLAB_BRIDGE_URL")
+    print(f"☁️  Colab bridge: {bridge}" if bridge else "☁️  Colab bridge: COLAB_BRIDGE_URL not set")
+
+def measure_startup(commands: List[str], runs: int) -> List[Dict]:
+    """
+    Wall time of `ops.py <command> --help` in a fresh interpreter, per command.
+
+    --help imports the command's module and builds its parser, then exits, so
+    this is the fixed cost every run of the command pays before doing work.
+    A bare interpreter start is measured first as the baseline.
+    """
+    import statistics
+    import subprocess
+    targets = [("python", [sys.executable, "-c", "pass"])]
+    targets += [(command, [sys.executable, os.path.abspath(__file__), command, "--help"]) for command in commands]
+    results = []
+    for name, argv in targets:
+        timings = []
+        failed = None
+        for _ in range(runs):
+            started = time.perf_counter()
+            proc = subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+            timings.append(time.perf_counter() - started)
+            if proc.returncode != 0:
+                failed = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit code {proc.returncode}"
+                break
+        result = {"command": name, "runs": len(timings), "min": min(timings), "p50": statistics.median(timings)}
+        if failed:
+            result["error"] = failed
+        results.append(result)
+    return results
+
+def save_results(path: str, results: List[Dict]):
+    from atomic_file import save_json
+    save_json(path, {"python": sys.version.split()[0], "results": results})
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="ops.py", description="Unified entry point for the ops jobs.")
+    sub = parser.add_subparsers(dest="command", required=True, metavar="command")
+    for command, (module_name, help_text) in COMMANDS.items():
+        # Only listed here; main() hands these to the module before this parser runs.
+        sub.add_parser(command, help=f"{help_text} [{module_name}.py]", add_help=False)
+    sub.add_parser("status", help="Show browser daemon, cache, manifest, harvest and session state")
+    startup_parser = sub.add_parser("startup", help="Benchmark the startup time of each command")
+    startup_parser.add_argument("commands", nargs="*", default=[*COMMANDS, "status"],
+                                help="Commands to measure (default: all)")
+    startup_parser.add_argument("--runs", type=int, default=10, help="Interpreter starts per command")
+    startup_parser.add_argument("--json", metavar="FILE", help="Write the results to FILE")
+    return parser
+
+def main(argv: Optional[Sequence[str]] = None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    logging.basicConfig(level=logging.INFO)
+    if argv and argv[0] in COMMANDS:
+        run_command(argv[0], argv[1:])
+        return
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "status":
+        print_status()
+        return
+
+    unknown = set(args.commands) - set(COMMANDS) - {"status"}
+    if unknown:
+        parser.error(f"unknown commands: {', '.join(sorted(unknown))}")
+    print(f"⏱️  Startup time over {args.runs} runs (python {sys.version.split()[0]})")
+    results = measure_startup(args.commands, args.runs)
+    for result in results:
+        line = f"   {result['command']:<10} p50 {result['p50'] * 1000:>7.1f} ms  min {result['min'] * 1000:>7.1f} ms"
+        print(line + (f"  ❌ {result['error']}" if "error" in result else ""))
+    if args.json:
+        save_results(args.json, results)
+        print(f"💾 Results saved to {args.json}")
+
+if __name__ == "__main__":
+    main()
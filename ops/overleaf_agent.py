@@ -1,97 +1,368 @@
+from __future__ import annotations
+
 import asyncio
+import json
 import logging
 import os
-from browser_automator import browser_automator
+import time
+import urllib.parse
+import weakref
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+from browser_automator import BrowserAutomator, get_browser_automator
+from metrics import metrics
+from session_store import SessionStore
+
+if TYPE_CHECKING:
+    from playwright.async_api import BrowserContext, Page
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("overleaf-agent")
 
+# Restores a storage state's localStorage entries for the page's origin,
+# without overwriting values the app has set since.
+RESTORE_STORAGE_JS = """(origins) => {
+    const saved = origins.find(entry => entry.origin === location.origin);
+    if (!saved) return;
+    for (const { name, value } of saved.localStorage) {
+        try {
+            if (localStorage.getItem(name) === null) localStorage.setItem(name, value);
+        } catch (e) {}
+    }
+}"""
+
+def restore_storage_script(origins: List[Dict[str, Any]]) -> str:
+    """An init script that restores the localStorage half of a storage state on every page load."""
+    return f"({RESTORE_STORAGE_JS})({json.dumps(origins)})"
+
+# Replaces the span between the common prefix and suffix of the current and new
+# document through the editor API (CodeMirror 6, else Ace). Returns null if
+# neither editor is reachable.
+APPLY_DIFF_JS = """(text) => {
+    const diff = (current) => {
+        const max = Math.min(current.length, text.length);
+        let start = 0;
+        while (start < max && current.charCodeAt(start) === text.charCodeAt(start)) start++;
+        let end = 0;
+        while (end < max - start &&
+               current.charCodeAt(current.length - 1 - end) === text.charCodeAt(text.length - 1 - end)) end++;
+        return { from: start, to: current.length - end, insert: text.slice(start, text.length - end) };
+    };
+
+    const content = document.querySelector('.cm-content');
+    const contentView = content && content.cmView;
+    const view = contentView && ((contentView.rootView && contentView.rootView.view) || contentView.view);
+    if (view && view.state && view.dispatch) {
+        const change = diff(view.state.doc.toString());
+        if (change.from !== change.to || change.insert) {
+            view.dispatch({ changes: { from: change.from, to: change.to, insert: change.insert } });
+        }
+        return { editor: 'codemirror6', from: change.from, removed: change.to - change.from, inserted: change.insert.length };
+    }
+
+    const aceElement = document.querySelector('.ace_editor');
+    if (aceElement && window.ace) {
+        const doc = window.ace.edit(aceElement).getSession().getDocument();
+        const change = diff(doc.getValue());
+        if (change.from !== change.to || change.insert) {
+            const Range = window.ace.require('ace/range').Range;
+            const start = doc.indexToPosition(change.from, 0);
+            const end = doc.indexToPosition(change.to, 0);
+            doc.replace(new Range(start.row, start.column, end.row, end.column), change.insert);
+        }
+        return { editor: 'ace', from: change.from, removed: change.to - change.from, inserted: change.insert.length };
+    }
+    return null;
+}"""
+
 class OverleafAgent:
     """
     Automates Overleaf interactions for fluid document generation.
+
+    Logins are kept as one storage state per account: in memory, shared by
+    every context of the process, and encrypted on disk through
+    ``SessionStore`` for later runs. A stored session is revalidated with a
+    single HTTP request at most every ``session_check_interval`` seconds, and
+    the login form is only submitted when it has expired.
+
+    ``browser`` defaults to the shared BrowserAutomator.
     """
     
-    def __init__(self):
-        self.browser = browser_automator
+    def __init__(self, sessions: Optional[SessionStore] = None, browser: Optional[BrowserAutomator] = None):
+        self.browser = browser or get_browser_automator()
         self.base_url = "https://www.overleaf.com"
-        
-    async def login(self, email: str, password: str):
-        """Logs into Overleaf."""
-        logger.info("🔑 Logging into Overleaf...")
-        await self.browser.navigate(f"{self.base_url}/login")
+        self.sessions = sessions or SessionStore()
+        self.session_check_interval = 300.0
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._validated_at: Dict[str, float] = {}
+        self._session_locks: Dict[str, asyncio.Lock] = {}
+        # Accounts whose localStorage restore script a context already runs; init scripts can't be removed.
+        self._restoring: "weakref.WeakKeyDictionary[BrowserContext, Set[str]]" = weakref.WeakKeyDictionary()
+
+    def _has_live_cookies(self, state: Dict[str, Any]) -> bool:
+        host = urllib.parse.urlsplit(self.base_url).hostname or ""
+        now = time.time()
+        return any(
+            host.endswith(cookie.get("domain", "").lstrip("."))
+            and (cookie.get("expires", -1) < 0 or cookie["expires"] > now)
+            for cookie in state.get("cookies", [])
+        )
+
+    async def _session_context(self, state: Optional[Dict[str, Any]] = None) -> Tuple[BrowserContext, bool]:
+        """
+        A context for session checks and logins, and whether the caller closes it.
+
+        While the browser records a HAR archive this is its recording context,
+        so the traffic lands in the archive; otherwise a fresh context, which
+        replays from the archive in replay mode (see BrowserAutomator.new_context()).
+        """
+        if self.browser.har_mode == "record":
+            if state:
+                await self.browser.context.add_cookies(state["cookies"])
+            return self.browser.context, False
+        if state:
+            return await self.browser.new_context(storage_state=state), True
+        return await self.browser.new_context(), True
+
+    async def _session_is_valid(self, state: Dict[str, Any]) -> bool:
+        """
+        Cheap check: the project list answers 200 instead of redirecting to /login.
+
+        Uses a single API request, or under HAR record/replay a page load in a
+        HAR context, since API requests bypass the archive.
+        """
+        if not self._has_live_cookies(state):
+            return False
+        try:
+            if self.browser.har_mode:
+                context, owned = await self._session_context(state)
+                page = await context.new_page()
+                try:
+                    response = await page.goto(f"{self.base_url}/project")
+                    return response is not None and response.status == 200 and "/login" not in page.url
+                finally:
+                    await page.close()
+                    if owned:
+                        await context.close()
+            api = await self.browser.playwright.request.new_context(base_url=self.base_url, storage_state=state)
+            try:
+                response = await api.get("/project", max_redirects=0)
+                return response.status == 200
+            finally:
+                await api.dispose()
+        except Exception as e:
+            logger.warning(f"⚠️ Could not validate the Overleaf session: {e}")
+            return False
+
+    async def _submit_login(self, email: str, password: str, page: Page):
+        await self.browser.navigate(f"{self.base_url}/login", page=page)
         
         # Check if already logged in
-        if "login" not in await self.browser.page.url:
+        if "login" not in page.url:
             logger.info("✅ Already logged in.")
             return
 
-        await self.browser.type('input[name="email"]', email)
-        await self.browser.type('input[name="password"]', password)
-        await self.browser.click('button[type="submit"]')
-        await self.browser.page.wait_for_url("**/project")
+        await self.browser.type('input[name="email"]', email, page=page)
+        await self.browser.type('input[name="password"]', password, page=page)
+        await self.browser.click('button[type="submit"]', page=page)
+        await page.wait_for_url("**/project")
         logger.info("✅ Login successful.")
 
-    async def create_project(self, project_name: str) -> str:
+    async def session_state(self, email: str, password: Optional[str] = None,
+                            refresh: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Returns a valid storage state for the account, logging in only if needed.
+
+        Concurrent callers for the same account wait for one login. Without a
+        ``password`` an expired session returns None instead of logging in.
+        """
+        lock = self._session_locks.setdefault(email, asyncio.Lock())
+        async with lock:
+            state = None if refresh else (self._states.get(email) or self.sessions.load(email))
+            if state is not None:
+                if time.monotonic() - self._validated_at.get(email, float("-inf")) < self.session_check_interval:
+                    return state
+                if await self._session_is_valid(state):
+                    logger.info("🔑 Reusing stored Overleaf session.")
+                    self._states[email] = state
+                    self._validated_at[email] = time.monotonic()
+                    return state
+                logger.info("⌛ Stored Overleaf session expired.")
+                self._states.pop(email, None)
+            if password is None:
+                return None
+
+            logger.info("🔑 Logging into Overleaf...")
+            context, owned = await self._session_context()
+            page = await context.new_page()
+            try:
+                await self._submit_login(email, password, page)
+                state = await context.storage_state()
+            finally:
+                await page.close()
+                if owned:
+                    await context.close()
+            self._states[email] = state
+            self._validated_at[email] = time.monotonic()
+            self.sessions.save(email, state)
+            return state
+
+    @metrics.timed("overleaf.login", agent="overleaf")
+    async def login(self, email: str, password: Optional[str] = None, page: Optional[Page] = None):
+        """
+        Signs the page's context into Overleaf with the account's shared session.
+
+        The state's cookies are added to the context and its localStorage is
+        restored by an init script on the next navigation. That script is
+        installed once per context and account, since the pooled context is
+        shared by every publish. The session is created (see session_state())
+        on first use; raises RuntimeError if it has expired and no password
+        was given.
+        """
+        page = page or self.browser.page
+        state = await self.session_state(email, password)
+        if state is None:
+            raise RuntimeError(f"No valid Overleaf session for {email}; a password is required")
+        await page.context.add_cookies(state["cookies"])
+        restoring = self._restoring.setdefault(page.context, set())
+        if state.get("origins") and email not in restoring:
+            await page.context.add_init_script(script=restore_storage_script(state["origins"]))
+            restoring.add(email)
+        logger.info("✅ Overleaf session attached.")
+
+    def forget_session(self, email: str):
+        """Drops the account's session from memory and disk, e.g. after a password change."""
+        self._states.pop(email, None)
+        self._validated_at.pop(email, None)
+        self.sessions.delete(email)
+
+    @metrics.timed("overleaf.create_project", agent="overleaf")
+    async def create_project(self, project_name: str, page: Optional[Page] = None) -> str:
         """Creates a new blank project and returns its URL."""
+        page = page or self.browser.page
         logger.info(f"✨ Creating project: {project_name}")
-        await self.browser.navigate(f"{self.base_url}/project")
+        await self.browser.navigate(f"{self.base_url}/project", page=page)
         
-        await self.browser.click('button.btn-primary.new-project-button')
-        await self.browser.click('a.menu-item-blank-project')
+        await self.browser.click('button.btn-primary.new-project-button', page=page)
+        await self.browser.click('a.menu-item-blank-project', page=page)
         
         # Wait for modal and type name
-        await self.browser.page.wait_for_selector('input[name="projectName"]')
-        await self.browser.type('input[name="projectName"]', project_name)
-        await self.browser.click('button.btn-primary.modal-create-project-button')
+        await page.wait_for_selector('input[name="projectName"]')
+        await self.browser.type('input[name="projectName"]', project_name, page=page)
+        await self.browser.click('button.btn-primary.modal-create-project-button', page=page)
         
-        await self.browser.page.wait_for_url("**/project/*")
-        project_url = self.browser.page.url
+        await page.wait_for_url("**/project/*")
+        project_url = page.url
         logger.info(f"✅ Project created: {project_url}")
         return project_url
 
-    async def inject_latex(self, latex_code: str):
-        """Injects LaTeX code into the editor."""
+    @metrics.timed("overleaf.open_project", agent="overleaf")
+    async def open_project(self, project_url: str, page: Optional[Page] = None):
+        """Opens an existing project's editor, e.g. to republish into it."""
+        page = page or self.browser.page
+        logger.info(f"📂 Opening project: {project_url}")
+        await self.browser.navigate(project_url, page=page)
+
+    @metrics.timed("overleaf.inject_latex", agent="overleaf")
+    async def inject_latex(self, latex_code: str, page: Optional[Page] = None) -> Dict[str, Any]:
+        """
+        Replaces the editor contents with latex_code.
+
+        Only the changed span (between the common prefix and suffix of the old
+        and new text) is replaced, through the CodeMirror 6 or Ace API. If no
+        editor API is reachable it falls back to select-all and typing.
+        """
+        page = page or self.browser.page
         logger.info("📝 Injecting LaTeX code...")
         
-        # This is tricky in Overleaf's Ace/CodeMirror editor.
-        # We'll try a brute force approach: select all and type.
-        # A better way might be to use the clipboard or specific editor APIs if exposed.
-        
         # Wait for editor to load
-        await self.browser.page.wait_for_selector('.ace_editor')
+        await page.wait_for_selector('.cm-content, .ace_editor')
         
-        # Focus editor
-        await self.browser.click('.ace_editor')
+        change = await page.evaluate(APPLY_DIFF_JS, latex_code)
+        if change:
+            logger.info(f"✅ LaTeX injected via {change['editor']} "
+                        f"(replaced {change['removed']} chars with {change['inserted']} at {change['from']}).")
+            return change
+        
+        # Fallback: brute force select all and type.
+        logger.warning("⚠️ No editor API found, retyping the document.")
+        await self.browser.click('.cm-content, .ace_editor', page=page)
         
         # Select All (Cmd+A / Ctrl+A)
         modifier = "Meta" if os.uname().sysname == "Darwin" else "Control"
-        await self.browser.page.keyboard.press(f"{modifier}+A")
-        await self.browser.page.keyboard.press("Backspace")
+        await page.keyboard.press(f"{modifier}+A")
+        await page.keyboard.press("Backspace")
         
-        # Type new code (chunked to avoid timeouts)
-        await self.browser.page.keyboard.insert_text(latex_code)
+        await page.keyboard.insert_text(latex_code)
         logger.info("✅ LaTeX injected.")
+        return {"editor": "keyboard", "from": 0, "removed": None, "inserted": len(latex_code)}
+
+    @metrics.timed("overleaf.compile_pdf", agent="overleaf")
+    async def compile_pdf(self, timeout: float = 120.0, page: Optional[Page] = None) -> Dict[str, Any]:
+        """
+        Triggers compilation and waits for the compile request to finish.
 
-    async def compile_pdf(self):
-        """Triggers compilation."""
+        Returns the compile ``status`` reported by Overleaf ("success",
+        "failure", "timedout", ...), the ``output_files`` paths and the
+        compile ``log`` text when Overleaf produced one.
+        """
+        page = page or self.browser.page
         logger.info("⚙️ Compiling PDF...")
-        # Click Recompile button
-        await self.browser.click('.recompile-button')
-        # Wait for compilation to finish (check for logs or success indicator)
-        # This is a simplification; robust waiting would check for the 'compiling' class removal
-        await asyncio.sleep(5) 
-        logger.info("✅ Compilation triggered.")
-
-    async def download_pdf(self, download_path: str):
+        started = time.monotonic()
+        
+        def is_compile_response(response) -> bool:
+            return response.request.method == "POST" and "/compile" in urllib.parse.urlsplit(response.url).path
+        
+        # Click Recompile and wait for the compile request instead of sleeping
+        async with page.expect_response(is_compile_response, timeout=timeout * 1000) as response_info:
+            await self.browser.click('.recompile-button', page=page)
+        response = await response_info.value
+        
+        try:
+            data = await response.json()
+        except Exception:
+            data = {"status": "error" if not response.ok else "unknown"}
+        
+        output_files = data.get("outputFiles") or []
+        log = None
+        log_file = next((f for f in output_files if f.get("path") == "output.log"), None)
+        if log_file and log_file.get("url"):
+            log_response = await page.request.get(urllib.parse.urljoin(self.base_url, log_file["url"]))
+            if log_response.ok:
+                log = await log_response.text()
+        
+        result = {
+            "status": data.get("status", "unknown"),
+            "output_files": [f.get("path") for f in output_files],
+            "log": log,
+            "duration": round(time.monotonic() - started, 3),
+        }
+        if result["status"] == "success":
+            logger.info(f"✅ Compilation finished in {result['duration']}s.")
+        else:
+            logger.warning(f"⚠️ Compilation ended with status '{result['status']}' after {result['duration']}s.")
+        return result
+
+    @metrics.timed("overleaf.download_pdf", agent="overleaf")
+    async def download_pdf(self, download_path: str, page: Optional[Page] = None):
         """Downloads the compiled PDF."""
+        page = page or self.browser.page
         logger.info("⬇️ Downloading PDF...")
-        async with self.browser.page.expect_download() as download_info:
-            await self.browser.click('.pdf-download-btn')
+        async with page.expect_download() as download_info:
+            await self.browser.click('.pdf-download-btn', page=page)
         
         download = await download_info.value
         await download.save_as(download_path)
         logger.info(f"✅ PDF saved to {download_path}")
 
-# Singleton
-overleaf_agent = OverleafAgent()
+_overleaf_agent: Optional[OverleafAgent] = None
+
+def get_overleaf_agent() -> OverleafAgent:
+    """The shared OverleafAgent, created on first use."""
+    global _overleaf_agent
+    if _overleaf_agent is None:
+        _overleaf_agent = OverleafAgent()
+    return _overleaf_agent
+
+def __getattr__(name: str):
+    if name == "overleaf_agent":
+        return get_overleaf_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
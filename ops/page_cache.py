@@ -0,0 +1,125 @@
+import json
+import os
+import sqlite3
+import time
+import urllib.parse
+import zlib
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_PATH = "~/.cache/udc/page_cache.db"
+
+def normalize_url(url: str) -> str:
+    """Canonical cache key form of a URL: lower-case scheme/host, no default port, no fragment, sorted query."""
+    parts = urllib.parse.urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port and not (scheme == "http" and port == 80 or scheme == "https" and port == 443):
+        host = f"{host}:{port}"
+    query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(parts.query, keep_blank_values=True)))
+    return urllib.parse.urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+class PageCache:
+    """
+    Persistent cache for page extractions and search results.
+
+    Entries are zlib-compressed JSON in SQLite, expire after ``ttl`` seconds
+    and are evicted least-recently-used once the stored (compressed) size
+    exceeds ``max_bytes``. The database is opened on first use.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: float = 24 * 3600, max_bytes: int = 256 * 1024 * 1024):
+        self.path = os.path.expanduser(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "writes": 0, "evictions": 0}
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        return self._conn
+
+    @staticmethod
+    def page_key(url: str) -> str:
+        return "page:" + normalize_url(url)
+
+    @staticmethod
+    def search_key(engine: str, query: str) -> str:
+        return f"search:{engine}:" + normalize_query(query)
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self.conn.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.stats["misses"] += 1
+            return None
+        value, created = row
+        now = time.time()
+        if now - created > self.ttl:
+            with self.conn:
+                self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return None
+        with self.conn:
+            self.conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        self.stats["hits"] += 1
+        return json.loads(zlib.decompress(value))
+
+    def put(self, key: str, value: Any):
+        blob = zlib.compress(json.dumps(value).encode("utf-8"), 6)
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now, now),
+            )
+        self.stats["writes"] += 1
+        self._evict()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        with self.conn:
+            for key, size in self.conn.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+                self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.stats["evictions"] += 1
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM entries")
+
+    def info(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process plus the current on-disk footprint."""
+        count, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+            "entries": count,
+            "bytes": size,
+        }
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
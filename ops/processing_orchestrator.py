@@ -0,0 +1,407 @@
+import abc
+import asyncio
+import contextlib
+import http.client
+import importlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import select
+import time
+import traceback
+import urllib.parse
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger("processing-orchestrator")
+
+# Modules imported once per worker, so snippets don't pay for them.
+DEFAULT_PRELOAD = ("json", "re", "math", "statistics", "collections", "itertools", "datetime")
+# Captured stdout/stderr beyond this many characters is cut off.
+MAX_OUTPUT_CHARS = 1_000_000
+# Attempts to start a replacement worker before the pool gives up on it.
+SPAWN_ATTEMPTS = 3
+
+def make_result(status: str, stdout: str = "", stderr: str = "", error: Optional[str] = None,
+                duration: float = 0.0, backend: str = "local") -> Dict[str, Any]:
+    """The result dict every backend returns; status is "success", "error" or "timeout"."""
+    return {
+        "status": status,
+        "stdout": stdout,
+        "stderr": stderr,
+        "error": error,
+        "duration": round(duration, 3),
+        "backend": backend,
+    }
+
+def _cap(text: str) -> str:
+    if len(text) > MAX_OUTPUT_CHARS:
+        return text[:MAX_OUTPUT_CHARS] + f"\n... [{len(text) - MAX_OUTPUT_CHARS} characters truncated]"
+    return text
+
+def _run_snippet(code: str, preloaded: Dict[str, Any]) -> Dict[str, Any]:
+    stdout, stderr = io.StringIO(), io.StringIO()
+    namespace = {"__name__": "__main__", **preloaded}
+    started = time.monotonic()
+    status, error = "success", None
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            exec(compile(code, "<snippet>", "exec"), namespace)
+        except MemoryError:
+            status, error = "error", "MemoryError: the snippet exceeded the worker memory limit"
+        except BaseException as e:
+            # Drop this function's frame so the traceback starts in the snippet.
+            status, error = "error", "".join(traceback.format_exception(type(e), e, e.__traceback__.tb_next))
+    return make_result(status, _cap(stdout.getvalue()), _cap(stderr.getvalue()), error,
+                       time.monotonic() - started)
+
+def _worker_main(conn, preload: Sequence[str], memory_limit_mb: Optional[int]):
+    """Worker process: applies the memory limit, imports the preload modules, then runs snippets until told to stop."""
+    if memory_limit_mb and resource is not None:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    preloaded = {}
+    for name in preload:
+        try:
+            preloaded[name.split(".")[0]] = importlib.import_module(name.split(".")[0])
+            importlib.import_module(name)
+        except ImportError:
+            pass
+    conn.send("ready")
+    while True:
+        try:
+            code = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if code is None:
+            break
+        conn.send(_run_snippet(code, preloaded))
+
+class _Worker:
+    def __init__(self, ctx, preload: Sequence[str], memory_limit_mb: Optional[int]):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, tuple(preload), memory_limit_mb),
+                                   daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def wait_ready(self, timeout: float):
+        if not self.conn.poll(timeout) or self.conn.recv() != "ready":
+            self.kill()
+            raise RuntimeError("Worker process failed to start")
+
+    def run(self, code: str, timeout: float) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Runs one snippet: ("ok", result), or ("timeout"|"died", None) after which the worker is unusable."""
+        try:
+            self.conn.send(code)
+            if not self.conn.poll(timeout):
+                return "timeout", None
+            return "ok", self.conn.recv()
+        except (EOFError, OSError):
+            return "died", None
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=2)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=2)
+        self.conn.close()
+
+class ExecutionBackend(abc.ABC):
+    """Interface for execution backends: run ``code`` and return a make_result() dict."""
+    name = "base"
+
+    @abc.abstractmethod
+    async def execute(self, code: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        ...
+
+    async def close(self):
+        pass
+
+class LocalProcessBackend(ExecutionBackend):
+    """
+    Runs snippets in a pool of warm worker processes.
+
+    Workers are spawned once (on first use) with ``preload`` already imported
+    and an address-space limit of ``memory_limit_mb`` (RLIMIT_AS; not enforced
+    on macOS). Each snippet gets a fresh namespace with the preloaded modules
+    and its stdout/stderr captured. A snippet that runs past its timeout or
+    kills its worker gets a "timeout"/"error" result and the worker is
+    replaced; workers are also recycled after ``max_tasks`` snippets.
+    """
+    name = "local"
+
+    def __init__(self, workers: int = max(1, min(4, os.cpu_count() or 1)), preload: Sequence[str] = DEFAULT_PRELOAD,
+                 timeout: float = 60.0, memory_limit_mb: Optional[int] = 2048, max_tasks: int = 200):
+        self.workers = workers
+        self.preload = tuple(preload)
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.max_tasks = max_tasks
+        # spawn: the parent runs an event loop and threads, which fork doesn't copy safely.
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle: Optional[asyncio.Queue] = None
+        self._all: List[_Worker] = []
+        self._start_lock: Optional[asyncio.Lock] = None
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker(self._ctx, self.preload, self.memory_limit_mb)
+        worker.wait_ready(timeout=60)
+        self._all.append(worker)
+        return worker
+
+    async def start(self):
+        """Starts the worker pool; called automatically by the first execute()."""
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._idle is not None:
+                return
+            started = time.monotonic()
+            idle = asyncio.Queue()
+            spawned = await asyncio.gather(*(asyncio.to_thread(self._spawn) for _ in range(self.workers)),
+                                           return_exceptions=True)
+            workers = [worker for worker in spawned if not isinstance(worker, BaseException)]
+            if len(workers) < len(spawned):
+                # Don't leave the workers that did start running outside any pool.
+                for worker in workers:
+                    self._all.remove(worker)
+                    await asyncio.to_thread(worker.kill)
+                raise next(error for error in spawned if isinstance(error, BaseException))
+            for worker in workers:
+                idle.put_nowait(worker)
+            self._idle = idle
+            logger.info(f"🔥 {self.workers} warm worker(s) ready in {time.monotonic() - started:.2f}s")
+
+    async def _replace(self, worker: _Worker) -> bool:
+        """Kills a worker and starts another in its place; False if no replacement could be started."""
+        idle = self._idle
+        if worker in self._all:
+            self._all.remove(worker)
+        await asyncio.to_thread(worker.kill)
+        for attempt in range(1, SPAWN_ATTEMPTS + 1):
+            try:
+                replacement = await asyncio.to_thread(self._spawn)
+            except Exception as e:
+                logger.warning(f"⚠️ Replacement worker failed to start (attempt {attempt}/{SPAWN_ATTEMPTS}): {e}")
+                if attempt < SPAWN_ATTEMPTS:
+                    await asyncio.sleep(attempt)
+                continue
+            if self._idle is not idle:
+                # The pool was reset meanwhile; its next start() spawns a full set.
+                self._all.remove(replacement)
+                await asyncio.to_thread(replacement.stop)
+            else:
+                idle.put_nowait(replacement)
+            return True
+        logger.error(f"❌ Worker pool shrank to {len(self._all)} of {self.workers} worker(s)")
+        if not self._all and self._idle is idle:
+            # Wake the callers waiting for a worker (each passes the None on);
+            # the next execute() starts the pool afresh.
+            self._idle = None
+            idle.put_nowait(None)
+        return False
+
+    async def execute(self, code: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        await self.start()
+        timeout = timeout if timeout is not None else self.timeout
+        idle = self._idle
+        worker = await idle.get()
+        if worker is None:
+            idle.put_nowait(None)
+            return make_result("error", error="No worker process is running; the pool could not be restarted")
+        started = time.monotonic()
+        try:
+            outcome, result = await asyncio.to_thread(worker.run, code, timeout)
+        except BaseException:
+            # Cancelled mid-task: the worker may still be busy with the snippet.
+            await self._replace(worker)
+            raise
+        if outcome != "ok":
+            # The snippet's result is returned even if no replacement starts.
+            await self._replace(worker)
+            if outcome == "timeout":
+                return make_result("timeout", error=f"Timed out after {timeout}s",
+                                   duration=time.monotonic() - started)
+            return make_result("error", error=f"Worker exited with code {worker.process.exitcode}",
+                               duration=time.monotonic() - started)
+        worker.tasks += 1
+        if worker.tasks >= self.max_tasks:
+            await self._replace(worker)
+        else:
+            idle.put_nowait(worker)
+        return result
+
+    async def close(self):
+        workers, self._all, self._idle = self._all, [], None
+        await asyncio.gather(*(asyncio.to_thread(worker.stop) for worker in workers))
+
+class HTTPBridgeBackend(ExecutionBackend):
+    """
+    Runs snippets on a remote bridge (e.g. a Colab notebook) over HTTP.
+
+    The bridge takes ``POST <url>/execute`` with ``{"code", "timeout"}`` and
+    answers with JSON carrying status/stdout/stderr/error. Connections are
+    kept alive and reused across calls. ``url`` and ``token`` default to the
+    ``<ENV_PREFIX>_URL``/``<ENV_PREFIX>_TOKEN`` environment variables at call time.
+    """
+
+    def __init__(self, name: str = "colab", url: Optional[str] = None, token: Optional[str] = None,
+                 env_prefix: str = "COLAB_BRIDGE", timeout: float = 120.0, max_connections: int = 4):
+        self.name = name
+        self._url = url
+        self._token = token
+        self.env_prefix = env_prefix
+        self.timeout = timeout
+        self._connections: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue(max_connections)
+
+    @property
+    def url(self) -> Optional[str]:
+        return self._url or os.environ.get(f"{self.env_prefix}_URL")
+
+    @property
+    def token(self) -> Optional[str]:
+        return self._token or os.environ.get(f"{self.env_prefix}_TOKEN")
+
+    def _connect(self, parts: urllib.parse.SplitResult,
+                 timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        """A kept-alive connection to the bridge if one is usable, else a new one; also says which."""
+        while True:
+            try:
+                connection = self._connections.get_nowait()
+            except queue.Empty:
+                break
+            same_host = (connection.host, connection.port) == (parts.hostname, parts.port or connection.default_port)
+            # An idle socket that is readable has been closed (or poisoned) by the server.
+            if same_host and connection.sock is not None and not select.select([connection.sock], [], [], 0)[0]:
+                connection.timeout = timeout
+                connection.sock.settimeout(timeout)
+                return connection, True
+            connection.close()
+        connection_cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        return connection_cls(parts.hostname, parts.port, timeout=timeout), False
+
+    def _release(self, connection: http.client.HTTPConnection):
+        try:
+            self._connections.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def _post(self, code: str, timeout: float) -> Dict[str, Any]:
+        url = self.url
+        if not url:
+            raise RuntimeError(f"{self.env_prefix}_URL is not set")
+        parts = urllib.parse.urlsplit(url.rstrip("/") + "/execute")
+        body = json.dumps({"code": code, "timeout": timeout}).encode("utf-8")
+        headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+
+        # Executing is not idempotent: only a reused connection that fails while the
+        # request is being sent is retried on a fresh one. Once the request is out,
+        # the bridge may be running the snippet, so later failures are not retried.
+        for attempt in range(2):
+            connection, reused = self._connect(parts, timeout + 10)
+            try:
+                connection.request("POST", path, body=body, headers=headers)
+            except (ConnectionResetError, BrokenPipeError):
+                connection.close()
+                if attempt or not reused:
+                    raise
+                continue
+            except Exception:
+                connection.close()
+                raise
+            try:
+                response = connection.getresponse()
+                data = response.read()
+            except Exception:
+                connection.close()
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(connection)
+            if response.status != 200:
+                raise RuntimeError(f"Bridge answered HTTP {response.status}: {data[:200]!r}")
+            return json.loads(data)
+
+    async def execute(self, code: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        timeout = timeout if timeout is not None else self.timeout
+        started = time.monotonic()
+        try:
+            data = await asyncio.to_thread(self._post, code, timeout)
+        except Exception as e:
+            return make_result("error", error=f"{type(e).__name__}: {e}", duration=time.monotonic() - started,
+                               backend=self.name)
+        return make_result(data.get("status", "error"), data.get("stdout") or "", data.get("stderr") or "",
+                           data.get("error"), data.get("duration", time.monotonic() - started), backend=self.name)
+
+    async def close(self):
+        while True:
+            try:
+                self._connections.get_nowait().close()
+            except queue.Empty:
+                break
+
+class ProcessingOrchestrator:
+    """
+    Routes code execution to a named backend.
+
+    "local" is a warm process pool on this machine, "colab" the HTTP bridge
+    at COLAB_BRIDGE_URL. Every backend returns the same result dict (see
+    make_result()).
+    """
+
+    def __init__(self):
+        self.backends: Dict[str, ExecutionBackend] = {
+            "local": LocalProcessBackend(),
+            "colab": HTTPBridgeBackend(),
+        }
+
+    def register(self, backend: ExecutionBackend, name: Optional[str] = None):
+        self.backends[name or backend.name] = backend
+
+    async def execute_code(self, code: str, backend: str = "local", timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Runs a Python snippet on the backend and returns its status, captured output and duration."""
+        if backend not in self.backends:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {sorted(self.backends)}")
+        logger.info(f"⚙️ Executing snippet on '{backend}'...")
+        result = await self.backends[backend].execute(code, timeout)
+        if result["status"] != "success":
+            logger.warning(f"⚠️ Snippet on '{backend}' ended with status '{result['status']}'")
+        return result
+
+    async def close(self):
+        for backend in self.backends.values():
+            await backend.close()
+
+_processing_orchestrator: Optional[ProcessingOrchestrator] = None
+
+def get_processing_orchestrator() -> ProcessingOrchestrator:
+    """The shared ProcessingOrchestrator, created on first use."""
+    global _processing_orchestrator
+    if _processing_orchestrator is None:
+        _processing_orchestrator = ProcessingOrchestrator()
+    return _processing_orchestrator
+
+def __getattr__(name: str):
+    if name == "processing_orchestrator":
+        return get_processing_orchestrator()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
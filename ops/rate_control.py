@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Iterator, AsyncIterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import asyncio
+
+logger = logging.getLogger("rate-control")
+
+@dataclass(frozen=True)
+class HostPolicy:
+    """
+    Limits for one host.
+
+    Concurrency starts at ``initial`` and moves between ``min_limit`` and
+    ``max_limit``: +1 per window of successful requests, times ``decrease`` on
+    a rate limit or timeout (AIMD). Request starts are spaced at least
+    ``min_interval`` seconds apart. After ``failure_threshold`` consecutive
+    retryable failures the circuit opens and requests fail fast for
+    ``open_seconds``; then one trial request decides whether it closes again.
+    """
+    initial: int = 4
+    min_limit: int = 1
+    max_limit: int = 16
+    decrease: float = 0.5
+    min_interval: float = 0.0
+    failure_threshold: int = 5
+    open_seconds: float = 60.0
+
+class RetryableError(Exception):
+    """
+    Raised by an operation to ask for a retry.
+
+    ``throttle`` marks a rate limit or overload signal (HTTP 429/503) that
+    also shrinks the host's concurrency; ``retry_after`` (seconds) is the
+    minimum wait the server asked for.
+    """
+
+    def __init__(self, message: str, throttle: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.throttle = throttle
+        self.retry_after = retry_after
+
+class CircuitOpenError(Exception):
+    """The host's circuit breaker is open; the request was not attempted."""
+
+# Outcomes of one attempt.
+SUCCESS, THROTTLE, RETRY, FATAL = "success", "throttle", "retry", "fatal"
+
+def classify(error: BaseException) -> str:
+    """Maps an exception to THROTTLE, RETRY or FATAL (not retried)."""
+    import urllib.error
+    if isinstance(error, RetryableError):
+        return THROTTLE if error.throttle else RETRY
+    if isinstance(error, urllib.error.HTTPError):
+        if error.code in (429, 503):
+            return THROTTLE
+        return RETRY if error.code >= 500 else FATAL
+    if isinstance(error, urllib.error.URLError):
+        # DNS failures, refused connections and the like, before any HTTP answer.
+        return RETRY
+    # asyncio/builtin timeouts and Playwright's TimeoutError alike.
+    if isinstance(error, TimeoutError) or type(error).__name__ == "TimeoutError":
+        return THROTTLE
+    if isinstance(error, ConnectionError) or "net::ERR_" in str(error):
+        return RETRY
+    return FATAL
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+class _HostState:
+    def __init__(self, policy: HostPolicy):
+        self.policy = policy
+        self.limit = float(policy.initial)
+        self.in_flight = 0
+        self.next_start = 0.0
+        self.failures = 0
+        self.circuit = "closed"
+        self.open_until = 0.0
+        self.last_decrease = 0.0
+        self.waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+class RateController:
+    """
+    Shared per-host concurrency, backoff and circuit breaking.
+
+    Both git worker threads (``call``/``slot``) and asyncio browser code
+    (``call_async``/``slot_async``) draw from the same per-host state, so a
+    rate limit seen by one side slows the other down too. ``call*`` retry
+    THROTTLE/RETRY failures up to ``max_retries`` times with exponential
+    backoff and jitter; FATAL errors are raised at once.
+    """
+
+    def __init__(self, default_policy: HostPolicy = HostPolicy(), policies: Optional[Dict[str, HostPolicy]] = None,
+                 max_retries: int = 3, base_delay: float = 1.0, max_delay: float = 30.0):
+        self.default_policy = default_policy
+        self.policies: Dict[str, HostPolicy] = dict(policies or {})
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._hosts: Dict[str, _HostState] = {}
+        self._cond = threading.Condition()
+
+    def set_policy(self, host: str, policy: HostPolicy):
+        """
+        Applies a new policy to host. Known state, including requests still in
+        flight, is kept; only the limit is clamped into the new bounds.
+        """
+        with self._cond:
+            self.policies[host] = policy
+            state = self._hosts.get(host)
+            if state is None:
+                return
+            state.policy = policy
+            state.limit = min(float(policy.max_limit), max(float(policy.min_limit), state.limit))
+            waiters = self._take_waiters(state)
+        self._wake_waiters(waiters)
+
+    def _take_waiters(self, state: _HostState) -> List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]:
+        """Wakes blocked threads and hands back the async waiters; call with the lock held."""
+        waiters, state.waiters = state.waiters, []
+        self._cond.notify_all()
+        return waiters
+
+    @staticmethod
+    def _wake_waiters(waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]):
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                # The waiter's event loop has already been closed.
+                pass
+
+    def _state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self.policies.get(host, self.default_policy))
+        return state
+
+    def _try_acquire(self, host: str) -> Optional[float]:
+        """Takes a slot and returns 0, or returns the seconds to wait (None: until a slot frees up)."""
+        state = self._state(host)
+        now = time.monotonic()
+        if state.circuit == "open":
+            if now < state.open_until:
+                raise CircuitOpenError(f"Circuit open for {host} ({state.open_until - now:.0f}s left)")
+            state.circuit = "half-open"
+            logger.info(f"🔌 Circuit half-open for {host}, sending a trial request")
+        if state.circuit == "half-open":
+            if state.in_flight:
+                return None
+        elif state.in_flight >= max(1, int(state.limit)):
+            return None
+        if now < state.next_start:
+            return state.next_start - now
+        state.in_flight += 1
+        state.next_start = now + state.policy.min_interval
+        return 0
+
+    def _release(self, host: str, outcome: Optional[str], started: float):
+        """Frees a slot and feeds the outcome (None: cancelled, no signal) into AIMD and the breaker."""
+        with self._cond:
+            state = self._state(host)
+            state.in_flight -= 1
+            now = time.monotonic()
+            policy = state.policy
+            if outcome in (SUCCESS, FATAL):
+                # The host answered; a FATAL error is about the request, not the host.
+                state.failures = 0
+                if state.circuit == "half-open":
+                    state.circuit = "closed"
+                    logger.info(f"✅ Circuit closed for {host}")
+                if outcome == SUCCESS:
+                    state.limit = min(policy.max_limit, state.limit + 1 / state.limit)
+            elif outcome in (THROTTLE, RETRY):
+                # Only the first of a burst of throttled requests already in flight shrinks the limit.
+                if outcome == THROTTLE and started >= state.last_decrease:
+                    state.limit = max(policy.min_limit, state.limit * policy.decrease)
+                    state.last_decrease = now
+                    logger.info(f"🐢 {host} throttled, concurrency limit now {int(state.limit)}")
+                state.failures += 1
+                if state.circuit == "half-open" or state.failures >= policy.failure_threshold:
+                    state.circuit = "open"
+                    state.open_until = now + policy.open_seconds
+                    logger.warning(f"🚫 Circuit open for {host} for {policy.open_seconds:.0f}s "
+                                   f"after {state.failures} failures")
+            waiters = self._take_waiters(state)
+        self._wake_waiters(waiters)
+
+    def acquire(self, host: str):
+        """Blocks the calling thread until a slot for host is free."""
+        with self._cond:
+            while True:
+                wait = self._try_acquire(host)
+                if wait == 0:
+                    return
+                self._cond.wait(wait)
+
+    async def acquire_async(self, host: str):
+        """Waits without blocking the event loop until a slot for host is free."""
+        # asyncio is imported here, so threaded git callers don't load it.
+        import asyncio
+        loop = asyncio.get_running_loop()
+        while True:
+            future = None
+            with self._cond:
+                wait = self._try_acquire(host)
+                if wait == 0:
+                    return
+                if wait is None:
+                    future = loop.create_future()
+                    self._state(host).waiters.append((loop, future))
+            if future is not None:
+                await future
+            else:
+                await asyncio.sleep(wait)
+
+    @contextmanager
+    def slot(self, host: str) -> Iterator[None]:
+        """Holds a slot for one attempt; the exception raised in the block (if any) decides the outcome."""
+        self.acquire(host)
+        started = time.monotonic()
+        outcome = None
+        try:
+            yield
+            outcome = SUCCESS
+        except Exception as e:
+            outcome = classify(e)
+            raise
+        finally:
+            self._release(host, outcome, started)
+
+    @asynccontextmanager
+    async def slot_async(self, host: str) -> AsyncIterator[None]:
+        await self.acquire_async(host)
+        started = time.monotonic()
+        outcome = None
+        try:
+            yield
+            outcome = SUCCESS
+        except Exception as e:
+            outcome = classify(e)
+            raise
+        finally:
+            self._release(host, outcome, started)
+
+    def backoff(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """
+        Exponential backoff with jitter, never shorter than a server-sent
+        Retry-After and never longer than ``max_delay``.
+        """
+        ceiling = min(self.max_delay, self.base_delay * 2 ** attempt)
+        delay = ceiling / 2 + random.uniform(0, ceiling / 2)
+        retry_after = getattr(error, "retry_after", None)
+        return min(self.max_delay, max(delay, retry_after)) if retry_after else delay
+
+    def _should_retry(self, host: str, attempt: int, error: Exception) -> Optional[float]:
+        if classify(error) == FATAL or attempt >= self.max_retries:
+            return None
+        delay = self.backoff(attempt, error)
+        logger.warning(f"🔁 {host}: {type(error).__name__}: {str(error)[:200]} "
+                       f"(retry {attempt + 1}/{self.max_retries} in {delay:.1f}s)")
+        return delay
+
+    def call(self, host: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Runs fn in a slot for host, retrying retryable failures with backoff."""
+        attempt = 0
+        while True:
+            try:
+                with self.slot(host):
+                    return fn(*args, **kwargs)
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                delay = self._should_retry(host, attempt, e)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    async def call_async(self, host: str, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Awaits fn(*args, **kwargs) in a slot for host, retrying retryable failures with backoff."""
+        import asyncio
+        attempt = 0
+        while True:
+            try:
+                async with self.slot_async(host):
+                    return await fn(*args, **kwargs)
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                delay = self._should_retry(host, attempt, e)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Current limit, in-flight count and circuit state per host."""
+        with self._cond:
+            return {
+                host: {
+                    "limit": int(state.limit),
+                    "in_flight": state.in_flight,
+                    "failures": state.failures,
+                    "circuit": state.circuit,
+                }
+                for host, state in sorted(self._hosts.items())
+            }
+
+# Singleton shared by the browser and git code
+rate_controller = RateController()
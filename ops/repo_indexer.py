@@ -0,0 +1,375 @@
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from fork_store import OBJECTS_DIR
+from harvest_glaciereq import DEFAULT_TARGET_DIR
+from manifest_store import fts_query
+
+INDEX_FILE = "glaciereq_index.db"
+LARGEST_FILES = 10
+# Full-text indexing skips files above this size and stops after this much text per repo.
+MAX_FTS_FILE_BYTES = 512 * 1024
+MAX_FTS_REPO_BYTES = 32 * 1024 * 1024
+# Stored as the head of a checkout without commits, so it counts as unchanged until its first commit.
+UNBORN_HEAD = "unborn"
+
+LANGUAGES = {
+    ".py": "Python", ".pyi": "Python", ".ipynb": "Jupyter Notebook",
+    ".js": "JavaScript", ".mjs": "JavaScript", ".cjs": "JavaScript", ".jsx": "JavaScript",
+    ".ts": "TypeScript", ".tsx": "TypeScript",
+    ".c": "C", ".h": "C", ".cc": "C++", ".cpp": "C++", ".cxx": "C++", ".hpp": "C++", ".hh": "C++",
+    ".cu": "CUDA", ".rs": "Rust", ".go": "Go", ".java": "Java", ".kt": "Kotlin", ".scala": "Scala",
+    ".swift": "Swift", ".m": "Objective-C", ".mm": "Objective-C++", ".cs": "C#", ".fs": "F#",
+    ".rb": "Ruby", ".php": "PHP", ".pl": "Perl", ".lua": "Lua", ".r": "R", ".jl": "Julia",
+    ".dart": "Dart", ".zig": "Zig", ".hs": "Haskell", ".ml": "OCaml", ".ex": "Elixir", ".exs": "Elixir",
+    ".erl": "Erlang", ".clj": "Clojure", ".sh": "Shell", ".bash": "Shell", ".zsh": "Shell", ".ps1": "PowerShell",
+    ".sql": "SQL", ".html": "HTML", ".htm": "HTML", ".css": "CSS", ".scss": "SCSS", ".vue": "Vue",
+    ".svelte": "Svelte", ".tex": "TeX", ".md": "Markdown", ".rst": "reStructuredText",
+    ".json": "JSON", ".yaml": "YAML", ".yml": "YAML", ".toml": "TOML", ".xml": "XML",
+    ".proto": "Protocol Buffers", ".cmake": "CMake", ".dockerfile": "Dockerfile",
+}
+FILENAME_LANGUAGES = {"Dockerfile": "Dockerfile", "Makefile": "Makefile", "CMakeLists.txt": "CMake"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS repos (
+    name TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    head TEXT,
+    indexed_at REAL NOT NULL,
+    has_fts INTEGER NOT NULL DEFAULT 0,
+    files INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    languages TEXT NOT NULL,
+    largest TEXT NOT NULL,
+    last_commit TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    rowid INTEGER PRIMARY KEY,
+    repo TEXT NOT NULL,
+    path TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_repo ON files (repo);
+CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5 (
+    path, content, content='files', content_rowid='rowid', tokenize = "unicode61 tokenchars '_'"
+);
+CREATE TRIGGER IF NOT EXISTS files_ai AFTER INSERT ON files BEGIN
+    INSERT INTO files_fts (rowid, path, content) VALUES (new.rowid, new.path, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS files_ad AFTER DELETE ON files BEGIN
+    INSERT INTO files_fts (files_fts, rowid, path, content) VALUES ('delete', old.rowid, old.path, old.content);
+END;
+"""
+
+def language_of(path: str) -> Optional[str]:
+    name = os.path.basename(path)
+    if name in FILENAME_LANGUAGES:
+        return FILENAME_LANGUAGES[name]
+    return LANGUAGES.get(os.path.splitext(name)[1].lower())
+
+def git_dir(repo_path: str) -> Optional[str]:
+    path = os.path.join(repo_path, ".git")
+    if os.path.isdir(path):
+        return path
+    if os.path.isfile(path):
+        # Worktrees and submodules: ".git" is a "gitdir: <path>" pointer file.
+        with open(path, "r") as f:
+            pointer = f.read().strip()
+        if pointer.startswith("gitdir:"):
+            return os.path.normpath(os.path.join(repo_path, pointer[len("gitdir:"):].strip()))
+    return None
+
+def read_head(repo_path: str) -> Optional[str]:
+    """HEAD's commit id, read straight from .git (no git process), or None if unresolvable."""
+    directory = git_dir(repo_path)
+    if directory is None:
+        return None
+    try:
+        with open(os.path.join(directory, "HEAD"), "r") as f:
+            head = f.read().strip()
+        if not head.startswith("ref:"):
+            return head
+        ref = head[len("ref:"):].strip()
+        try:
+            with open(os.path.join(directory, ref), "r") as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            pass
+        with open(os.path.join(directory, "packed-refs"), "r") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2 and parts[1] == ref:
+                    return parts[0]
+    except OSError:
+        pass
+    # Unborn branch or an unusual layout.
+    return None
+
+def current_head(repo_path: str) -> str:
+    """
+    HEAD's commit id, falling back to git for layouts read_head() cannot
+    resolve, or UNBORN_HEAD if the branch has no commits yet.
+    """
+    return (read_head(repo_path) or _git(repo_path, "rev-parse", "--verify", "-q", "HEAD").strip()
+            or UNBORN_HEAD)
+
+def list_checkouts(target_dir: str) -> Dict[str, str]:
+    """Maps repo name to path for every git checkout directly under target_dir."""
+    checkouts = {}
+    for name in sorted(os.listdir(target_dir)):
+        path = os.path.join(target_dir, name)
+        if name != OBJECTS_DIR and os.path.isdir(path) and git_dir(path):
+            checkouts[name] = path
+    return checkouts
+
+def _git(repo_path: str, *args: str) -> str:
+    return subprocess.run(["git", "-C", repo_path, *args], capture_output=True, text=True).stdout
+
+def _tracked_files(repo_path: str) -> Iterator[str]:
+    listing = subprocess.run(["git", "-C", repo_path, "ls-files", "-z"], capture_output=True).stdout
+    for path in listing.decode("utf-8", "surrogateescape").split("\0"):
+        if path:
+            yield path
+
+def _read_text(path: str, size: int) -> Optional[str]:
+    if size > MAX_FTS_FILE_BYTES:
+        return None
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if b"\0" in data[:8192]:
+        return None
+    return data.decode("utf-8", "replace")
+
+def inventory_repo(name: str, repo_path: str, fts: bool = False) -> Dict:
+    """
+    Walks one checkout (run in a worker process).
+
+    Counts the tracked files by language, keeps the largest ones and the last
+    commit, and with ``fts`` also returns the text of source files.
+    """
+    files = 0
+    total = 0
+    languages: Dict[str, Dict[str, int]] = {}
+    largest: List[Tuple[int, str]] = []
+    texts: List[Tuple[str, str]] = []
+    text_bytes = 0
+
+    for relative in _tracked_files(repo_path):
+        full = os.path.join(repo_path, relative)
+        try:
+            size = os.lstat(full).st_size
+        except OSError:
+            # Sparse or partial checkout: tracked but not on disk.
+            continue
+        files += 1
+        total += size
+        language = language_of(relative) or "Other"
+        stats = languages.setdefault(language, {"files": 0, "bytes": 0})
+        stats["files"] += 1
+        stats["bytes"] += size
+        largest.append((size, relative))
+        if len(largest) > LARGEST_FILES * 4:
+            largest = sorted(largest, reverse=True)[:LARGEST_FILES]
+        if fts and language != "Other" and text_bytes < MAX_FTS_REPO_BYTES:
+            text = _read_text(full, size)
+            if text is not None:
+                texts.append((relative, text))
+                text_bytes += len(text)
+
+    last_commit = None
+    log = _git(repo_path, "log", "-1", "--format=%H%x00%an%x00%aI%x00%s").strip()
+    if log:
+        sha, author, date, subject = (log.split("\0") + ["", "", ""])[:4]
+        last_commit = {"sha": sha, "author": author, "date": date, "subject": subject}
+
+    return {
+        "name": name,
+        "path": repo_path,
+        "head": current_head(repo_path),
+        "files": files,
+        "bytes": total,
+        "languages": dict(sorted(languages.items(), key=lambda item: -item[1]["bytes"])),
+        "largest": [{"path": path, "bytes": size} for size, path in sorted(largest, reverse=True)[:LARGEST_FILES]],
+        "last_commit": last_commit,
+        "texts": texts,
+    }
+
+class RepoIndex:
+    """
+    Per-repo inventory of the harvested checkouts in SQLite, with an optional
+    FTS5 index over the text of their source files.
+    """
+
+    def __init__(self, path: str = INDEX_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def indexed_heads(self) -> Dict[str, Tuple[Optional[str], bool]]:
+        return {row["name"]: (row["head"], bool(row["has_fts"]))
+                for row in self.conn.execute("SELECT name, head, has_fts FROM repos")}
+
+    def store(self, inventory: Dict, fts: bool):
+        with self.conn:
+            self.conn.execute("""
+                INSERT OR REPLACE INTO repos
+                    (name, path, head, indexed_at, has_fts, files, bytes, languages, largest, last_commit)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (inventory["name"], inventory["path"], inventory["head"], time.time(), int(fts),
+                  inventory["files"], inventory["bytes"], json.dumps(inventory["languages"]),
+                  json.dumps(inventory["largest"]),
+                  json.dumps(inventory["last_commit"]) if inventory["last_commit"] else None))
+            self.conn.execute("DELETE FROM files WHERE repo = ?", (inventory["name"],))
+            if fts:
+                self.conn.executemany("INSERT INTO files (repo, path, content) VALUES (?, ?, ?)",
+                                      ((inventory["name"], path, text) for path, text in inventory["texts"]))
+
+    def remove(self, names: List[str]):
+        with self.conn:
+            for name in names:
+                self.conn.execute("DELETE FROM repos WHERE name = ?", (name,))
+                self.conn.execute("DELETE FROM files WHERE repo = ?", (name,))
+
+    def get(self, name: str) -> Optional[Dict]:
+        row = self.conn.execute("SELECT * FROM repos WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        repo = dict(row)
+        for column in ("languages", "largest", "last_commit"):
+            repo[column] = json.loads(repo[column]) if repo[column] else None
+        return repo
+
+    def stats(self) -> Dict:
+        """Totals over the index, with bytes per language across all repos."""
+        totals = dict(self.conn.execute(
+            "SELECT COUNT(*) AS repos, COALESCE(SUM(files), 0) AS files, COALESCE(SUM(bytes), 0) AS bytes FROM repos"
+        ).fetchone())
+        languages: Dict[str, int] = {}
+        for (encoded,) in self.conn.execute("SELECT languages FROM repos"):
+            for language, stats in json.loads(encoded).items():
+                languages[language] = languages.get(language, 0) + stats["bytes"]
+        totals["languages"] = dict(sorted(languages.items(), key=lambda item: -item[1]))
+        return totals
+
+    def search(self, text: str, repo: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """
+        Full-text search over indexed source files, best matches first, with a snippet each.
+
+        Every term of ``text`` must occur (see fts_query()).
+        """
+        query = fts_query(text)
+        if not query:
+            return []
+        sql = """
+            SELECT files.repo, files.path, snippet(files_fts, 1, '[', ']', '…', 12) AS snippet
+            FROM files_fts JOIN files ON files.rowid = files_fts.rowid WHERE files_fts MATCH ?
+        """
+        params: List = [query]
+        if repo:
+            sql += " AND files.repo = ?"
+            params.append(repo)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+def index_checkouts(target_dir: str = DEFAULT_TARGET_DIR, index_path: str = INDEX_FILE, workers: int = 8,
+                    fts: bool = False, full: bool = False) -> Dict[str, int]:
+    """
+    Brings the index up to date with the checkouts under target_dir.
+
+    Only repos whose HEAD moved since they were last indexed (or that gain
+    full-text indexing) are walked again, ``workers`` at a time in separate
+    processes; repos gone from disk are dropped. ``full`` re-walks everything.
+    A repo indexed with ``fts`` once keeps its full-text index on later runs.
+    """
+    target_dir = os.path.abspath(os.path.expanduser(target_dir))
+    checkouts = list_checkouts(target_dir)
+    counts = {"indexed": 0, "unchanged": 0, "removed": 0, "failed": 0}
+
+    with RepoIndex(index_path) as index:
+        known = index.indexed_heads()
+        gone = sorted(set(known) - set(checkouts))
+        index.remove(gone)
+        counts["removed"] = len(gone)
+
+        stale = []
+        for name, path in checkouts.items():
+            head, has_fts = known.get(name, (None, False))
+            if full or head != current_head(path) or (fts and not has_fts):
+                # A repo keeps its full-text index once it has one.
+                stale.append((name, path, fts or has_fts))
+        counts["unchanged"] = len(checkouts) - len(stale)
+        print(f"🗂️  {len(checkouts)} checkouts: {len(stale)} to index, {counts['unchanged']} unchanged")
+
+        started = time.monotonic()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(inventory_repo, name, path, with_fts): (name, with_fts)
+                       for name, path, with_fts in stale}
+            for future in as_completed(futures):
+                name, with_fts = futures[future]
+                try:
+                    inventory = future.result()
+                except Exception as e:
+                    counts["failed"] += 1
+                    print(f"❌ {name}: {e}")
+                    continue
+                index.store(inventory, with_fts)
+                counts["indexed"] += 1
+                print(f"✅ {name}: {inventory['files']} files, {inventory['bytes'] / 1e6:.1f} MB")
+
+    print(f"\n📊 Indexed {counts['indexed']}, unchanged {counts['unchanged']}, removed {counts['removed']}, "
+          f"failed {counts['failed']} in {time.monotonic() - started:.1f}s")
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Index the harvested checkouts.")
+    parser.add_argument("--index", default=INDEX_FILE, help="Index database path")
+    sub = parser.add_subparsers(dest="command", required=True)
+    index_parser = sub.add_parser("index", help="Index new and changed checkouts")
+    index_parser.add_argument("--target-dir", default=DEFAULT_TARGET_DIR)
+    index_parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    index_parser.add_argument("--fts", action="store_true", help="Also index source file contents for search")
+    index_parser.add_argument("--full", action="store_true", help="Re-index every checkout")
+    search_parser = sub.add_parser("search", help="Full-text search over indexed source files")
+    search_parser.add_argument("text")
+    search_parser.add_argument("--repo")
+    search_parser.add_argument("--limit", type=int, default=20)
+    show_parser = sub.add_parser("show", help="Print one repo's inventory")
+    show_parser.add_argument("name")
+    sub.add_parser("stats", help="Print totals over the index")
+    args = parser.parse_args()
+
+    if args.command == "index":
+        index_checkouts(args.target_dir, args.index, args.workers, args.fts, args.full)
+        return
+    with RepoIndex(args.index) as index:
+        if args.command == "search":
+            for hit in index.search(args.text, args.repo, args.limit):
+                print(f"{hit['repo']}/{hit['path']}: {hit['snippet'].strip()}")
+        elif args.command == "show":
+            repo = index.get(args.name)
+            print(json.dumps(repo, indent=2) if repo else f"❌ {args.name} is not indexed")
+        else:
+            print(json.dumps(index.stats(), indent=2))
+
+if __name__ == "__main__":
+    main()
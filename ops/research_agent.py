@@ -1,39 +1,92 @@
+from __future__ import annotations
+
 import asyncio
 import logging
 import urllib.parse
-from typing import List, Dict, Any
-from browser_automator import browser_automator
+from typing import TYPE_CHECKING, List, Dict, Any, AsyncIterator, Optional, Union
+from browser_automator import BrowserAutomator, get_browser_automator
+from metrics import metrics
+from page_cache import PageCache
+from rate_control import THROTTLE, classify, rate_controller
+from source_dedupe import DedupeSession, FingerprintStore
+
+if TYPE_CHECKING:
+    from playwright.async_api import Page
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("research-agent")
 
+# Default for the cache/fingerprints arguments, so None can mean "disabled".
+DEFAULT = object()
+
 class ResearchAgent:
     """
     Agent capable of performing web research using the Comet Browser.
+
+    Search results and page summaries are kept in a persistent ``PageCache``;
+    pass ``refresh=True`` to reload from the network, or ``cache=None`` to
+    bypass it entirely.
+
+    Every page read is fingerprinted into a persistent ``FingerprintStore``,
+    so URL variants, mirrors and syndicated copies of a source are skipped,
+    before they are opened when an earlier mission already read them. Pass
+    ``fingerprints=None`` to disable this.
+
+    ``browser`` defaults to the shared BrowserAutomator.
     """
     
-    def __init__(self):
-        self.browser = browser_automator
-        
-    async def search_google(self, query: str) -> List[Dict[str, str]]:
+    def __init__(self, cache: Union[PageCache, None, object] = DEFAULT, profile: str = "text",
+                 fingerprints: Union[FingerprintStore, None, object] = DEFAULT,
+                 browser: Optional[BrowserAutomator] = None):
+        self.browser = browser or get_browser_automator()
+        # {query} is replaced with the URL-encoded query; point it at a fixture server to benchmark offline.
+        self.search_url = "https://www.google.com/search?q={query}"
+        # Research only needs DOM text, so skip images, fonts, styles and trackers.
+        self.profile = profile
+        self.summary_chars = 500
+        self.cache: Optional[PageCache] = PageCache() if cache is DEFAULT else cache
+        self.fingerprints: Optional[FingerprintStore] = FingerprintStore() if fingerprints is DEFAULT else fingerprints
+        # Text fingerprinted per page; short summaries alone are too small to tell copies apart.
+        self.fingerprint_chars = 3000
+        # Loads of a search page whose results did not show up within result_timeout (ms).
+        self.result_attempts = 3
+        self.result_timeout = 5000
+
+    def _cached(self, key: str, refresh: bool) -> Optional[Any]:
+        if self.cache is None or refresh:
+            return None
+        value = self.cache.get(key)
+        if value is not None:
+            logger.info(f"💾 Cache hit: {key}")
+        return value
+
+    def _search_key(self, query: str) -> str:
+        # Keyed by the search host (and port), so a fixture server never answers from real results.
+        return PageCache.search_key(urllib.parse.urlsplit(self.search_url).netloc, query)
+
+    @metrics.timed("research.search", agent="research")
+    async def search_google(self, query: str, page: Optional[Page] = None, refresh: bool = False) -> List[Dict[str, str]]:
         """Performs a Google search and returns top results."""
+        cache_key = self._search_key(query)
+        cached = self._cached(cache_key, refresh)
+        if cached is not None:
+            return cached
+
         encoded_query = urllib.parse.quote(query)
-        url = f"https://www.google.com/search?q={encoded_query}"
+        url = self.search_url.format(query=encoded_query)
         
         logger.info(f"🔍 Searching Google for: {query}")
-        await self.browser.navigate(url)
+        page = page or self.browser.page
         
         # Extract results (titles and links)
         # Selectors might change, but this is a standard structure
         results = []
         
-        # Wait for results to load
+        # Navigation failures (and an open circuit) propagate to the caller.
+        if not await self._load_results(url, page):
+            return []
         try:
-            await self.browser.page.wait_for_selector('div.g', timeout=5000)
-            
             # Evaluate JS to extract data cleanly
-            results = await self.browser.page.evaluate("""() => {
+            results = await self.browser.evaluate("""() => {
                 const items = document.querySelectorAll('div.g');
                 return Array.from(items).map(item => {
                     const titleEl = item.querySelector('h3');
@@ -46,25 +99,161 @@ class ResearchAgent:
                     }
                     return null;
                 }).filter(item => item !== null);
-            }""")
+            }""", page=page)
             
             logger.info(f"✅ Found {len(results)} results.")
+            if self.cache is not None and results:
+                self.cache.put(cache_key, results)
             return results
             
         except Exception as e:
             logger.warning(f"⚠️ Error extracting results: {e}")
             return []
 
-    async def summarize_page(self, url: str) -> str:
+    async def _load_results(self, url: str, page: Page) -> bool:
+        """
+        Loads the search page until its results show up, at most
+        ``result_attempts`` times with backoff in between; False if they never do.
+
+        Navigation failures (and an open circuit) propagate to the caller. The
+        result wait is retried here rather than in the rate controller: a page
+        without results (no hits, a CAPTCHA) is not a throttled host, so its
+        timeouts must not shrink the host's concurrency.
+        """
+        controller = getattr(self.browser, "rate_control", None) or rate_controller
+        for attempt in range(self.result_attempts):
+            await self.browser.navigate(url, page=page, profile=self.profile)
+            try:
+                await page.wait_for_selector('div.g', timeout=self.result_timeout)
+                return True
+            except Exception as e:
+                if classify(e) != THROTTLE or attempt + 1 >= self.result_attempts:
+                    logger.warning(f"⚠️ No search results: {e}")
+                    return False
+                delay = controller.backoff(attempt)
+                logger.warning(f"🔁 No results after {self.result_timeout / 1000:.0f}s, "
+                               f"reloading (retry {attempt + 1}/{self.result_attempts - 1}) in {delay:.1f}s")
+                await asyncio.sleep(delay)
+        return False
+
+    @metrics.timed("research.summarize", agent="research")
+    async def summarize_page(self, url: str, page: Optional[Page] = None, refresh: bool = False) -> str:
         """Navigates to a page and extracts main text."""
+        cache_key = PageCache.page_key(url)
+        cached = self._cached(cache_key, refresh)
+        if cached is not None:
+            return cached
+
         logger.info(f"📖 Reading page: {url}")
-        await self.browser.navigate(url)
+        await self.browser.navigate(url, page=page, profile=self.profile)
         
-        # Simple text extraction
-        text = await self.browser.extract_text('body')
+        # Main-content extraction, capped inside the page so only the budget crosses to Python
+        max_chars = max(self.summary_chars, self.fingerprint_chars) if self.fingerprints else self.summary_chars
+        content = await self.browser.extract_main_content(page=page, max_chars=max_chars)
+        # An empty page would fingerprint as a near-duplicate of every other empty page.
+        if self.fingerprints is not None and content["text"]:
+            self.fingerprints.record(url, content["text"], content.get("canonical"))
         # In a real agent, we'd use an LLM to summarize this text
-        summary = text[:500] + "..." if len(text) > 500 else text
+        text = content["text"][:self.summary_chars]
+        summary = text + "..." if content["truncated"] or len(content["text"]) > len(text) else text
+        # Nothing was extracted (still loading, blocked, or script-only); read it again next time.
+        if self.cache is not None and summary.strip():
+            self.cache.put(cache_key, summary)
         return summary
 
-# Singleton
-research_agent = ResearchAgent()
+    async def _summarize_result(self, result: Dict[str, str], page_timeout: float, refresh: bool) -> Dict[str, Any]:
+        # Check the cache before taking a tab out of the pool.
+        cached = self._cached(PageCache.page_key(result['url']), refresh)
+        if cached is not None:
+            return {**result, "summary": cached, "cached": True}
+        async with self.browser.acquire_page() as page:
+            summary = await asyncio.wait_for(
+                self.summarize_page(result['url'], page=page, refresh=True), page_timeout)
+        return {**result, "summary": summary}
+
+    async def search_cached(self, query: str, refresh: bool = False) -> List[Dict[str, str]]:
+        """Searches in a pooled tab, skipping the tab entirely on a cache hit."""
+        results = self._cached(self._search_key(query), refresh)
+        if results is None:
+            async with self.browser.acquire_page() as page:
+                results = await self.search_google(query, page=page, refresh=True)
+        return results
+
+    async def summarize_results(self, results: List[Dict[str, str]], concurrency: int = 5,
+                                page_timeout: float = 30.0, refresh: bool = False,
+                                slots: Optional[asyncio.Semaphore] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Summarizes search results in parallel tabs, yielding each as it completes.
+
+        Concurrency is bounded by ``concurrency``, or by ``slots`` when a
+        semaphore shared between several calls is given. A result that fails or
+        exceeds ``page_timeout`` seconds is yielded with an ``error`` key instead
+        of a ``summary``. So is a duplicate of another result, which also gets a
+        ``duplicate_of`` key with the URL of the source it repeats; known
+        duplicates are skipped without opening them.
+        """
+        slots = slots or asyncio.Semaphore(concurrency)
+        dedupe = DedupeSession(self.fingerprints) if self.fingerprints is not None else None
+
+        def duplicate(result: Dict[str, str], original: str) -> Dict[str, Any]:
+            logger.info(f"♻️ Skipping {result['url']}, duplicate of {original}")
+            return {**result, "duplicate_of": original, "error": f"Duplicate of {original}"}
+
+        async def bounded(result: Dict[str, str]) -> Dict[str, Any]:
+            async with slots:
+                try:
+                    summary = await self._summarize_result(result, page_timeout, refresh)
+                except Exception as e:
+                    # Let a later variant of an unreadable source take its place.
+                    if dedupe is not None:
+                        dedupe.withdraw(result['url'])
+                    if isinstance(e, asyncio.TimeoutError):
+                        logger.warning(f"⏱️ Timed out reading {result['url']}")
+                        return {**result, "error": f"Timed out after {page_timeout}s"}
+                    logger.warning(f"⚠️ Failed to read {result['url']}: {e}")
+                    return {**result, "error": str(e)}
+            original = dedupe.check_content(result['url']) if dedupe is not None else None
+            return duplicate(result, original) if original else summary
+
+        pending = results
+        if dedupe is not None:
+            originals = dedupe.filter_urls(result['url'] for result in results)
+            pending = [result for result, original in zip(results, originals) if not original]
+            for result, original in zip(results, originals):
+                if original:
+                    yield duplicate(result, original)
+
+        tasks = [asyncio.ensure_future(bounded(result)) for result in pending]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # The caller may stop iterating early; don't leave tabs navigating.
+            for task in tasks:
+                task.cancel()
+
+    async def research_topic(self, query: str, top_n: int = 10, concurrency: int = 5,
+                             page_timeout: float = 30.0, refresh: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Searches for a topic and summarizes the top N results in parallel tabs.
+
+        Summaries are yielded as they complete, so slow sites don't hold up fast
+        ones (see summarize_results()).
+        """
+        results = (await self.search_cached(query, refresh))[:top_n]
+        async for summary in self.summarize_results(results, concurrency, page_timeout, refresh):
+            yield summary
+
+_research_agent: Optional[ResearchAgent] = None
+
+def get_research_agent() -> ResearchAgent:
+    """The shared ResearchAgent, created on first use."""
+    global _research_agent
+    if _research_agent is None:
+        _research_agent = ResearchAgent()
+    return _research_agent
+
+def __getattr__(name: str):
+    if name == "research_agent":
+        return get_research_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,24 +1,30 @@
+import argparse
 import asyncio
+import logging
 import os
 import getpass
-from overleaf_agent import overleaf_agent
+from typing import Optional, Sequence
+from metrics import metrics
+from overleaf_agent import get_overleaf_agent
 
-async def main():
+async def run():
     print("📄 --- Overleaf Automation CLI ---")
+    overleaf_agent = get_overleaf_agent()
     
     email = os.environ.get("OVERLEAF_EMAIL")
     if not email:
         email = input("Enter Overleaf Email: ")
         
     password = os.environ.get("OVERLEAF_PASSWORD")
-    if not password:
-        password = getpass.getpass("Enter Overleaf Password: ")
         
     project_name = input("Enter new project name (e.g., 'My Paper'): ")
     
     print("\n🚀 Starting Agent...")
     try:
         await overleaf_agent.browser.start(headless=False) # Run visible so user can see
+        # Only ask for the password when there is no stored session to reuse
+        if not password and not await overleaf_agent.session_state(email):
+            password = getpass.getpass("Enter Overleaf Password: ")
         await overleaf_agent.login(email, password)
         await overleaf_agent.create_project(project_name)
         
@@ -33,5 +39,14 @@ async def main():
     finally:
         await overleaf_agent.browser.close()
 
+def main(argv: Optional[Sequence[str]] = None):
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="Log in to Overleaf and create a project in a visible browser. "
+                    "Reads OVERLEAF_EMAIL and OVERLEAF_PASSWORD if set.")
+    parser.parse_args(argv)
+    metrics.start_from_env()
+    asyncio.run(run())
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
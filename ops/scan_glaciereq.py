@@ -1,54 +1,134 @@
+import argparse
 import asyncio
 import logging
-import json
-from browser_automator import browser_automator
+from typing import Dict, List, Optional, Sequence
+from browser_automator import add_har_arguments, configure_har, get_browser_automator
+from metrics import metrics
+from merge_manifest import MANIFEST_FILE, ManifestIndex, load_manifest, save_manifest
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("glaciereq-scanner")
 
-async def scan_repos():
+ORG_URL = "https://github.com/orgs/glaciereq/repositories"
+
+# Returns the repos listed on the current page and the total page count from the pagination widget.
+EXTRACT_JS = """() => {
+    const items = document.querySelectorAll('#org-repositories li');
+    const repos = Array.from(items).map(item => {
+        const nameEl = item.querySelector('a[itemprop="name codeRepository"]');
+        const descEl = item.querySelector('p[itemprop="description"]');
+        const timeEl = item.querySelector('relative-time');
+        return {
+            name: nameEl ? nameEl.innerText.trim() : "Unknown",
+            url: nameEl ? nameEl.href : "",
+            description: descEl ? descEl.innerText.trim() : null,
+            listed_at: timeEl ? timeEl.getAttribute('datetime') : null
+        };
+    }).filter(repo => repo.url);
+
+    let pages = 1;
+    const current = document.querySelector('.pagination [data-total-pages]');
+    if (current) {
+        pages = parseInt(current.getAttribute('data-total-pages'), 10) || 1;
+    }
+    document.querySelectorAll('.pagination a, nav[aria-label="Pagination"] a').forEach(link => {
+        const n = parseInt(link.innerText.trim(), 10);
+        if (!isNaN(n) && n > pages) pages = n;
+    });
+    return { repos, pages };
+}"""
+
+@metrics.timed("scan.page", agent="scan")
+async def scan_page(org_url: str, page_number: int) -> Dict:
+    """Loads one listing page in a pooled tab and extracts its repos."""
+    separator = "&" if "?" in org_url else "?"
+    browser_automator = get_browser_automator()
+    async with browser_automator.acquire_page() as page:
+        await browser_automator.navigate(f"{org_url}{separator}page={page_number}", page=page, profile="text")
+        await page.wait_for_selector('#org-repositories')
+        return await browser_automator.evaluate(EXTRACT_JS, page=page)
+
+def apply_page(index: ManifestIndex, page_number: int, repos: List[Dict]) -> bool:
+    """Streams one page into the manifest; returns True if every repo on it was already known and unchanged."""
+    statuses = [index.update_listing(repo)[1] for repo in repos]
+    if any(status != "unchanged" for status in statuses):
+        save_manifest(index.values())
+    print(f"📄 Page {page_number}: {len(repos)} repos "
+          f"({statuses.count('added')} new, {statuses.count('changed')} changed)")
+    for repo in repos:
+        print(f"- {repo['name']}: {repo['description'] or 'No description'}")
+    return bool(repos) and all(status == "unchanged" for status in statuses)
+
+async def scan_repos(org_url: str = ORG_URL, tabs: int = 4, headless: bool = False, full: bool = False):
+    """
+    Scans every listing page of an account into the manifest.
+
+    Page 1 reveals the page count; the remaining pages load concurrently over
+    ``tabs`` pooled tabs. The listing is ordered by last update, so unless
+    ``full`` is set, a page whose repos are all known and unchanged ends the
+    scan and later pages are cancelled.
+    """
     print("🕵️‍♂️ --- Scanning Glaciereq Repositories ---")
-    
+
+    index = ManifestIndex(load_manifest(MANIFEST_FILE))
+    total = 0
+    browser_automator = get_browser_automator()
+
     try:
         # Launch visible to see what's happening
-        await browser_automator.start(headless=False)
-        
-        # Navigate to repositories tab
-        url = "https://github.com/orgs/glaciereq/repositories"
-        await browser_automator.navigate(url)
-        
-        # Wait for list to load
-        await browser_automator.page.wait_for_selector('#org-repositories')
-        
-        # Extract repos using JS
-        repos = await browser_automator.page.evaluate("""() => {
-            const items = document.querySelectorAll('#org-repositories li');
-            return Array.from(items).map(item => {
-                const nameEl = item.querySelector('a[itemprop="name codeRepository"]');
-                const descEl = item.querySelector('p[itemprop="description"]');
-                return {
-                    name: nameEl ? nameEl.innerText.trim() : "Unknown",
-                    url: nameEl ? nameEl.href : "",
-                    description: descEl ? descEl.innerText.trim() : "No description"
-                };
-            });
-        }""")
-        
-        print(f"\n✅ Found {len(repos)} repositories:")
-        for repo in repos:
-            print(f"- {repo['name']}: {repo['description']}")
-            
-        # Save to file for the "bulk edit" script
-        with open("glaciereq_manifest.json", "w") as f:
-            json.dump(repos, f, indent=2)
-            
-        print("\n💾 Saved manifest to glaciereq_manifest.json")
-        
+        await browser_automator.start(headless=headless, pool_size=tabs)
+
+        first = await scan_page(org_url, 1)
+        total += len(first["repos"])
+        page_count = first["pages"]
+        print(f"📚 {page_count} page(s) to scan with {tabs} tabs")
+
+        if apply_page(index, 1, first["repos"]) and not full:
+            print("⏹️  Page 1 is unchanged; nothing new to scan.")
+            page_count = 1
+
+        async def numbered_page(n: int):
+            return n, await scan_page(org_url, n)
+
+        tasks = {n: asyncio.ensure_future(numbered_page(n)) for n in range(2, page_count + 1)}
+        stop_after = page_count
+        for next_done in asyncio.as_completed(list(tasks.values())):
+            try:
+                page_number, result = await next_done
+            except asyncio.CancelledError:
+                continue
+            except Exception as e:
+                print(f"⚠️ Failed to scan a page: {e}")
+                continue
+            if page_number > stop_after:
+                continue
+            total += len(result["repos"])
+            if apply_page(index, page_number, result["repos"]) and not full:
+                stop_after = page_number
+                for n, task in tasks.items():
+                    if n > stop_after:
+                        task.cancel()
+                print(f"⏹️  Page {page_number} is unchanged; skipping later pages.")
+
+        print(f"\n✅ Found {total} repositories")
+        print(f"\n💾 Saved manifest to {MANIFEST_FILE}")
+
     except Exception as e:
         print(f"❌ Scan Failed: {e}")
     finally:
         await browser_automator.close()
 
+def main(argv: Optional[Sequence[str]] = None):
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Scan an account's repository listing into the manifest.")
+    parser.add_argument("--org-url", default=ORG_URL)
+    parser.add_argument("--tabs", type=int, default=4, help="Number of pages loaded concurrently")
+    parser.add_argument("--headless", action="store_true")
+    parser.add_argument("--full", action="store_true", help="Scan every page, even past unchanged ones")
+    add_har_arguments(parser)
+    args = parser.parse_args(argv)
+    configure_har(args)
+    metrics.start_from_env()
+    asyncio.run(scan_repos(**vars(args)))
+
 if __name__ == "__main__":
-    asyncio.run(scan_repos())
+    main()
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from atomic_file import write_atomic
+
+logger = logging.getLogger("session-store")
+
+DEFAULT_SESSION_DIR = "~/.cache/udc/sessions"
+# Kept out of the cache, so copying or backing up the cache does not take the key along.
+DEFAULT_KEY_FILE = os.path.join(os.environ.get("XDG_CONFIG_HOME") or "~/.config", "udc", "session.key")
+KEY_ENV = "UDC_SESSION_KEY"
+KEYRING_SERVICE = "udc-sessions"
+KEYRING_USER = "fernet-key"
+
+# The missing-cryptography warning is logged once per process, not per store.
+_warned_missing_cryptography = False
+
+class SessionStore:
+    """
+    Encrypted-at-rest Playwright storage states (cookies and localStorage), one per account.
+
+    States are encrypted with Fernet from the optional ``cryptography``
+    package. The key comes from ``UDC_SESSION_KEY``, else from the OS keyring
+    (with the optional ``keyring`` package), else from a 0600 key file that
+    is generated on first use under the config dir, away from the cached
+    sessions. The key file keeps sessions safe when the cache is copied
+    without it (backups, shared caches); it adds nothing against someone who
+    can read the user's files, so set the env var or install ``keyring``
+    where that matters. Without ``cryptography``, or with an unusable key,
+    nothing is written to disk and sessions only live for the current process.
+    """
+
+    def __init__(self, directory: str = DEFAULT_SESSION_DIR, key_file: str = DEFAULT_KEY_FILE):
+        self.directory = os.path.expanduser(directory)
+        self.key_file = os.path.expanduser(key_file)
+        self._fernet = None
+        self._available: Optional[bool] = None
+
+    @property
+    def available(self) -> bool:
+        """True when states can be persisted (cryptography is installed and the key is usable)."""
+        global _warned_missing_cryptography
+        if self._available is None:
+            try:
+                from cryptography.fernet import Fernet
+            except ImportError:
+                if not _warned_missing_cryptography:
+                    logger.warning("⚠️ 'cryptography' is not installed, so sessions are NOT saved and every run "
+                                   "logs in again. Install it with: pip install cryptography")
+                    _warned_missing_cryptography = True
+                self._available = False
+                return False
+            try:
+                self._fernet = Fernet(self._load_key(Fernet))
+            except (OSError, ValueError) as e:
+                logger.error(f"❌ Unusable session key ({e}); sessions will not be saved to disk. "
+                             f"Fix or remove {self.key_file}, or set {KEY_ENV}.")
+                self._available = False
+            else:
+                self._available = True
+        return self._available
+
+    @staticmethod
+    def _keyring():
+        try:
+            import keyring
+            keyring.get_keyring()
+        except Exception:
+            # Not installed, or no usable backend on this machine.
+            return None
+        return keyring
+
+    def _load_key(self, fernet_cls) -> bytes:
+        key = os.environ.get(KEY_ENV)
+        if key:
+            return key.encode("ascii")
+        keyring = self._keyring()
+        if keyring is not None:
+            try:
+                key = keyring.get_password(KEYRING_SERVICE, KEYRING_USER)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not read the session key from the keyring: {e}")
+                keyring = None
+            if key:
+                return key.encode("ascii")
+        try:
+            # An existing key file keeps earlier sessions readable.
+            with open(self.key_file, "rb") as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            pass
+        key = fernet_cls.generate_key()
+        if keyring is not None:
+            try:
+                keyring.set_password(KEYRING_SERVICE, KEYRING_USER, key.decode("ascii"))
+                return key
+            except Exception as e:
+                logger.warning(f"⚠️ Could not store the session key in the keyring, using {self.key_file}: {e}")
+        os.makedirs(os.path.dirname(self.key_file), mode=0o700, exist_ok=True)
+        try:
+            fd = os.open(self.key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            # Another process created it first; use theirs.
+            with open(self.key_file, "rb") as f:
+                return f.read().strip()
+        with os.fdopen(fd, "wb") as f:
+            f.write(key)
+        return key
+
+    def path_for(self, account: str) -> str:
+        digest = hashlib.sha256(account.strip().lower().encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.directory, f"{digest}.state")
+
+    def load(self, account: str) -> Optional[Dict[str, Any]]:
+        if not self.available:
+            return None
+        from cryptography.fernet import InvalidToken
+        try:
+            with open(self.path_for(account), "rb") as f:
+                token = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            return json.loads(self._fernet.decrypt(token))
+        except InvalidToken:
+            logger.warning(f"⚠️ Stored session for {account} can't be decrypted with the current key; ignoring it.")
+            return None
+
+    def save(self, account: str, state: Dict[str, Any]):
+        if not self.available:
+            return
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        token = self._fernet.encrypt(json.dumps(state).encode("utf-8"))
+        write_atomic(self.path_for(account), token, mode=0o600)
+
+    def delete(self, account: str):
+        try:
+            os.remove(self.path_for(account))
+        except FileNotFoundError:
+            pass
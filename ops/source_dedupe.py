@@ -0,0 +1,275 @@
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import time
+import urllib.parse
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+DEFAULT_STORE_PATH = "~/.cache/udc/fingerprints.db"
+BITS = 64
+# Eight 8-bit bands: fingerprints within 7 bits of each other share at least one band exactly.
+# A few percent of changed words (boilerplate, ads) mostly moves a 500-word page by under 8 bits,
+# while unrelated pages are ~32 bits apart.
+BANDS = 8
+MAX_DISTANCE = 7
+
+TRACKING_PARAMS = {
+    "gclid", "dclid", "gbraid", "wbraid", "fbclid", "msclkid", "yclid", "igshid", "twclid", "ttclid",
+    "mc_cid", "mc_eid", "_ga", "_gl", "_hsenc", "_hsmi", "mkt_tok", "ref_src", "ref_url", "referrer",
+    "cmpid", "ncid", "sr_share", "smid", "spm",
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "hsa_", "vero_", "oly_", "mtm_")
+# Google's AMP viewer and the AMP cache wrap the publisher URL in their path.
+GOOGLE_AMP = re.compile(r"^/amp/s/(?P<target>.+)$")
+AMP_CACHE = re.compile(r"^/[a-z]/s/(?P<target>.+)$")
+
+def canonical_url(url: str) -> str:
+    """
+    The comparison form of a URL: Google redirect and AMP viewer/cache
+    wrappers unwrapped, tracking parameters and fragments removed, host
+    lower-cased. Only these known wrappers are rewritten; other AMP variants
+    are matched through the page's rel=canonical link (see
+    FingerprintStore.record()). Used for dedupe keys; pages are still
+    navigated at their original URL.
+    """
+    parts = urllib.parse.urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    google = host == "google.com" or host.endswith(".google.com")
+
+    if google and parts.path == "/url":
+        target = urllib.parse.parse_qs(parts.query).get("q") or urllib.parse.parse_qs(parts.query).get("url")
+        if target:
+            return canonical_url(target[0])
+    wrapper = GOOGLE_AMP if google else AMP_CACHE if host.endswith(".cdn.ampproject.org") else None
+    match = wrapper.match(parts.path) if wrapper else None
+    if match:
+        return canonical_url("https://" + match.group("target"))
+
+    path = parts.path or "/"
+    query = urllib.parse.urlencode(sorted(
+        (key, value) for key, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ))
+    port = parts.port
+    if port and not (parts.scheme == "http" and port == 80 or parts.scheme == "https" and port == 443):
+        host = f"{host}:{port}"
+    return urllib.parse.urlunsplit((parts.scheme.lower(), host, path, query, ""))
+
+def dedupe_key(url: str) -> str:
+    """
+    canonical_url() without the scheme, a leading "www." and a trailing
+    slash, so spellings of one URL collide. Never navigated.
+    """
+    parts = urllib.parse.urlsplit(canonical_url(url))
+    host = parts.netloc[len("www."):] if parts.netloc.startswith("www.") else parts.netloc
+    path = parts.path.rstrip("/") or "/"
+    return urllib.parse.urlunsplit(("", host, path, parts.query, "")).lstrip("/")
+
+def _hash64(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+def simhash(text: str, shingle: int = 3) -> int:
+    """64-bit SimHash over word shingles; near-identical texts differ in few bits."""
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < shingle:
+        tokens = words
+    else:
+        tokens = [" ".join(words[i:i + shingle]) for i in range(len(words) - shingle + 1)]
+    weights = [0] * BITS
+    for token in tokens:
+        value = _hash64(token)
+        for bit in range(BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(BITS) if weights[bit] > 0)
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+def _signed(value: int) -> int:
+    # SQLite integers are signed 64-bit.
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+def _bands(fingerprint: int) -> List[int]:
+    width = BITS // BANDS
+    return [fingerprint >> (band * width) & ((1 << width) - 1) for band in range(BANDS)]
+
+class FingerprintStore:
+    """
+    Persistent content fingerprints of visited sources, shared by all missions.
+
+    Each page is stored under its dedupe_key(), together with the key of its
+    rel=canonical link. A band index finds stored fingerprints within
+    MAX_DISTANCE bits of a given one without scanning the table. The database
+    is opened on first use.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = os.path.expanduser(path)
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path)
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS sources (
+                    key TEXT PRIMARY KEY,
+                    canonical TEXT NOT NULL,
+                    fingerprint INTEGER NOT NULL,
+                    url TEXT NOT NULL,
+                    updated REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS bands (
+                    band INTEGER NOT NULL,
+                    value INTEGER NOT NULL,
+                    key TEXT NOT NULL,
+                    PRIMARY KEY (band, value, key)
+                ) WITHOUT ROWID;
+            """)
+        return self._conn
+
+    def record(self, url: str, text: str, canonical: Optional[str] = None) -> int:
+        """Fingerprints a page's text and stores it under the URL (and its canonical link, if any)."""
+        fingerprint = simhash(text)
+        canonical_key = dedupe_key(canonical or url)
+        now = time.time()
+        with self.conn:
+            for key in {dedupe_key(url), canonical_key}:
+                self.conn.execute("DELETE FROM bands WHERE key = ?", (key,))
+                self.conn.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?)",
+                                  (key, canonical_key, _signed(fingerprint), url, now))
+                self.conn.executemany("INSERT OR IGNORE INTO bands VALUES (?, ?, ?)",
+                                      ((band, value, key) for band, value in enumerate(_bands(fingerprint))))
+        return fingerprint
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        """The stored canonical key and fingerprint for a URL, if it was visited before."""
+        row = self.conn.execute("SELECT canonical, fingerprint FROM sources WHERE key = ?",
+                                (dedupe_key(url),)).fetchone()
+        if row is None:
+            return None
+        return {"canonical": row[0], "fingerprint": row[1] & ((1 << 64) - 1)}
+
+    def near(self, fingerprint: int, max_distance: int = MAX_DISTANCE) -> List[str]:
+        """Keys of stored sources whose fingerprint is within max_distance bits."""
+        candidates = set()
+        for band, value in enumerate(_bands(fingerprint)):
+            candidates.update(key for (key,) in self.conn.execute(
+                "SELECT key FROM bands WHERE band = ? AND value = ?", (band, value)))
+        matches = []
+        for key in candidates:
+            row = self.conn.execute("SELECT fingerprint FROM sources WHERE key = ?", (key,)).fetchone()
+            if row and hamming(row[0] & ((1 << 64) - 1), fingerprint) <= max_distance:
+                matches.append(key)
+        return matches
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM sources").fetchone()[0]
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+class DedupeSession:
+    """
+    Duplicate tracking for one mission's sources.
+
+    check_url() runs before a source is opened and accepts it unless it
+    repeats a source accepted earlier in the session: the same dedupe key,
+    the same stored rel=canonical key, or a fingerprint from an earlier
+    visit within ``max_distance`` bits of one. check_content() runs after
+    the page was read and fingerprinted; a source that turns out to repeat
+    another accepted one is withdrawn, as should be one that failed to load.
+    Both return the URL of the accepted source a duplicate repeats, or None.
+    """
+
+    def __init__(self, store: FingerprintStore, max_distance: int = MAX_DISTANCE):
+        self.store = store
+        self.max_distance = max_distance
+        # Dedupe and canonical keys of accepted sources -> their URL.
+        self.accepted: Dict[str, str] = {}
+
+    def _keys(self, url: str) -> Tuple[Set[str], Optional[Dict]]:
+        keys = {dedupe_key(url)}
+        known = self.store.lookup(url)
+        if known is not None:
+            keys.add(known["canonical"])
+        return keys, known
+
+    def _duplicate_of(self, url: str) -> Optional[str]:
+        keys, known = self._keys(url)
+        candidates = list(keys)
+        if known is not None:
+            candidates += self.store.near(known["fingerprint"], self.max_distance)
+        for key in candidates:
+            original = self.accepted.get(key)
+            if original is not None and original != url:
+                return original
+        return None
+
+    def _accept(self, url: str):
+        for key in self._keys(url)[0]:
+            self.accepted.setdefault(key, url)
+
+    def withdraw(self, url: str):
+        """Forgets an accepted source, e.g. one that failed to load."""
+        for key in [key for key, accepted in self.accepted.items() if accepted == url]:
+            del self.accepted[key]
+
+    def check_url(self, url: str) -> Optional[str]:
+        duplicate = self._duplicate_of(url)
+        if duplicate is None:
+            self._accept(url)
+        return duplicate
+
+    def check_content(self, url: str) -> Optional[str]:
+        duplicate = self._duplicate_of(url)
+        if duplicate is None:
+            # The fresh fingerprint may have brought a new canonical key.
+            self._accept(url)
+        else:
+            self.withdraw(url)
+        return duplicate
+
+    def filter_urls(self, urls: Iterable[str]) -> List[Optional[str]]:
+        """check_url() for a batch, in order; a repeated URL is a duplicate of its first occurrence."""
+        seen: Set[str] = set()
+        results = []
+        for url in urls:
+            results.append(url if url in seen else self.check_url(url))
+            seen.add(url)
+        return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect source canonicalization and fingerprints.")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    canon_parser = sub.add_parser("canonical", help="Print the canonical form of URLs")
+    canon_parser.add_argument("urls", nargs="+")
+    lookup_parser = sub.add_parser("lookup", help="Show a URL's stored fingerprint and near duplicates")
+    lookup_parser.add_argument("url")
+    sub.add_parser("stats", help="Print the number of stored fingerprints")
+    args = parser.parse_args()
+
+    if args.command == "canonical":
+        for url in args.urls:
+            print(f"{url} -> {canonical_url(url)}")
+        return
+    store = FingerprintStore(args.store)
+    if args.command == "lookup":
+        known = store.lookup(args.url)
+        if known is None:
+            print(f"❌ {args.url} has no stored fingerprint")
+        else:
+            print(f"🔖 {known['fingerprint']:016x} (canonical {known['canonical']})")
+            for key in store.near(known["fingerprint"]):
+                print(f"   ≈ {key}")
+    else:
+        print(f"📊 {store.count()} fingerprints in {store.path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+import json
+import os
+
+from atomic_file import save_json, write_atomic
+
+def test_save_json_replaces_the_file(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_text("old")
+    save_json(str(path), {"a": [1, 2]})
+    assert json.loads(path.read_text()) == {"a": [1, 2]}
+    assert os.listdir(tmp_path) == ["data.json"]
+
+def test_write_atomic_applies_the_mode_on_creation(tmp_path):
+    path = tmp_path / "secret"
+    write_atomic(str(path), b"token", mode=0o600)
+    assert path.read_bytes() == b"token"
+    assert oct(os.stat(path).st_mode & 0o777) == "0o600"
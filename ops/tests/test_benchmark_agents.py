@@ -0,0 +1,50 @@
+import asyncio
+
+import benchmark_agents
+from page_cache import PageCache
+from rate_control import rate_controller
+from source_dedupe import FingerprintStore
+
+class FakeBrowser:
+    def __init__(self):
+        self.rate_control = rate_controller
+
+    async def start(self, **kwargs):
+        pass
+
+    async def close(self):
+        pass
+
+class FakeServer:
+    base_url = "http://127.0.0.1:1"
+    pages = 1
+
+def test_benchmark_levels_run_at_full_concurrency_without_rate_control(monkeypatch):
+    browser = FakeBrowser()
+    seen = {"controls": set(), "in_flight": 0, "peak": 0}
+
+    async def operation(i):
+        seen["controls"].add(browser.rate_control)
+        seen["in_flight"] += 1
+        seen["peak"] = max(seen["peak"], seen["in_flight"])
+        await asyncio.sleep(0.01)
+        seen["in_flight"] -= 1
+
+    monkeypatch.setattr(benchmark_agents, "get_browser_automator", lambda: browser)
+    monkeypatch.setattr(benchmark_agents, "build_operations", lambda base_url, pages: {"search": operation})
+    results = asyncio.run(benchmark_agents.run_benchmarks(["search"], [8], 16, FakeServer(), warmup=0))
+
+    assert seen["controls"] == {None}
+    assert seen["peak"] == 8
+    assert results[0]["errors"] == 0
+    # The shared controller is handed back once the run is over.
+    assert browser.rate_control is rate_controller
+
+def test_benchmark_agents_use_no_persistent_stores(monkeypatch):
+    def unexpected(*args, **kwargs):
+        raise AssertionError("persistent store opened")
+    monkeypatch.setattr(PageCache, "__init__", unexpected)
+    monkeypatch.setattr(FingerprintStore, "__init__", unexpected)
+    monkeypatch.setattr(benchmark_agents, "get_browser_automator", FakeBrowser)
+    operations = benchmark_agents.build_operations("http://127.0.0.1:1", 1)
+    assert set(operations) == set(benchmark_agents.OPERATIONS)
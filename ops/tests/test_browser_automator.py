@@ -0,0 +1,245 @@
+import argparse
+import asyncio
+
+import pytest
+
+import browser_automator
+from browser_automator import (PROFILES, BrowserAutomator, NavigationProfile, add_har_arguments, configure_har,
+                               get_profile)
+from metrics import metrics
+
+class FakePage:
+    def __init__(self, url="https://example.com/article"):
+        self._url = url
+        self.url_reads = 0
+
+    @property
+    def url(self):
+        self.url_reads += 1
+        return self._url
+
+    async def click(self, selector):
+        pass
+
+    async def fill(self, selector, text):
+        pass
+
+    async def inner_text(self, selector):
+        return "text"
+
+    async def evaluate(self, expression, arg=None):
+        return {"text": "content"}
+
+async def use_page(page):
+    automator = BrowserAutomator()
+    await automator.click("a", page=page)
+    await automator.type("input", "x", page=page)
+    await automator.extract_text("p", page=page)
+    await automator.evaluate("1", page=page)
+    await automator.extract_main_content(page=page)
+
+@pytest.fixture
+def metrics_enabled():
+    previous = metrics.enabled
+    yield metrics.enable
+    metrics.enable(previous)
+
+def test_page_host_is_not_read_while_metrics_are_disabled(metrics_enabled):
+    metrics_enabled(False)
+    page = FakePage()
+    asyncio.run(use_page(page))
+    assert page.url_reads == 0
+
+def test_page_host_tags_spans_while_metrics_are_enabled(metrics_enabled):
+    metrics_enabled(True)
+    page = FakePage()
+    asyncio.run(use_page(page))
+    assert page.url_reads == 5
+
+class FakeBrowser:
+    async def close(self):
+        pass
+
+class PoolPage:
+    def __init__(self):
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+
+def started_automator():
+    automator = BrowserAutomator()
+    automator.browser = FakeBrowser()
+    automator._reset_pool()
+
+    async def open_pool_page():
+        page = PoolPage()
+        automator._pool_pages.append(page)
+        return page
+    automator._open_pool_page = open_pool_page
+    return automator
+
+def test_closing_with_a_page_checked_out_keeps_the_callers_error():
+    automator = started_automator()
+
+    async def run():
+        async with automator.acquire_page() as page:
+            await automator.close()
+            raise ValueError("navigation failed")
+    with pytest.raises(ValueError, match="navigation failed"):
+        asyncio.run(run())
+
+def test_pages_checked_out_before_a_restart_are_not_returned_to_the_new_pool():
+    automator = started_automator()
+
+    async def run():
+        async with automator.acquire_page() as page:
+            await automator.close()
+            automator._reset_pool()
+        return page
+    page = asyncio.run(run())
+    assert automator._pool_idle.empty()
+    assert page.closed
+
+@pytest.fixture
+def shared_automator(monkeypatch):
+    automator = BrowserAutomator()
+    monkeypatch.setattr(browser_automator, "_browser_automator", automator)
+    return automator
+
+def har_parser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tabs", type=int, default=4)
+    add_har_arguments(parser)
+    return parser
+
+@pytest.mark.parametrize("argv, mode, strict", [
+    ([], None, False),
+    (["--record-har", "run.har"], "record", False),
+    (["--replay-har", "run.har", "--har-strict"], "replay", True),
+])
+def test_configure_har_applies_the_flags_to_the_shared_browser(shared_automator, argv, mode, strict):
+    options = har_parser().parse_args(argv)
+    configure_har(options)
+    assert vars(options) == {"tabs": 4}
+    assert shared_automator.har_mode == mode
+    assert shared_automator.har_path == ("run.har" if mode else None)
+    assert shared_automator.har_strict == strict
+
+def test_record_and_replay_flags_are_exclusive():
+    with pytest.raises(SystemExit):
+        har_parser().parse_args(["--record-har", "a.har", "--replay-har", "b.har"])
+
+def test_use_har_rejects_unknown_modes():
+    with pytest.raises(ValueError, match="Unknown HAR mode"):
+        BrowserAutomator().use_har("run.har", "rewrite")
+
+class HarContext:
+    def __init__(self, options):
+        self.options = options
+        self.routes = []
+
+    async def route_from_har(self, path, not_found):
+        self.routes.append((path, not_found))
+
+class HarBrowser:
+    async def new_context(self, **options):
+        return HarContext(options)
+
+@pytest.mark.parametrize("strict, not_found", [(False, "fallback"), (True, "abort")])
+def test_replaying_contexts_route_from_the_archive(strict, not_found):
+    automator = BrowserAutomator(isolated_contexts=True)
+    automator.browser = HarBrowser()
+    automator.use_har("run.har", "replay", strict=strict)
+    context = asyncio.run(automator.new_context())
+    assert context.routes == [("run.har", not_found)]
+    assert automator._isolating
+
+def test_recording_shares_one_context_with_record_options(tmp_path):
+    automator = BrowserAutomator(isolated_contexts=True)
+    automator.browser = HarBrowser()
+    path = str(tmp_path / "out" / "run.zip")
+    automator.use_har(path, "record")
+    context = asyncio.run(automator.new_context(**automator._record_options()))
+    assert context.options["record_har_path"] == path
+    assert context.options["record_har_content"] == "attach"
+    assert context.routes == []
+    assert (tmp_path / "out").is_dir()
+    assert not automator._isolating
+    automator.use_har(None)
+    assert automator._record_options() == {}
+
+def test_returned_pages_are_reused():
+    automator = started_automator()
+
+    async def run():
+        async with automator.acquire_page() as first:
+            pass
+        async with automator.acquire_page() as second:
+            pass
+        return first, second
+    first, second = asyncio.run(run())
+    assert first is second and not first.closed
+    assert automator._pool_idle.qsize() == 1
+
+def test_pages_checked_out_during_close_are_not_returned_to_the_pool():
+    automator = started_automator()
+    idle = automator._pool_idle
+
+    async def run():
+        async with automator.acquire_page() as page:
+            await automator.close()
+        return page
+    page = asyncio.run(run())
+    assert page.closed
+    assert idle.empty()
+    assert automator._pool_pages == []
+
+def test_text_profile_blocks_heavy_resources_and_trackers():
+    text = get_profile("text")
+    assert text.blocks("image", "https://example.com/a.png")
+    assert text.blocks("script", "https://www.googletagmanager.com/gtm.js")
+    assert not text.blocks("document", "https://example.com/article")
+    assert not text.blocks("script", "https://example.com/app.js")
+    assert not PROFILES["full"].blocks_requests
+
+def test_get_profile_accepts_names_instances_and_a_default():
+    custom = NavigationProfile(wait_until="commit")
+    assert get_profile(custom) is custom
+    assert get_profile(None, default="text") is PROFILES["text"]
+    with pytest.raises(KeyError):
+        get_profile("fast")
+
+class RoutedPage(FakePage):
+    def __init__(self):
+        super().__init__()
+        self.routes = []
+
+    async def route(self, pattern, handler):
+        self.routes.append(pattern)
+
+    async def unroute(self, pattern):
+        self.routes.remove(pattern)
+
+    async def goto(self, url, wait_until, timeout):
+        self.loaded = (url, wait_until, timeout)
+
+def test_navigate_routes_requests_only_while_the_profile_blocks():
+    automator = BrowserAutomator()
+    automator.rate_control = None
+    page = RoutedPage()
+
+    async def run():
+        await automator.navigate("https://example.com/a", page=page, profile="text")
+        assert page.routes == ["**/*"]
+        assert page.loaded == ("https://example.com/a", "domcontentloaded", 15000)
+        await automator.navigate("https://example.com/b", page=page, profile="text", timeout=500)
+        assert page.routes == ["**/*"]
+        assert page.loaded[2] == 500
+        await automator.navigate("https://example.com/c", page=page)
+        assert page.routes == []
+        assert page.loaded == ("https://example.com/c", "networkidle", None)
+    asyncio.run(run())
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+import browser_daemon
+
+@pytest.fixture
+def state_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(browser_daemon, "STATE_DIR", str(tmp_path))
+    monkeypatch.setattr(browser_daemon, "STATE_FILE", str(tmp_path / "browser_daemon.json"))
+    monkeypatch.setattr(browser_daemon, "LAST_USED_FILE", str(tmp_path / "browser_daemon.last_used"))
+    return tmp_path
+
+STATE = {"pid": 1, "browser_pid": 2, "port": 9333, "endpoint": "http://127.0.0.1:9333"}
+
+def test_write_and_read_state(state_dir):
+    assert browser_daemon.read_state() is None
+    browser_daemon.write_state(STATE)
+    assert browser_daemon.read_state() == STATE
+    assert not (state_dir / "browser_daemon.json.tmp").exists()
+
+@pytest.mark.parametrize("content", ['{"pid": 1, "port"', "[]", '{"pid": 1}'])
+def test_unreadable_state_counts_as_no_daemon(state_dir, content):
+    (state_dir / "browser_daemon.json").write_text(content)
+    assert browser_daemon.read_state() is None
+    assert browser_daemon.endpoint_if_running() is None
+
+def test_endpoint_requires_a_healthy_browser(state_dir, monkeypatch):
+    browser_daemon.write_state(STATE)
+    monkeypatch.setattr(browser_daemon, "health", lambda port: None)
+    assert browser_daemon.endpoint_if_running() is None
+    monkeypatch.setattr(browser_daemon, "health", lambda port: {"Browser": "Chrome"} if port == 9333 else None)
+    assert browser_daemon.endpoint_if_running() == "http://127.0.0.1:9333"
+
+def test_stop_clears_the_state_of_a_dead_daemon(state_dir, monkeypatch):
+    signalled = []
+
+    def kill(pid, sig):
+        signalled.append(pid)
+        raise ProcessLookupError(pid)
+    monkeypatch.setattr(browser_daemon.os, "kill", kill)
+    monkeypatch.setattr(browser_daemon, "health", lambda port: None)
+    assert not browser_daemon.stop_daemon()
+    browser_daemon.write_state(STATE)
+    assert browser_daemon.stop_daemon()
+    assert not os.path.exists(browser_daemon.STATE_FILE)
+    # No browser answers on the port, so browser_pid may belong to another process by now.
+    assert signalled == [STATE["pid"]]
+
+def test_stop_signals_the_orphaned_browser_only_while_it_answers(state_dir, monkeypatch):
+    signalled = []
+
+    def kill(pid, sig):
+        signalled.append(pid)
+        if pid == STATE["pid"]:
+            raise ProcessLookupError(pid)
+    monkeypatch.setattr(browser_daemon.os, "kill", kill)
+    monkeypatch.setattr(browser_daemon, "health", lambda port: {"Browser": "Chrome"} if port == 9333 else None)
+    browser_daemon.write_state(STATE)
+    assert browser_daemon.stop_daemon()
+    assert signalled == [STATE["pid"], STATE["browser_pid"]]
+    assert not os.path.exists(browser_daemon.STATE_FILE)
+
+def test_clear_state_ignores_a_missing_file(state_dir):
+    browser_daemon.clear_state()
+    browser_daemon.write_state(STATE)
+    browser_daemon.clear_state()
+    assert browser_daemon.read_state() is None
+
+def test_touch_resets_the_idle_clock(state_dir):
+    assert browser_daemon.seconds_since_use() == float("inf")
+    browser_daemon.touch()
+    assert browser_daemon.seconds_since_use() < 5
+    assert not browser_daemon.is_idle(9333, idle_timeout=60)
@@ -0,0 +1,50 @@
+import os
+import subprocess
+
+import fork_store
+from harvest_glaciereq import harvest_repo
+
+def git(path, *args):
+    subprocess.run(["git", "-C", str(path), "-c", "user.name=test", "-c", "user.email=test@example.com",
+                    "-c", "commit.gpgsign=false", *args], check=True, capture_output=True)
+
+def make_upstream(root):
+    path = root / "upstream"
+    path.mkdir()
+    git(path, "init", "-q")
+    (path / "README.md").write_text("glacier\n")
+    git(path, "add", "-A")
+    git(path, "commit", "-q", "-m", "init")
+    return path
+
+def fork(name, url="https://github.com/glaciereq/"):
+    return {"name": name, "url": url + name}
+
+def test_group_by_upstream_drops_small_groups():
+    repos = [fork("a"), fork("b"), fork("c"), fork("d")]
+    upstreams = {
+        repos[0]["url"]: {"full_name": "up/one", "clone_url": "u1"},
+        repos[1]["url"]: {"full_name": "up/one", "clone_url": "u1"},
+        repos[2]["url"]: {"full_name": "up/two", "clone_url": "u2"},
+    }
+    assert fork_store.group_by_upstream(repos, upstreams) == {"up/one": repos[:2]}
+    assert set(fork_store.group_by_upstream(repos, upstreams, min_group=1)) == {"up/one", "up/two"}
+
+def test_forks_borrow_from_the_shared_reference_until_dissociated(tmp_path):
+    upstream = make_upstream(tmp_path)
+    target = tmp_path / "repos"
+    reference = fork_store.ensure_reference(str(target), "up/repo", str(upstream))
+    assert reference["status"] == "ok"
+    assert reference["path"] == fork_store.reference_path(str(target), "up/repo")
+    assert fork_store.list_references(str(target)) == [reference["path"]]
+
+    result = harvest_repo({"name": "member", "url": str(upstream)}, str(target), reference=reference["path"])
+    assert result["status"] == "ok"
+    checkout = str(target / "member")
+    assert fork_store.borrowing_checkouts(str(target)) == [checkout]
+    assert fork_store.repack_reference(reference["path"])
+
+    assert fork_store.dissociate(checkout)
+    assert not os.path.exists(fork_store.alternates_file(checkout))
+    assert fork_store.borrowing_checkouts(str(target)) == []
+    git(checkout, "fsck", "--no-progress")
@@ -0,0 +1,93 @@
+import json
+import subprocess
+
+import pytest
+
+import harvest_glaciereq
+from harvest_glaciereq import MANIFEST_FILE, bulk_harvest, harvest_repo, load_results
+
+REPOS = [{"name": name, "url": f"https://github.com/glaciereq/{name}"} for name in ("alpha", "beta", "gamma")]
+
+@pytest.fixture
+def manifest(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / MANIFEST_FILE).write_text(json.dumps(REPOS))
+    return tmp_path
+
+def fake_harvest(failing, error):
+    def harvest_repo(repo, target_dir, *args):
+        if repo["name"] == failing:
+            raise error
+        return {"name": repo["name"], "url": repo["url"], "path": target_dir, "action": "clone",
+                "status": "ok", "duration": 0.0, "bytes": 0}
+    return harvest_repo
+
+def test_a_crashing_repo_is_recorded_as_failed(manifest, monkeypatch):
+    monkeypatch.setattr(harvest_glaciereq, "harvest_repo", fake_harvest("beta", OSError("disk full")))
+    results_file = str(manifest / "results.json")
+    bulk_harvest(workers=2, target_dir=str(manifest / "repos"), results_file=results_file)
+
+    results = load_results(results_file)
+    assert {name: r["status"] for name, r in results.items()} == {"alpha": "ok", "beta": "failed", "gamma": "ok"}
+    assert results["beta"]["error"] == "OSError: disk full"
+
+def test_results_are_saved_when_interrupted(manifest, monkeypatch):
+    monkeypatch.setattr(harvest_glaciereq, "harvest_repo", fake_harvest("gamma", KeyboardInterrupt()))
+    results_file = str(manifest / "results.json")
+    with pytest.raises(KeyboardInterrupt):
+        bulk_harvest(workers=1, target_dir=str(manifest / "repos"), results_file=results_file)
+
+    results = load_results(results_file)
+    assert {name: r["status"] for name, r in results.items()} == {"alpha": "ok", "beta": "ok"}
+
+def git(path, *args):
+    return subprocess.run(["git", "-C", str(path), "-c", "user.name=test", "-c", "user.email=test@example.com",
+                           "-c", "commit.gpgsign=false", *args], check=True, capture_output=True, text=True).stdout
+
+def commit(path, name, text):
+    (path / name).write_text(text)
+    git(path, "add", "-A")
+    git(path, "commit", "-q", "-m", f"update {name}")
+    return git(path, "rev-parse", "HEAD").strip()
+
+@pytest.fixture
+def upstream(tmp_path):
+    path = tmp_path / "upstream" / "alpha"
+    path.mkdir(parents=True)
+    git(path, "init", "-q")
+    commit(path, "a.txt", "one\n")
+    return path
+
+def test_fetch_fast_forwards_the_checkout(upstream, tmp_path):
+    target = tmp_path / "repos"
+    repo = {"name": "alpha", "url": str(upstream)}
+    cloned = harvest_repo(repo, str(target))
+    assert (cloned["action"], cloned["status"]) == ("clone", "ok")
+    assert cloned["bytes"] > 0
+
+    head = commit(upstream, "b.txt", "two\n")
+    updated = harvest_repo(repo, str(target))
+    assert (updated["action"], updated["status"]) == ("fetch", "ok")
+    assert "bytes" not in updated
+    assert git(target / "alpha", "rev-parse", "HEAD").strip() == head
+    assert (target / "alpha" / "b.txt").read_text() == "two\n"
+
+def test_diverged_checkout_is_reported_as_failed(upstream, tmp_path):
+    target = tmp_path / "repos"
+    repo = {"name": "alpha", "url": str(upstream)}
+    harvest_repo(repo, str(target))
+    local = commit(target / "alpha", "local.txt", "mine\n")
+    commit(upstream, "b.txt", "two\n")
+
+    result = harvest_repo(repo, str(target))
+    assert result["status"] == "failed"
+    assert result["error"].startswith("Cannot fast-forward")
+    assert git(target / "alpha", "rev-parse", "HEAD").strip() == local
+
+def test_skipped_checkouts_are_not_measured(upstream, tmp_path, monkeypatch):
+    target = tmp_path / "repos"
+    repo = {"name": "alpha", "url": str(upstream)}
+    harvest_repo(repo, str(target))
+    monkeypatch.setattr(harvest_glaciereq, "dir_size", lambda path: pytest.fail("checkout was walked"))
+    result = harvest_repo(repo, str(target), update=False)
+    assert (result["status"], "bytes" in result) == ("skipped", False)
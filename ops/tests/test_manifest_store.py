@@ -0,0 +1,114 @@
+import json
+import os
+
+import pytest
+
+import manifest_store
+from manifest_store import ManifestStore, QueryError, open_store
+from merge_manifest import create_manifest, save_manifest
+
+REPOS = [
+    {"node_id": "N1", "name": "alpha", "url": "https://github.com/glaciereq/alpha",
+     "description": "Glacier mass balance model", "fork": False, "language": "Python",
+     "pushed_at": "2026-09-01T00:00:00Z"},
+    {"node_id": "N2", "name": "beta", "url": "https://github.com/glaciereq/beta",
+     "description": "Ice core plotting", "fork": True, "language": "Python",
+     "pushed_at": "2026-03-01T00:00:00Z"},
+    {"node_id": "N3", "name": "gamma", "url": "https://github.com/glaciereq/gamma",
+     "description": "Glacier outlines", "fork": False, "language": "R",
+     "pushed_at": "2026-10-01T00:00:00Z"},
+]
+
+def names(records):
+    return [r["name"] for r in records]
+
+@pytest.fixture
+def store(tmp_path):
+    with ManifestStore(str(tmp_path / "store.db")) as store:
+        store.upsert(REPOS)
+        yield store
+
+def test_query_filters_combine(store):
+    assert names(store.query()) == ["alpha", "beta", "gamma"]
+    assert names(store.query(language="python")) == ["alpha", "beta"]
+    assert names(store.query(language="Python", fork=False)) == ["alpha"]
+    assert names(store.query(pushed_since="2026-08-01")) == ["alpha", "gamma"]
+    assert names(store.query(limit=2)) == ["alpha", "beta"]
+
+def test_query_full_text_search(store):
+    assert names(store.query(text="glacier")) == ["alpha", "gamma"]
+    assert names(store.query(text="glacier", language="R")) == ["gamma"]
+
+def test_full_text_index_follows_updates_and_deletes(store):
+    store.upsert([dict(REPOS[1], description="Glacier velocity")])
+    assert names(store.query(text="glacier")) == ["alpha", "beta", "gamma"]
+    store.delete(["N1"])
+    assert names(store.query(text="glacier")) == ["beta", "gamma"]
+    assert store.count() == 2
+
+def test_search_treats_names_as_literal_terms(store):
+    store.upsert([{"node_id": "N4", "name": "ice-flow", "url": "https://github.com/glaciereq/ice-flow",
+                   "description": "Uses os.path and AND"}])
+    assert names(store.query(text="ice-flow")) == ["ice-flow"]
+    assert names(store.query(text="os.path")) == ["ice-flow"]
+    assert names(store.query(text="AND")) == ["ice-flow"]
+    assert names(store.query(text='"unterminated')) == []
+    assert names(store.query(text="glac*")) == ["alpha", "gamma"]
+
+def test_blank_search_raises_query_error(store):
+    with pytest.raises(QueryError):
+        store.query(text="   ")
+
+def test_main_reports_blank_search_as_usage_error(tmp_path, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        manifest_store.main(["--store", str(tmp_path / "store.db"), "query", "--search", " "])
+    assert exit_info.value.code == 2
+    assert "empty search query" in capsys.readouterr().err
+
+def test_open_store_reimports_a_modified_manifest(tmp_path):
+    manifest = str(tmp_path / "manifest.json")
+    db = str(tmp_path / "store.db")
+    save_manifest(REPOS[:2], manifest)
+    with open_store(db, manifest) as store:
+        assert store.count() == 2
+
+    save_manifest(REPOS, manifest)
+    with open_store(db, manifest) as store:
+        assert names(store.query()) == ["alpha", "beta", "gamma"]
+
+def test_open_store_skips_import_of_an_unchanged_manifest(tmp_path, monkeypatch):
+    manifest = str(tmp_path / "manifest.json")
+    db = str(tmp_path / "store.db")
+    save_manifest(REPOS, manifest)
+    open_store(db, manifest).close()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("unchanged manifest was re-imported")
+    monkeypatch.setattr(ManifestStore, "import_json", fail)
+    with open_store(db, manifest) as store:
+        assert store.count() == 3
+
+def test_open_store_without_manifest_leaves_store_empty(tmp_path):
+    with open_store(str(tmp_path / "store.db"), str(tmp_path / "missing.json")) as store:
+        assert store.count() == 0
+
+def test_create_manifest_mirrors_changes_without_reimport(tmp_path, monkeypatch):
+    manifest = str(tmp_path / "manifest.json")
+    db = str(tmp_path / "store.db")
+    source = tmp_path / "repos.json"
+    api = [{"node_id": r["node_id"], "name": r["name"], "html_url": r["url"], "description": r["description"],
+            "updated_at": "2026-01-01T00:00:00Z", "pushed_at": r["pushed_at"]} for r in REPOS]
+    source.write_text(json.dumps(api[:2]))
+    create_manifest([str(source)], manifest, store_path=db)
+
+    source.write_text(json.dumps(api))
+    imports = []
+    original = ManifestStore.import_json
+    monkeypatch.setattr(ManifestStore, "import_json",
+                        lambda self, *args, **kwargs: imports.append(args) or original(self, *args, **kwargs))
+    create_manifest([str(source)], manifest, store_path=db)
+    assert imports == []
+    with open_store(db, manifest) as store:
+        assert names(store.query()) == ["alpha", "beta", "gamma"]
+    assert imports == []
+    assert os.path.exists(manifest)
@@ -0,0 +1,94 @@
+import asyncio
+import contextlib
+import json
+import os
+
+import master_orchestrator
+from master_orchestrator import build_report, latex_escape, mission_slug, run_batch_mission
+
+def test_latex_escape_makes_specials_literal():
+    assert latex_escape(r"R&D: 50% of $x_1 #1 {a} ~b^c \d") == (
+        r"R\&D: 50\% of \$x\_1 \#1 \{a\} \textasciitilde{}b\textasciicircum{}c \textbackslash{}d")
+
+def test_build_report_escapes_topic_titles_and_summaries():
+    report = build_report("C# & F#", [{"title": "100% _real_", "summary": "costs $5 ~ish"}])
+    assert r"Research Report: C\# \& F\#" in report
+    assert r"\subsection{100\% \_real\_}" in report
+    assert r"costs \$5 \textasciitilde{}ish" in report
+
+class FakeResearch:
+    def __init__(self, readable: bool):
+        self.readable = readable
+
+    async def search_cached(self, topic):
+        return [{"title": "Source", "url": "https://example.com/a"}]
+
+    async def summarize_results(self, results, slots=None):
+        for result in results:
+            if self.readable:
+                yield {**result, "summary": "Findings"}
+            else:
+                yield {**result, "error": "Timed out after 30.0s"}
+
+def run(tmp_path, monkeypatch, readable):
+    monkeypatch.setattr(master_orchestrator, "get_research_agent", lambda: FakeResearch(readable))
+    limits = {name: asyncio.Semaphore(1) for name in ("search", "analyze", "overleaf")}
+    return asyncio.run(run_batch_mission("topic", str(tmp_path), limits, 10, None))
+
+def test_unreadable_sources_are_not_checkpointed_so_a_rerun_retries_analysis(tmp_path, monkeypatch):
+    mission = run(tmp_path, monkeypatch, readable=False)
+    assert mission["status"] == "failed"
+    assert mission["error"].startswith("analyze:")
+    with open(os.path.join(tmp_path, mission_slug("topic") + ".json")) as f:
+        assert set(json.load(f)["phases"]) == {"search"}
+
+    mission = run(tmp_path, monkeypatch, readable=True)
+    assert mission["status"] == "complete"
+    assert os.path.exists(mission["phases"]["report"]["path"])
+
+class FakePool:
+    @contextlib.asynccontextmanager
+    async def acquire_page(self):
+        yield object()
+
+class FakeOverleaf:
+    def __init__(self, statuses):
+        self.browser = FakePool()
+        self.statuses = statuses
+        self.calls = []
+
+    async def login(self, email, password, page=None):
+        pass
+
+    async def create_project(self, name, page=None):
+        self.calls.append("create")
+        return "https://overleaf/p"
+
+    async def open_project(self, project_url, page=None):
+        self.calls.append(f"open {project_url}")
+
+    async def inject_latex(self, latex, page=None):
+        self.calls.append("inject")
+
+    async def compile_pdf(self, page=None):
+        self.calls.append("compile")
+        return {"status": self.statuses.pop(0)}
+
+def test_failed_compile_is_not_checkpointed_so_a_rerun_republishes_into_the_project(tmp_path, monkeypatch):
+    overleaf = FakeOverleaf(["failure", "failure", "success"])
+    monkeypatch.setattr(master_orchestrator, "get_research_agent", lambda: FakeResearch(True))
+    monkeypatch.setattr(master_orchestrator, "get_overleaf_agent", lambda: overleaf)
+    limits = {name: asyncio.Semaphore(1) for name in ("search", "analyze", "overleaf")}
+
+    mission = asyncio.run(run_batch_mission("topic", str(tmp_path), limits, 10, ("a@example.com", "pw")))
+    assert mission["status"] == "failed"
+    assert mission["error"].startswith("overleaf:")
+    assert "overleaf" not in mission["phases"]
+    with open(os.path.join(tmp_path, mission_slug("topic") + ".json")) as f:
+        assert json.load(f)["overleaf_project"] == {"project_url": "https://overleaf/p"}
+
+    for _ in range(2):
+        mission = asyncio.run(run_batch_mission("topic", str(tmp_path), limits, 10, ("a@example.com", "pw")))
+    assert mission["status"] == "complete"
+    assert mission["phases"]["overleaf"] == {"status": "success", "project_url": "https://overleaf/p"}
+    assert overleaf.calls == ["create", "inject", "compile"] + ["open https://overleaf/p", "inject", "compile"] * 2
@@ -0,0 +1,123 @@
+import json
+
+import pytest
+
+from merge_manifest import ManifestIndex, iter_json_array, merge_sources
+
+def write_json(path, data) -> str:
+    path.write_text(json.dumps(data))
+    return str(path)
+
+def api_record(node_id: str, name: str, updated_at: str = "2026-01-01T00:00:00Z") -> dict:
+    return {"node_id": node_id, "name": name, "html_url": f"https://github.com/glaciereq/{name}",
+            "description": name, "updated_at": updated_at, "pushed_at": updated_at}
+
+def test_iter_json_array_streams_elements_across_small_chunks(tmp_path):
+    items = [{"a": 1, "b": "x" * 40}, -4.5, 12345, "text", [1, 2], None]
+    path = write_json(tmp_path / "items.json", items)
+    assert list(iter_json_array(path, chunk_size=3)) == items
+
+def test_iter_json_array_empty_array(tmp_path):
+    path = tmp_path / "empty.json"
+    path.write_text(" [ ] ")
+    assert list(iter_json_array(str(path))) == []
+
+@pytest.mark.parametrize("content", ['[{"a": 1}, {"b": 2', '[{"a": 1}, ', '[1, 2'])
+def test_iter_json_array_raises_on_truncated_input(tmp_path, content):
+    path = tmp_path / "truncated.json"
+    path.write_text(content)
+    with pytest.raises(ValueError):
+        list(iter_json_array(str(path), chunk_size=4))
+
+@pytest.mark.parametrize("content", ["[1 2]", "[,,1]", "[1,,2]", "[1,]", "[,]", '[{"a": 1}{"b": 2}]'])
+def test_iter_json_array_rejects_malformed_separators(tmp_path, content):
+    path = tmp_path / "malformed.json"
+    path.write_text(content)
+    with pytest.raises(ValueError, match="malformed.json"):
+        list(iter_json_array(str(path), chunk_size=2))
+
+@pytest.mark.parametrize("content", ['[1]{"message": "x"}', "[1] [2]", "[]x"])
+def test_iter_json_array_rejects_trailing_data(tmp_path, content):
+    path = tmp_path / "trailing.json"
+    path.write_text(content)
+    with pytest.raises(ValueError, match="trailing.json"):
+        list(iter_json_array(str(path), chunk_size=2))
+
+def test_iter_json_array_rejects_non_array(tmp_path):
+    path = write_json(tmp_path / "object.json", {"a": 1})
+    with pytest.raises(ValueError):
+        list(iter_json_array(path))
+
+def test_manifest_index_upsert_reports_added_changed_unchanged():
+    index = ManifestIndex([])
+    assert index.upsert(api_record("N1", "one")) == ("N1", "added")
+    assert index.upsert(api_record("N1", "one")) == ("N1", "unchanged")
+    assert index.upsert(api_record("N1", "one", "2026-02-01T00:00:00Z")) == ("N1", "changed")
+    assert index.dirty == {"N1"}
+
+def test_manifest_index_upgrades_url_keyed_legacy_entries():
+    legacy = {"name": "one", "url": "https://github.com/glaciereq/one", "description": "one"}
+    index = ManifestIndex([legacy])
+    key, status = index.upsert(api_record("N1", "one"))
+    assert (key, status) == ("N1", "changed")
+    assert set(index.records) == {"N1"}
+    assert "https://github.com/glaciereq/one" in index.removed
+
+def test_manifest_index_upsert_keeps_listing_fields():
+    index = ManifestIndex([])
+    listing = {"name": "alpha", "url": "https://github.com/glaciereq/alpha", "description": "alpha",
+               "listed_at": "2026-01-01T00:00:00Z"}
+    index.update_listing(listing)
+    index.upsert(api_record("N1", "alpha", updated_at="2026-02-01T00:00:00Z"))
+    (record,) = index.values()
+    assert record["node_id"] == "N1" and record["listed_at"] == listing["listed_at"]
+    assert index.update_listing(listing)[1] == "unchanged"
+
+def test_manifest_index_update_listing_merges_by_url():
+    index = ManifestIndex([])
+    index.upsert(api_record("N1", "one"))
+    listing = {"name": "one", "url": "https://github.com/glaciereq/one", "description": "new"}
+    assert index.update_listing(listing) == ("N1", "changed")
+    assert index.records["N1"]["description"] == "new"
+    assert index.update_listing(listing) == ("N1", "unchanged")
+
+def test_merge_sources_prunes_repositories_missing_from_every_source(tmp_path):
+    index = ManifestIndex([])
+    index.upsert(api_record("N1", "one"))
+    index.upsert(api_record("N2", "two"))
+    source = write_json(tmp_path / "a.json", [api_record("N1", "one")])
+    counts = merge_sources(index, [source])
+    assert counts["removed"] == 1
+    assert set(index.records) == {"N1"}
+
+def test_merge_sources_does_not_prune_when_a_source_is_missing(tmp_path):
+    index = ManifestIndex([])
+    index.upsert(api_record("N1", "one"))
+    index.upsert(api_record("N2", "two"))
+    source = write_json(tmp_path / "a.json", [api_record("N1", "one")])
+    counts = merge_sources(index, [source, str(tmp_path / "missing.json")])
+    assert counts["removed"] == 0
+    assert set(index.records) == {"N1", "N2"}
+
+def test_merge_sources_does_not_prune_when_a_source_is_truncated(tmp_path):
+    index = ManifestIndex([])
+    index.upsert(api_record("N1", "one"))
+    index.upsert(api_record("N2", "two"))
+    source = tmp_path / "a.json"
+    source.write_text(json.dumps([api_record("N1", "one")])[:-1] + ', {"node_id": ')
+    counts = merge_sources(index, [str(source)])
+    assert counts["removed"] == 0
+    assert set(index.records) == {"N1", "N2"}
+
+def test_merge_sources_names_a_source_holding_an_api_error(tmp_path, capsys):
+    index = ManifestIndex([])
+    index.upsert(api_record("N1", "one"))
+    index.upsert(api_record("N2", "two"))
+    source = write_json(tmp_path / "a.json", [api_record("N1", "one")])
+    error = write_json(tmp_path / "repos_org.json", {"message": "Not Found", "status": "404"})
+    counts = merge_sources(index, [source, error])
+    assert counts["removed"] == 0
+    assert set(index.records) == {"N1", "N2"}
+    out = capsys.readouterr().out
+    assert f"Error reading {error}, skipping pruning" in out
+    assert '{"message": "Not Found", "status": "404"}' in out
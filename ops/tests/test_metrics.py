@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+from metrics import BUCKETS, Metrics, percentile
+
+@pytest.fixture
+def fresh(monkeypatch):
+    for name in ("UDC_METRICS", "UDC_METRICS_FILE", "UDC_METRICS_PORT"):
+        monkeypatch.delenv(name, raising=False)
+    m = Metrics()
+    m.enable()
+    return m
+
+def record(m, name, seconds, error=False, **tags):
+    m._record((name, tuple(sorted(tags.items()))), seconds, error)
+
+def test_snapshot_percentiles_over_known_samples(fresh):
+    for i in range(1, 101):
+        record(fresh, "fetch", i / 1000, error=i > 98, host="example.com")
+    (series,) = fresh.snapshot()
+    assert series["name"] == "fetch"
+    assert series["tags"] == {"host": "example.com"}
+    assert (series["count"], series["errors"]) == (100, 2)
+    assert (series["min"], series["max"]) == (0.001, 0.1)
+    assert series["mean"] == 0.0505
+    assert series["p50"] == 0.051
+    assert series["p95"] == 0.096
+
+def test_percentile_over_sorted_samples():
+    samples = [float(i) for i in range(1, 101)]
+    assert percentile(samples, 0.50) == 51.0
+    assert percentile(samples, 0.95) == 96.0
+    assert percentile([], 0.5) == 0.0
+
+def test_spans_record_errors(fresh):
+    with fresh.span("step"):
+        pass
+    with pytest.raises(ValueError):
+        with fresh.span("step"):
+            raise ValueError("boom")
+    with fresh.span("step") as span:
+        span.fail()
+    (series,) = fresh.snapshot()
+    assert series["tags"] == {"agent": "-"}
+    assert (series["count"], series["errors"]) == (3, 2)
+
+def test_prometheus_text_groups_each_family(fresh):
+    record(fresh, "page.fetch", 0.02, host='a"b')
+    record(fresh, "page.fetch", 0.3, error=True, host="c")
+    record(fresh, "other", 1.0)
+    lines = fresh.prometheus_text().splitlines()
+
+    assert lines.count("# TYPE udc_page_fetch_seconds histogram") == 1
+    assert lines.count("# TYPE udc_page_fetch_errors_total counter") == 1
+    assert 'udc_page_fetch_seconds_bucket{host="a\\"b",le="0.01"} 0' in lines
+    assert 'udc_page_fetch_seconds_bucket{host="a\\"b",le="0.025"} 1' in lines
+    assert 'udc_page_fetch_seconds_bucket{host="a\\"b",le="+Inf"} 1' in lines
+    assert 'udc_page_fetch_seconds_count{host="c"} 1' in lines
+    assert 'udc_page_fetch_errors_total{host="c"} 1' in lines
+    assert 'udc_other_seconds_bucket{le="1.0"} 1' in lines
+    assert "udc_other_seconds_sum{} 1.0" in lines
+    buckets = [line for line in lines if line.startswith('udc_page_fetch_seconds_bucket{host="c"')]
+    assert len(buckets) == len(BUCKETS) + 1
+    # Every sample of a family sits under its own TYPE line.
+    families = [line.split()[2] for line in lines if line.startswith("# TYPE")]
+    assert families == ["udc_other_seconds", "udc_other_errors_total",
+                        "udc_page_fetch_seconds", "udc_page_fetch_errors_total"]
+
+def test_export_json_writes_the_snapshot(fresh, tmp_path):
+    record(fresh, "fetch", 0.5)
+    path = tmp_path / "metrics.json"
+    fresh.export_json(str(path))
+    assert json.loads(path.read_text()) == fresh.snapshot()
+    assert not (tmp_path / "metrics.json.tmp").exists()
+
+def test_disabled_metrics_record_nothing(fresh):
+    fresh.enable(False)
+    with fresh.span("step"):
+        pass
+    assert fresh.snapshot() == []
+
+def test_importing_never_binds_the_metrics_port(monkeypatch):
+    monkeypatch.setenv("UDC_METRICS", "1")
+    monkeypatch.setenv("UDC_METRICS_PORT", "1")
+    m = Metrics()
+    assert m._server is None
+
+def test_start_from_env_logs_a_taken_port(monkeypatch, caplog):
+    import socket
+    taken = socket.socket()
+    taken.bind(("127.0.0.1", 0))
+    taken.listen()
+    monkeypatch.setenv("UDC_METRICS", "1")
+    monkeypatch.setenv("UDC_METRICS_PORT", str(taken.getsockname()[1]))
+    monkeypatch.delenv("UDC_METRICS_FILE", raising=False)
+    try:
+        m = Metrics()
+        m.start_from_env()
+    finally:
+        taken.close()
+    assert m._server is None
+    assert "Not serving metrics" in caplog.text
@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+import types
+
+import pytest
+
+import ops
+
+OPS_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ops.py")
+
+@pytest.fixture
+def fake_command(monkeypatch):
+    """Registers a `fake` command backed by an in-memory module that records its argv."""
+    calls = []
+    module = types.ModuleType("fake_job")
+    module.main = lambda argv=None: calls.append((sys.argv[0], argv))
+    monkeypatch.setitem(sys.modules, "fake_job", module)
+    monkeypatch.setitem(ops.COMMANDS, "fake", ("fake_job", "A fake job"))
+    monkeypatch.setattr(sys, "argv", ["ops.py"])
+    return calls
+
+def test_module_commands_get_the_remaining_arguments(fake_command):
+    ops.main(["fake", "--limit", "3", "extra"])
+    assert fake_command == [("ops.py fake", ["--limit", "3", "extra"])]
+
+def test_module_command_help_is_handled_by_the_module(fake_command):
+    ops.main(["fake", "--help"])
+    assert fake_command == [("ops.py fake", ["--help"])]
+
+def test_every_command_module_takes_argv():
+    for module_name, _help in ops.COMMANDS.values():
+        with open(os.path.join(os.path.dirname(OPS_SCRIPT), module_name + ".py")) as f:
+            assert "def main(argv" in f.read(), module_name
+
+def test_unknown_command_is_a_usage_error(capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        ops.main(["frobnicate"])
+    assert exit_info.value.code == 2
+    assert "invalid choice" in capsys.readouterr().err
+
+def test_startup_rejects_unknown_commands(capsys):
+    with pytest.raises(SystemExit):
+        ops.main(["startup", "frobnicate"])
+    assert "unknown commands: frobnicate" in capsys.readouterr().err
+
+def test_merge_does_not_import_the_browser_stack():
+    code = ("import sys, runpy; sys.argv = ['ops.py', 'merge', '--help']\n"
+            "try:\n    runpy.run_path(%r, run_name='__main__')\n"
+            "except SystemExit:\n    pass\n"
+            "print(sorted(m for m in ('browser_automator', 'browser_daemon', 'research_agent') if m in sys.modules))"
+            % OPS_SCRIPT)
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                          cwd=os.path.dirname(OPS_SCRIPT))
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip().splitlines()[-1] == "[]"
@@ -0,0 +1,215 @@
+import asyncio
+import contextlib
+
+from overleaf_agent import OverleafAgent
+
+STATE = {"cookies": [{"name": "session", "value": "s", "domain": ".overleaf.com", "path": "/"}],
+         "origins": [{"origin": "https://www.overleaf.com", "localStorage": [{"name": "theme", "value": "dark"}]}]}
+
+class FakeContext:
+    def __init__(self):
+        self.cookies = 0
+        self.init_scripts = []
+
+    async def add_cookies(self, cookies):
+        self.cookies += 1
+
+    async def add_init_script(self, script):
+        self.init_scripts.append(script)
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+
+def make_agent():
+    agent = OverleafAgent(sessions=object(), browser=object())
+
+    async def session_state(email, password=None, refresh=False):
+        return STATE
+    agent.session_state = session_state
+    return agent
+
+def test_login_installs_the_storage_script_once_per_context():
+    agent = make_agent()
+    shared, other = FakeContext(), FakeContext()
+
+    async def run():
+        for _ in range(3):
+            await agent.login("a@example.com", page=FakePage(shared))
+        await agent.login("a@example.com", page=FakePage(other))
+    asyncio.run(run())
+
+    assert shared.cookies == 3
+    assert len(shared.init_scripts) == 1
+    assert '"theme"' in shared.init_scripts[0]
+    assert len(other.init_scripts) == 1
+
+class FakeResponse:
+    status = 200
+
+class FakeHarPage:
+    def __init__(self, context):
+        self.context = context
+        self.url = ""
+        self.closed = False
+
+    async def goto(self, url):
+        self.context.visited.append(url)
+        self.url = url
+        return FakeResponse()
+
+    async def close(self):
+        self.closed = True
+
+class FakeHarContext(FakeContext):
+    def __init__(self):
+        super().__init__()
+        self.visited = []
+        self.closed = False
+
+    async def new_page(self):
+        return FakeHarPage(self)
+
+    async def close(self):
+        self.closed = True
+
+class FakeHarBrowser:
+    def __init__(self, har_mode):
+        self.har_mode = har_mode
+        self.context = FakeHarContext()
+        self.created = []
+        # API requests bypass the archive, so they must not be used.
+        self.playwright = None
+
+    async def new_context(self, **options):
+        context = FakeHarContext()
+        self.created.append((options, context))
+        return context
+
+def test_session_check_goes_through_the_recording_context():
+    browser = FakeHarBrowser("record")
+    agent = OverleafAgent(sessions=object(), browser=browser)
+    assert asyncio.run(agent._session_is_valid(STATE))
+    assert browser.context.visited == ["https://www.overleaf.com/project"]
+    assert browser.context.cookies == 1
+    assert not browser.context.closed
+    assert browser.created == []
+
+def test_session_check_replays_in_a_har_context():
+    browser = FakeHarBrowser("replay")
+    agent = OverleafAgent(sessions=object(), browser=browser)
+    assert asyncio.run(agent._session_is_valid(STATE))
+    ((options, context),) = browser.created
+    assert options == {"storage_state": STATE}
+    assert context.visited == ["https://www.overleaf.com/project"]
+    assert context.closed
+
+class FakeKeyboard:
+    def __init__(self):
+        self.pressed = []
+        self.inserted = []
+
+    async def press(self, key):
+        self.pressed.append(key)
+
+    async def insert_text(self, text):
+        self.inserted.append(text)
+
+class FakeCompileResponse:
+    def __init__(self, url, method="POST", data=None, ok=True, text=""):
+        self.url = url
+        self.request = type("Request", (), {"method": method})()
+        self.data = data
+        self.ok = ok
+        self._text = text
+
+    async def json(self):
+        if self.data is None:
+            raise ValueError("not JSON")
+        return self.data
+
+    async def text(self):
+        return self._text
+
+class FakeResponseInfo:
+    def __init__(self, response):
+        self.response = response
+
+    @property
+    async def value(self):
+        return self.response
+
+class FakeRequests:
+    def __init__(self, responses):
+        self.responses = responses
+        self.fetched = []
+
+    async def get(self, url):
+        self.fetched.append(url)
+        return self.responses[url]
+
+class FakeEditorPage:
+    def __init__(self, change=None, compile_response=None, files=None):
+        self.change = change
+        self.compile_response = compile_response
+        self.keyboard = FakeKeyboard()
+        self.request = FakeRequests(files or {})
+        self.matched = None
+
+    async def wait_for_selector(self, selector):
+        pass
+
+    async def evaluate(self, expression, arg=None):
+        return self.change
+
+    @contextlib.asynccontextmanager
+    async def expect_response(self, predicate, timeout):
+        yield FakeResponseInfo(self.compile_response)
+        self.matched = predicate(self.compile_response)
+
+class FakeClicker:
+    def __init__(self):
+        self.clicked = []
+
+    async def click(self, selector, page=None):
+        self.clicked.append(selector)
+
+def editor_agent():
+    return OverleafAgent(sessions=object(), browser=FakeClicker())
+
+def test_inject_latex_applies_the_diff_through_the_editor_api():
+    page = FakeEditorPage(change={"editor": "codemirror6", "from": 3, "removed": 1, "inserted": 4})
+    agent = editor_agent()
+    assert asyncio.run(agent.inject_latex("new", page=page))["editor"] == "codemirror6"
+    assert agent.browser.clicked == []
+    assert page.keyboard.inserted == []
+
+def test_inject_latex_falls_back_to_typing():
+    page = FakeEditorPage(change=None)
+    agent = editor_agent()
+    change = asyncio.run(agent.inject_latex("\\section{A}", page=page))
+    assert change == {"editor": "keyboard", "from": 0, "removed": None, "inserted": 11}
+    assert page.keyboard.pressed[-1] == "Backspace"
+    assert page.keyboard.inserted == ["\\section{A}"]
+
+def test_compile_pdf_reports_the_status_and_log():
+    response = FakeCompileResponse(
+        "https://www.overleaf.com/project/p1/compile?auto_compile=false",
+        data={"status": "success", "outputFiles": [{"path": "output.pdf", "url": "/build/output.pdf"},
+                                                   {"path": "output.log", "url": "/build/output.log"}]})
+    log_url = "https://www.overleaf.com/build/output.log"
+    page = FakeEditorPage(compile_response=response,
+                          files={log_url: FakeCompileResponse(log_url, "GET", text="Output written")})
+    agent = editor_agent()
+    result = asyncio.run(agent.compile_pdf(page=page))
+    assert page.matched
+    assert agent.browser.clicked == [".recompile-button"]
+    assert (result["status"], result["output_files"], result["log"]) == (
+        "success", ["output.pdf", "output.log"], "Output written")
+    assert page.request.fetched == [log_url]
+
+def test_compile_pdf_reports_an_unreadable_failed_answer_as_error():
+    response = FakeCompileResponse("https://www.overleaf.com/project/p1/compile", ok=False)
+    page = FakeEditorPage(compile_response=response)
+    result = asyncio.run(editor_agent().compile_pdf(page=page))
+    assert (result["status"], result["output_files"], result["log"]) == ("error", [], None)
@@ -0,0 +1,66 @@
+import pytest
+
+import page_cache
+from page_cache import PageCache, normalize_query, normalize_url
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(page_cache.time, "time", clock)
+    return clock
+
+def test_keys_ignore_irrelevant_url_and_query_differences():
+    assert normalize_url("HTTPS://Example.com:443/a?b=2&a=1#top") == "https://example.com/a?a=1&b=2"
+    assert normalize_url("http://example.com") == "http://example.com/"
+    assert normalize_url("http://example.com:8080/x") == "http://example.com:8080/x"
+    assert normalize_query("  Glacier   Retreat ") == "glacier retreat"
+    assert PageCache.page_key("https://example.com/a#x") == PageCache.page_key("https://EXAMPLE.com/a")
+
+def test_put_and_get_round_trip(tmp_path, clock):
+    cache = PageCache(str(tmp_path / "cache.db"))
+    cache.put("search:google:ice", [{"title": "Ice", "url": "https://example.com"}])
+    assert cache.get("search:google:ice") == [{"title": "Ice", "url": "https://example.com"}]
+    assert cache.get("missing") is None
+    info = cache.info()
+    assert (info["hits"], info["misses"], info["entries"]) == (1, 1, 1)
+    cache.close()
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = PageCache(str(tmp_path / "cache.db"), ttl=60)
+    cache.put("page:a", "summary")
+    clock.now += 59
+    assert cache.get("page:a") == "summary"
+    clock.now += 2
+    assert cache.get("page:a") is None
+    assert cache.stats["expired"] == 1
+    assert cache.info()["entries"] == 0
+    cache.close()
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    value = "x" * 100
+    probe = PageCache(str(tmp_path / "probe.db"))
+    probe.put("k", value)
+    entry_size = probe.info()["bytes"]
+    probe.close()
+
+    cache = PageCache(str(tmp_path / "cache.db"), max_bytes=entry_size * 2)
+    cache.put("page:a", value)
+    clock.now += 1
+    cache.put("page:b", value)
+    clock.now += 1
+    assert cache.get("page:a") == value  # a is now more recently used than b
+    clock.now += 1
+    cache.put("page:c", value)
+
+    assert cache.get("page:b") is None
+    assert cache.get("page:a") == value
+    assert cache.get("page:c") == value
+    assert cache.stats["evictions"] == 1
+    cache.close()
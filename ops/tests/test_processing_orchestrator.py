@@ -0,0 +1,220 @@
+import asyncio
+import http.server
+import json
+import threading
+
+import pytest
+
+import processing_orchestrator
+from fixture_server import FixtureServer
+from processing_orchestrator import ExecutionBackend, HTTPBridgeBackend, LocalProcessBackend, ProcessingOrchestrator
+
+real_sleep = asyncio.sleep
+
+async def no_wait(seconds):
+    await real_sleep(0)
+
+class FakeWorker:
+    def __init__(self):
+        self.killed = False
+
+    def kill(self):
+        self.killed = True
+
+def test_execution_backend_requires_execute():
+    with pytest.raises(TypeError):
+        ExecutionBackend()
+
+    class EchoBackend(ExecutionBackend):
+        name = "echo"
+
+        async def execute(self, code, timeout=None):
+            return processing_orchestrator.make_result("success", stdout=code, backend=self.name)
+
+    orchestrator = ProcessingOrchestrator()
+    orchestrator.register(EchoBackend())
+    result = asyncio.run(orchestrator.execute_code("hi", backend="echo"))
+    assert (result["status"], result["stdout"], result["backend"]) == ("success", "hi", "echo")
+
+def test_replace_retries_a_failed_spawn(monkeypatch):
+    monkeypatch.setattr(processing_orchestrator.asyncio, "sleep", no_wait)
+    backend = LocalProcessBackend(workers=1)
+    old, new = FakeWorker(), FakeWorker()
+    attempts = []
+
+    def spawn():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("Worker process failed to start")
+        backend._all.append(new)
+        return new
+    monkeypatch.setattr(backend, "_spawn", spawn)
+
+    async def run():
+        backend._idle = asyncio.Queue()
+        backend._all = [old]
+        await backend._replace(old)
+        return backend._idle.get_nowait()
+    assert asyncio.run(run()) is new
+    assert old.killed and len(attempts) == 2 and backend._all == [new]
+
+def test_start_stops_the_started_workers_when_one_fails(monkeypatch):
+    backend = LocalProcessBackend(workers=3)
+    started = []
+    lock = threading.Lock()
+
+    def spawn():
+        with lock:
+            if len(started) == 1:
+                started.append(None)
+                raise RuntimeError("Worker process failed to start")
+            worker = FakeWorker()
+            started.append(worker)
+            backend._all.append(worker)
+            return worker
+    monkeypatch.setattr(backend, "_spawn", spawn)
+
+    with pytest.raises(RuntimeError, match="failed to start"):
+        asyncio.run(backend.start())
+    workers = [worker for worker in started if worker is not None]
+    assert len(workers) == 2 and all(worker.killed for worker in workers)
+    assert backend._all == [] and backend._idle is None
+
+def test_failed_respawn_keeps_the_result_and_wakes_waiters(monkeypatch, caplog):
+    monkeypatch.setattr(processing_orchestrator.asyncio, "sleep", no_wait)
+    backend = LocalProcessBackend(workers=1)
+    worker = FakeWorker()
+    worker.run = lambda code, timeout: ("timeout", None)
+
+    def spawn():
+        raise RuntimeError("Worker process failed to start")
+    monkeypatch.setattr(backend, "_spawn", spawn)
+
+    async def run():
+        backend._idle = asyncio.Queue()
+        backend._idle.put_nowait(worker)
+        backend._all = [worker]
+        return await asyncio.wait_for(asyncio.gather(
+            backend.execute("while True: pass", timeout=1), backend.execute("print(1)"),
+            backend.execute("print(2)")), timeout=5)
+    timed_out, *waiting = asyncio.run(run())
+    assert timed_out["status"] == "timeout"
+    assert [result["status"] for result in waiting] == ["error", "error"]
+    assert "shrank to 0 of 1" in caplog.text
+    # The empty pool is restarted by the next execute() rather than waited on forever.
+    assert backend._idle is None
+
+def test_local_backend_runs_snippets_and_replaces_timed_out_workers():
+    backend = LocalProcessBackend(workers=1, preload=(), memory_limit_mb=None)
+
+    async def run():
+        try:
+            first = await backend.execute("print(sum(range(10)))")
+            timed_out = await backend.execute("while True: pass", timeout=0.5)
+            after = await backend.execute("print('still here')")
+            return first, timed_out, after
+        finally:
+            await backend.close()
+    first, timed_out, after = asyncio.run(run())
+    assert (first["status"], first["stdout"]) == ("success", "45\n")
+    assert timed_out["status"] == "timeout"
+    assert (after["status"], after["stdout"]) == ("success", "still here\n")
+
+class BridgeHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests = []
+    drop = False
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        BridgeHandler.requests.append(json.loads(body)["code"])
+        if BridgeHandler.drop:
+            # Disconnect after the request arrived, as if the bridge died mid-run.
+            self.close_connection = True
+            return
+        data = json.dumps({"status": "success", "stdout": "ok\n"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def bridge():
+    BridgeHandler.requests = []
+    BridgeHandler.drop = False
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), BridgeHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def bridge_backend(server):
+    return HTTPBridgeBackend(url=f"http://127.0.0.1:{server.server_address[1]}", timeout=5)
+
+def test_bridge_does_not_resend_a_delivered_request(bridge):
+    BridgeHandler.drop = True
+    result = asyncio.run(bridge_backend(bridge).execute("x = 1"))
+    assert result["status"] == "error"
+    assert BridgeHandler.requests == ["x = 1"]
+
+def test_bridge_replaces_a_connection_closed_while_idle(bridge, monkeypatch):
+    # The server drops kept-alive connections after 0.1s of idling.
+    monkeypatch.setattr(BridgeHandler, "timeout", 0.1)
+    backend = bridge_backend(bridge)
+
+    async def run():
+        first = await backend.execute("a = 1")
+        await asyncio.sleep(0.5)
+        second = await backend.execute("b = 2")
+        return first, second
+    first, second = asyncio.run(run())
+    assert (first["status"], second["status"]) == ("success", "success")
+    assert BridgeHandler.requests == ["a = 1", "b = 2"]
+
+@pytest.fixture
+def fixtures():
+    with FixtureServer(latency=0) as server:
+        yield server
+
+def failing_sends(backend, monkeypatch, reused_only):
+    """Makes sending fail on the connections _connect() hands out (only on reused ones if reused_only)."""
+    connect = backend._connect
+    attempts = []
+
+    def failing_connect(parts, timeout):
+        connection, reused = connect(parts, timeout)
+        attempts.append(reused)
+        if reused or not reused_only:
+            def request(*args, **kwargs):
+                raise BrokenPipeError("connection closed by the bridge")
+            connection.request = request
+        return connection, reused
+    monkeypatch.setattr(backend, "_connect", failing_connect)
+    return attempts
+
+def test_bridge_retries_a_failed_send_on_a_reused_connection(fixtures, monkeypatch):
+    backend = HTTPBridgeBackend(url=fixtures.base_url, timeout=5)
+
+    async def run():
+        first = await backend.execute("a = 1")
+        attempts = failing_sends(backend, monkeypatch, reused_only=True)
+        second = await backend.execute("b = 2")
+        return first, second, attempts
+    first, second, attempts = asyncio.run(run())
+    assert (first["status"], second["status"]) == ("success", "success")
+    assert attempts == [True, False]
+    assert fixtures.executed == ["a = 1", "b = 2"]
+
+def test_bridge_does_not_retry_a_failed_send_on_a_new_connection(fixtures, monkeypatch):
+    backend = HTTPBridgeBackend(url=fixtures.base_url, timeout=5)
+    attempts = failing_sends(backend, monkeypatch, reused_only=False)
+    result = asyncio.run(backend.execute("a = 1"))
+    assert result["status"] == "error"
+    assert "BrokenPipeError" in result["error"]
+    assert attempts == [False]
+    assert fixtures.executed == []
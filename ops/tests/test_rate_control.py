@@ -0,0 +1,175 @@
+import asyncio
+import email.message
+import io
+import json
+import time
+import urllib.error
+
+import pytest
+
+import fork_store
+from rate_control import (FATAL, RETRY, THROTTLE, CircuitOpenError, HostPolicy, RateController, RetryableError,
+                          classify)
+
+def http_error(code: int, headers=None) -> urllib.error.HTTPError:
+    message = email.message.Message()
+    for name, value in (headers or {}).items():
+        message[name] = value
+    return urllib.error.HTTPError("https://example.com", code, "error", message, io.BytesIO(b""))
+
+def fail(error: Exception):
+    def raise_error():
+        raise error
+    return raise_error
+
+@pytest.mark.parametrize("error, outcome", [
+    (RetryableError("slow down", throttle=True), THROTTLE),
+    (RetryableError("flaky"), RETRY),
+    (http_error(429), THROTTLE),
+    (http_error(503), THROTTLE),
+    (http_error(502), RETRY),
+    (http_error(404), FATAL),
+    (urllib.error.URLError("Name or service not known"), RETRY),
+    (TimeoutError(), THROTTLE),
+    (ConnectionResetError(), RETRY),
+    (ValueError("bad input"), FATAL),
+])
+def test_classify(error, outcome):
+    assert classify(error) == outcome
+
+def test_throttle_halves_limit_and_successes_grow_it_back():
+    controller = RateController(HostPolicy(initial=4, max_limit=5), max_retries=0)
+    with pytest.raises(RetryableError):
+        controller.call("h", fail(RetryableError("429", throttle=True)))
+    assert controller.snapshot()["h"]["limit"] == 2
+    for _ in range(3):
+        controller.call("h", lambda: None)
+    assert controller.snapshot()["h"]["limit"] == 3
+    for _ in range(50):
+        controller.call("h", lambda: None)
+    assert controller.snapshot()["h"]["limit"] == 5
+
+def test_call_retries_retryable_errors_but_not_fatal_ones():
+    controller = RateController(max_retries=3, base_delay=0.001)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionResetError()
+        return "ok"
+
+    assert controller.call("h", flaky) == "ok"
+    assert len(attempts) == 3
+
+    attempts.clear()
+    with pytest.raises(ValueError):
+        controller.call("h", lambda: attempts.append(1) or fail(ValueError())())
+    assert len(attempts) == 1
+
+def test_circuit_opens_after_consecutive_failures_and_closes_after_a_good_trial():
+    controller = RateController(HostPolicy(failure_threshold=2, open_seconds=60), max_retries=0)
+    for _ in range(2):
+        with pytest.raises(ConnectionResetError):
+            controller.call("h", fail(ConnectionResetError()))
+    assert controller.snapshot()["h"]["circuit"] == "open"
+    with pytest.raises(CircuitOpenError):
+        controller.call("h", lambda: None)
+    assert controller.call("other", lambda: "ok") == "ok"
+
+    controller._hosts["h"].open_until = 0
+    assert controller.call("h", lambda: "ok") == "ok"
+    assert controller.snapshot()["h"]["circuit"] == "closed"
+
+def test_backoff_honours_retry_after():
+    controller = RateController(base_delay=0.01)
+    assert controller.backoff(0, RetryableError("429", throttle=True, retry_after=5)) == 5
+    assert controller.backoff(10) <= controller.max_delay
+
+def test_backoff_caps_retry_after_at_max_delay():
+    controller = RateController(base_delay=0.01, max_delay=2)
+    assert controller.backoff(0, RetryableError("429", throttle=True, retry_after=3600)) == 2
+
+def test_call_async_respects_the_host_limit():
+    controller = RateController(HostPolicy(initial=1, max_limit=1), base_delay=0.001)
+    in_flight = []
+
+    async def work():
+        in_flight.append(controller.snapshot()["h"]["in_flight"])
+        await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(*(controller.call_async("h", work) for _ in range(3)))
+
+    asyncio.run(run())
+    assert in_flight == [1, 1, 1]
+
+@pytest.mark.parametrize("stderr, throttled", [
+    ("fatal: unable to access 'https://github.com/o/r/': The requested URL returned error: 429", True),
+    ("remote: API rate limit exceeded", True),
+    ("fatal: repository 'https://github.com/o/http-429-tools/' not found", False),
+    ("fatal: could not create work tree dir '/tmp/503/repo'", False),
+])
+def test_throttled_git_errors_match_only_http_status_messages(stderr, throttled):
+    assert bool(fork_store.THROTTLED_GIT_ERRORS.search(stderr)) == throttled
+    assert not fork_store.TRANSIENT_GIT_ERRORS.search("fatal: '/data/500/repo' does not exist")
+
+def test_rate_limit_wait_reads_github_headers():
+    assert fork_store.rate_limit_wait({"Retry-After": "7"}) == 7
+    reset = time.time() + 30
+    assert 25 < fork_store.rate_limit_wait({"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(reset)}) <= 30
+    assert fork_store.rate_limit_wait({"X-RateLimit-Remaining": "12"}) is None
+
+def test_fetch_source_retries_rate_limited_api_calls(monkeypatch):
+    controller = RateController(base_delay=0.001)
+    monkeypatch.setattr(fork_store, "rate_controller", controller)
+    answers = [
+        http_error(403, {"Retry-After": "0"}),
+        http_error(429, {"Retry-After": "0"}),
+        {"source": {"full_name": "up/repo", "clone_url": "https://github.com/up/repo.git"}},
+    ]
+
+    def urlopen(request, timeout):
+        answer = answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return io.BytesIO(json.dumps(answer).encode())
+
+    monkeypatch.setattr("urllib.request.urlopen", urlopen)
+    assert fork_store.fetch_source("me/repo") == {"full_name": "up/repo", "clone_url": "https://github.com/up/repo.git"}
+    assert not answers
+    assert controller.snapshot()[fork_store.API_HOST]["limit"] < HostPolicy().initial
+
+def test_fetch_source_gives_up_once_the_quota_is_used_up(monkeypatch):
+    monkeypatch.setattr(fork_store, "rate_controller", RateController(base_delay=0.001))
+    calls = []
+
+    def urlopen(request, timeout):
+        calls.append(request)
+        raise http_error(403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() + 3000)})
+
+    monkeypatch.setattr("urllib.request.urlopen", urlopen)
+    assert fork_store.fetch_source("me/repo") is None
+    assert len(calls) == 1
+
+def test_fetch_source_gives_up_on_fatal_errors(monkeypatch):
+    monkeypatch.setattr(fork_store, "rate_controller", RateController(base_delay=0.001))
+    calls = []
+
+    def urlopen(request, timeout):
+        calls.append(request)
+        raise http_error(404)
+
+    monkeypatch.setattr("urllib.request.urlopen", urlopen)
+    assert fork_store.fetch_source("me/missing") is None
+    assert len(calls) == 1
+
+def test_set_policy_keeps_requests_in_flight():
+    controller = RateController(HostPolicy(initial=2, max_limit=2))
+    with controller.slot("h"):
+        controller.set_policy("h", HostPolicy(initial=1, max_limit=1))
+        assert controller.snapshot()["h"]["in_flight"] == 1
+        assert controller.snapshot()["h"]["limit"] == 1
+    assert controller.snapshot()["h"]["in_flight"] == 0
+    with controller.slot("h"):
+        assert controller._try_acquire("h") is None
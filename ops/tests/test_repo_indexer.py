@@ -0,0 +1,97 @@
+import subprocess
+
+import pytest
+
+from repo_indexer import UNBORN_HEAD, RepoIndex, current_head, index_checkouts, read_head
+
+def git(path, *args):
+    subprocess.run(["git", "-C", str(path), "-c", "user.name=test", "-c", "user.email=test@example.com",
+                    "-c", "commit.gpgsign=false", *args], check=True, capture_output=True)
+
+def make_repo(root, name, files=None):
+    path = root / name
+    path.mkdir()
+    git(path, "init", "-q")
+    if files:
+        commit(path, files)
+    return path
+
+def commit(path, files):
+    for relative, text in files.items():
+        (path / relative).write_text(text)
+    git(path, "add", "-A")
+    git(path, "commit", "-q", "-m", "update")
+
+@pytest.fixture
+def checkouts(tmp_path):
+    root = tmp_path / "repos"
+    root.mkdir()
+    return root
+
+def test_read_head_resolves_loose_and_packed_refs(checkouts):
+    repo = make_repo(checkouts, "alpha", {"a.py": "print(1)\n"})
+    sha = subprocess.run(["git", "-C", str(repo), "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip()
+    assert read_head(str(repo)) == sha
+    git(repo, "pack-refs", "--all")
+    assert read_head(str(repo)) == sha
+
+def test_unborn_head_gets_a_sentinel(checkouts):
+    repo = make_repo(checkouts, "empty")
+    assert read_head(str(repo)) is None
+    assert current_head(str(repo)) == UNBORN_HEAD
+
+def test_index_checkouts_only_rewalks_changed_repos(checkouts, tmp_path):
+    db = str(tmp_path / "index.db")
+    alpha = make_repo(checkouts, "alpha", {"a.py": "def glacier_mass():\n    pass\n"})
+    make_repo(checkouts, "beta", {"b.py": "print('beta')\n"})
+    make_repo(checkouts, "empty")
+
+    counts = index_checkouts(str(checkouts), db, workers=1, fts=True)
+    assert (counts["indexed"], counts["unchanged"]) == (3, 0)
+
+    counts = index_checkouts(str(checkouts), db, workers=1)
+    assert (counts["indexed"], counts["unchanged"]) == (0, 3)
+
+    commit(alpha, {"a.py": "def ice_velocity():\n    pass\n"})
+    counts = index_checkouts(str(checkouts), db, workers=1)
+    assert (counts["indexed"], counts["unchanged"]) == (1, 2)
+
+    with RepoIndex(db) as index:
+        assert index.get("empty")["head"] == UNBORN_HEAD
+        # alpha keeps its full-text index and the old text is gone from it.
+        assert [hit["repo"] for hit in index.search("ice_velocity")] == ["alpha"]
+        assert index.search("glacier_mass") == []
+        assert [hit["path"] for hit in index.search("beta", repo="beta")] == ["b.py"]
+
+def test_removed_checkouts_leave_the_index(checkouts, tmp_path):
+    db = str(tmp_path / "index.db")
+    make_repo(checkouts, "alpha", {"a.py": "alpha_marker = 1\n"})
+    index_checkouts(str(checkouts), db, workers=1, fts=True)
+    subprocess.run(["rm", "-rf", str(checkouts / "alpha")], check=True)
+
+    counts = index_checkouts(str(checkouts), db, workers=1)
+    assert counts["removed"] == 1
+    with RepoIndex(db) as index:
+        assert index.get("alpha") is None
+        assert index.search("alpha_marker") == []
+        assert index.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0] == 0
+
+def test_store_replaces_a_repos_files(tmp_path):
+    inventory = {"name": "alpha", "path": "/x", "head": "abc", "files": 1, "bytes": 10,
+                 "languages": {}, "largest": [], "last_commit": None, "texts": [("a.py", "first_token")]}
+    with RepoIndex(str(tmp_path / "index.db")) as index:
+        index.store(inventory, fts=True)
+        index.store(dict(inventory, texts=[("a.py", "second_token")]), fts=True)
+        assert index.search("first_token") == []
+        assert [hit["snippet"] for hit in index.search("second_token")] == ["[second_token]"]
+
+@pytest.mark.parametrize("query", ["os.path", "foo-bar", 'say "hi"', "os.pa*"])
+def test_search_treats_code_as_literal_terms(tmp_path, query):
+    inventory = {"name": "alpha", "path": "/x", "head": "abc", "files": 1, "bytes": 10,
+                 "languages": {}, "largest": [], "last_commit": None,
+                 "texts": [("a.py", 'import os.path\nfoo-bar = say("hi")\n')]}
+    with RepoIndex(str(tmp_path / "index.db")) as index:
+        index.store(inventory, fts=True)
+        assert [hit["path"] for hit in index.search(query)] == ["a.py"]
+        assert index.search("os.environ") == []
+        assert index.search("   ") == []
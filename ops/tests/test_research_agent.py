@@ -0,0 +1,100 @@
+import asyncio
+
+from page_cache import PageCache
+from rate_control import RateController
+from research_agent import ResearchAgent
+from source_dedupe import FingerprintStore
+
+class FakeBrowser:
+    def __init__(self, texts):
+        self.texts = list(texts)
+        self.navigations = 0
+
+    async def navigate(self, url, page=None, profile=None):
+        self.navigations += 1
+
+    async def extract_main_content(self, page=None, max_chars=4000):
+        text = self.texts.pop(0)
+        return {"text": text[:max_chars], "truncated": len(text) > max_chars, "canonical": None}
+
+def make_agent(tmp_path, texts):
+    browser = FakeBrowser(texts)
+    agent = ResearchAgent(cache=PageCache(str(tmp_path / "cache.db")),
+                          fingerprints=FingerprintStore(str(tmp_path / "fingerprints.db")), browser=browser)
+    return agent, browser
+
+def test_summaries_are_cached(tmp_path):
+    agent, browser = make_agent(tmp_path, ["Glacier retreat accelerated in 2026."])
+    url = "https://example.com/glaciers"
+    assert asyncio.run(agent.summarize_page(url)) == "Glacier retreat accelerated in 2026."
+    assert asyncio.run(agent.summarize_page(url)) == "Glacier retreat accelerated in 2026."
+    assert browser.navigations == 1
+
+def test_long_text_is_cut_to_a_summary(tmp_path):
+    agent, _ = make_agent(tmp_path, ["x" * 1000])
+    summary = asyncio.run(agent.summarize_page("https://example.com/long"))
+    assert summary == "x" * agent.summary_chars + "..."
+
+def test_empty_extractions_are_not_cached_or_fingerprinted(tmp_path):
+    agent, browser = make_agent(tmp_path, ["", "Loaded on the second visit."])
+    url = "https://example.com/slow"
+    assert asyncio.run(agent.summarize_page(url)) == ""
+    assert agent.fingerprints.count() == 0
+    assert asyncio.run(agent.summarize_page(url)) == "Loaded on the second visit."
+    assert browser.navigations == 2
+
+def test_none_disables_cache_and_fingerprints(monkeypatch):
+    def unexpected(*args, **kwargs):
+        raise AssertionError("persistent store opened")
+    monkeypatch.setattr(PageCache, "__init__", unexpected)
+    monkeypatch.setattr(FingerprintStore, "__init__", unexpected)
+    browser = FakeBrowser(["Some text.", "Some text."])
+    agent = ResearchAgent(cache=None, fingerprints=None, browser=browser)
+    assert (agent.cache, agent.fingerprints) == (None, None)
+    asyncio.run(agent.summarize_page("https://example.com/a"))
+    asyncio.run(agent.summarize_page("https://example.com/a"))
+    assert browser.navigations == 2
+
+def test_search_cache_is_keyed_by_the_search_host(tmp_path):
+    agent, _ = make_agent(tmp_path, [])
+    agent.cache.put(agent._search_key("glaciers"), [{"title": "Real", "url": "https://example.com/real"}])
+    assert asyncio.run(agent.search_cached("glaciers"))[0]["title"] == "Real"
+
+    agent.search_url = "http://127.0.0.1:8765/search?q={query}"
+    assert agent.cache.get(agent._search_key("glaciers")) is None
+    agent.cache.put(agent._search_key("glaciers"), [{"title": "Fixture", "url": "http://127.0.0.1:8765/p/1"}])
+    assert asyncio.run(agent.search_cached("glaciers"))[0]["title"] == "Fixture"
+    assert agent._search_key("glaciers") == PageCache.search_key("127.0.0.1:8765", "glaciers")
+
+class SlowResultsPage:
+    def __init__(self, timeouts):
+        self.timeouts = timeouts
+        self.waits = 0
+
+    async def wait_for_selector(self, selector, timeout=None):
+        self.waits += 1
+        if self.waits <= self.timeouts:
+            raise TimeoutError(f"Timeout {timeout}ms exceeded")
+
+class SearchBrowser(FakeBrowser):
+    def __init__(self):
+        super().__init__([])
+        self.rate_control = RateController(base_delay=0.001)
+
+    async def evaluate(self, expression, page=None):
+        return [{"title": "Result", "url": "https://example.com/r"}]
+
+def test_search_reloads_a_slow_results_page():
+    browser = SearchBrowser()
+    agent = ResearchAgent(cache=None, fingerprints=None, browser=browser)
+    page = SlowResultsPage(timeouts=2)
+    assert asyncio.run(agent.search_google("glaciers", page=page)) == [{"title": "Result", "url": "https://example.com/r"}]
+    assert (page.waits, browser.navigations) == (3, 3)
+    assert browser.rate_control.snapshot() == {}
+
+def test_search_gives_up_after_result_attempts():
+    browser = SearchBrowser()
+    agent = ResearchAgent(cache=None, fingerprints=None, browser=browser)
+    page = SlowResultsPage(timeouts=10)
+    assert asyncio.run(agent.search_google("glaciers", page=page)) == []
+    assert (page.waits, browser.navigations) == (agent.result_attempts, agent.result_attempts)
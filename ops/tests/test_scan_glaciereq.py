@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+import pytest
+
+import scan_glaciereq
+from merge_manifest import MANIFEST_FILE
+
+PAGES = 4
+
+def listing(page_number, i):
+    name = f"repo-{page_number}-{i}"
+    return {"name": name, "url": f"https://github.com/glaciereq/{name}", "description": None,
+            "listed_at": f"2026-0{PAGES - page_number + 1}-01T00:00:00Z"}
+
+class FakeAutomator:
+    async def start(self, headless=False, pool_size=None):
+        pass
+
+    async def close(self):
+        pass
+
+@pytest.fixture
+def scanned(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(scan_glaciereq, "get_browser_automator", FakeAutomator)
+    requested = []
+
+    async def scan_page(org_url, page_number):
+        requested.append(page_number)
+        # Later pages answer later, so pages finish in order.
+        await asyncio.sleep(page_number * 0.01)
+        return {"repos": [listing(page_number, i) for i in range(2)], "pages": PAGES}
+    monkeypatch.setattr(scan_glaciereq, "scan_page", scan_page)
+    return tmp_path, requested
+
+def manifest_names(path):
+    return sorted(repo["name"] for repo in json.loads((path / MANIFEST_FILE).read_text()))
+
+def test_first_scan_reads_every_page(scanned):
+    path, requested = scanned
+    asyncio.run(scan_glaciereq.scan_repos(tabs=2))
+    assert sorted(requested) == [1, 2, 3, 4]
+    assert len(manifest_names(path)) == 2 * PAGES
+
+def test_rescan_stops_at_the_first_unchanged_page(scanned):
+    path, requested = scanned
+    (path / MANIFEST_FILE).write_text(json.dumps([listing(2, i) for i in range(2)]))
+    asyncio.run(scan_glaciereq.scan_repos(tabs=2))
+    # Page 1 is new, page 2 unchanged: pages 3 and 4 are not applied.
+    assert manifest_names(path) == sorted(listing(n, i)["name"] for n in (1, 2) for i in range(2))
+
+def test_unchanged_first_page_skips_the_rest(scanned):
+    path, requested = scanned
+    (path / MANIFEST_FILE).write_text(json.dumps([listing(1, i) for i in range(2)]))
+    asyncio.run(scan_glaciereq.scan_repos(tabs=2))
+    assert requested == [1]
+
+def test_full_scan_reads_past_unchanged_pages(scanned):
+    path, requested = scanned
+    (path / MANIFEST_FILE).write_text(json.dumps([listing(1, i) for i in range(2)]))
+    asyncio.run(scan_glaciereq.scan_repos(tabs=2, full=True))
+    assert sorted(requested) == [1, 2, 3, 4]
+    assert len(manifest_names(path)) == 2 * PAGES
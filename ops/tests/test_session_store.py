@@ -0,0 +1,97 @@
+import json
+import os
+import sys
+import types
+
+import pytest
+
+from overleaf_agent import restore_storage_script
+import session_store
+from session_store import (DEFAULT_KEY_FILE, DEFAULT_SESSION_DIR, KEY_ENV, KEYRING_SERVICE, KEYRING_USER,
+                           SessionStore)
+
+STATE = {"cookies": [{"name": "overleaf_session2", "value": "abc", "domain": ".overleaf.com"}],
+         "origins": [{"origin": "https://www.overleaf.com", "localStorage": [{"name": "editor", "value": "cm6"}]}]}
+
+class FakeFernet:
+    @staticmethod
+    def generate_key() -> bytes:
+        return b"generated-key"
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.delenv(KEY_ENV, raising=False)
+    monkeypatch.setattr(SessionStore, "_keyring", staticmethod(lambda: None))
+    return SessionStore(str(tmp_path / "sessions"), str(tmp_path / "session.key"))
+
+def test_round_trip_is_encrypted_at_rest(store):
+    pytest.importorskip("cryptography")
+    store.save("Me@Example.com", STATE)
+    with open(store.path_for("me@example.com"), "rb") as f:
+        assert b"overleaf_session2" not in f.read()
+    assert oct(os.stat(store.key_file).st_mode & 0o777) == "0o600"
+    assert SessionStore(store.directory, store.key_file).load("me@example.com") == STATE
+    store.delete("me@example.com")
+    assert store.load("me@example.com") is None
+
+def test_without_cryptography_nothing_is_written(store, monkeypatch):
+    monkeypatch.setitem(sys.modules, "cryptography", None)
+    monkeypatch.setitem(sys.modules, "cryptography.fernet", None)
+    assert not store.available
+    store.save("me@example.com", STATE)
+    assert not os.path.exists(store.directory)
+    assert store.load("me@example.com") is None
+
+def test_missing_cryptography_is_reported_once(tmp_path, monkeypatch, caplog):
+    monkeypatch.setitem(sys.modules, "cryptography", None)
+    monkeypatch.setitem(sys.modules, "cryptography.fernet", None)
+    monkeypatch.setattr(session_store, "_warned_missing_cryptography", False)
+    for name in ("a", "b"):
+        assert not SessionStore(str(tmp_path / name)).available
+    assert caplog.text.count("'cryptography' is not installed") == 1
+
+class StrictFernet(FakeFernet):
+    def __init__(self, key):
+        if len(key) != 44:
+            raise ValueError("Fernet key must be 32 url-safe base64-encoded bytes.")
+
+@pytest.mark.parametrize("key", [b"", b"truncated-key"])
+def test_a_corrupt_key_disables_persistence(store, key, monkeypatch, caplog):
+    monkeypatch.setitem(sys.modules, "cryptography", types.ModuleType("cryptography"))
+    monkeypatch.setitem(sys.modules, "cryptography.fernet", types.SimpleNamespace(Fernet=StrictFernet))
+    with open(store.key_file, "wb") as f:
+        f.write(key)
+    assert not store.available
+    assert "Unusable session key" in caplog.text
+    store.save("me@example.com", STATE)
+    assert store.load("me@example.com") is None
+    assert not os.path.exists(store.directory)
+
+def test_default_key_file_is_outside_the_session_cache():
+    cache = os.path.dirname(os.path.expanduser(DEFAULT_SESSION_DIR))
+    assert not os.path.expanduser(DEFAULT_KEY_FILE).startswith(cache + os.sep)
+
+def test_key_comes_from_env_before_keyring_and_file(store, monkeypatch):
+    monkeypatch.setenv(KEY_ENV, "env-key")
+    assert store._load_key(FakeFernet) == b"env-key"
+    assert not os.path.exists(store.key_file)
+
+def test_new_key_goes_to_the_keyring_when_available(store, monkeypatch):
+    saved = {}
+    keyring = types.SimpleNamespace(get_password=lambda service, user: saved.get((service, user)),
+                                    set_password=lambda service, user, value: saved.update({(service, user): value}))
+    monkeypatch.setattr(SessionStore, "_keyring", staticmethod(lambda: keyring))
+    assert store._load_key(FakeFernet) == b"generated-key"
+    assert saved == {(KEYRING_SERVICE, KEYRING_USER): "generated-key"}
+    assert not os.path.exists(store.key_file)
+
+def test_key_file_is_the_fallback(store):
+    assert store._load_key(FakeFernet) == b"generated-key"
+    with open(store.key_file, "rb") as f:
+        assert f.read() == b"generated-key"
+    assert oct(os.stat(store.key_file).st_mode & 0o777) == "0o600"
+
+def test_restore_storage_script_embeds_the_saved_origins():
+    script = restore_storage_script(STATE["origins"])
+    assert script.endswith("(" + json.dumps(STATE["origins"]) + ")")
+    assert "localStorage.setItem" in script
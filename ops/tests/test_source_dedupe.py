@@ -0,0 +1,111 @@
+import asyncio
+import random
+
+import pytest
+
+from research_agent import ResearchAgent
+from source_dedupe import MAX_DISTANCE, DedupeSession, FingerprintStore, canonical_url, dedupe_key, hamming, simhash
+
+def article(seed: int, words: int = 500) -> str:
+    rng = random.Random(seed)
+    return " ".join(f"w{rng.randrange(3000)}" for _ in range(words))
+
+@pytest.fixture
+def store(tmp_path):
+    store = FingerprintStore(str(tmp_path / "fingerprints.db"))
+    yield store
+    store.close()
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://Example.com/a?utm_source=x&id=3&fbclid=y#top", "https://example.com/a?id=3"),
+    ("https://example.com:443/a?b=2&a=1", "https://example.com/a?a=1&b=2"),
+    ("https://www.google.com/url?q=https://example.com/story%3Fgclid%3D1", "https://example.com/story"),
+    ("https://www.google.com/amp/s/example.com/news/story", "https://example.com/news/story"),
+    ("https://example-com.cdn.ampproject.org/c/s/example.com/news/story", "https://example.com/news/story"),
+])
+def test_canonical_url_unwraps_known_wrappers_and_tracking(url, expected):
+    assert canonical_url(url) == expected
+
+@pytest.mark.parametrize("url", [
+    "https://amp.dev/documentation/",
+    "https://example.com/news/amp/story",
+    "https://example.com/docs/",
+    "https://github.com/org/repo?ref=main",
+])
+def test_canonical_url_leaves_other_urls_alone(url):
+    assert canonical_url(url) == url
+
+@pytest.mark.parametrize("url", [
+    "https://notgoogle.com/url?q=https://example.com/story",
+    "https://www.notgoogle.com/amp/s/example.com/news/story",
+])
+def test_canonical_url_only_unwraps_google_hosts(url):
+    assert "notgoogle.com" in canonical_url(url)
+
+def test_dedupe_key_ignores_scheme_www_and_trailing_slash():
+    assert dedupe_key("http://www.example.com/docs/") == dedupe_key("https://example.com/docs") == "example.com/docs"
+    assert dedupe_key("https://example.com/") == "example.com/"
+    assert dedupe_key("https://example.com/a?id=1") != dedupe_key("https://example.com/a?id=2")
+
+def test_simhash_is_deterministic_and_separates_near_from_unrelated():
+    text = article(1)
+    assert simhash(text) == simhash(text)
+    assert simhash(text) == simhash(text.upper())
+    assert hamming(simhash(text), simhash(text + " subscribe today")) <= MAX_DISTANCE
+    assert hamming(simhash(text), simhash(article(2))) > 3 * MAX_DISTANCE
+
+def test_store_finds_near_fingerprints(store):
+    text = article(1)
+    fingerprint = store.record("https://a.com/story", text)
+    store.record("https://b.com/other", article(2))
+    assert store.lookup("http://www.a.com/story")["fingerprint"] == fingerprint
+    assert store.near(simhash(text + " footer")) == ["a.com/story"]
+
+def test_filter_urls_skips_near_duplicate_known_from_an_earlier_run(store):
+    text = article(1)
+    store.record("https://a.com/story", text)
+    store.record("https://mirror.org/copy", text + " republished with permission")
+    store.record("https://c.com/amp/story", article(3), canonical="https://c.com/story")
+    store.record("https://d.com/other", article(4))
+
+    session = DedupeSession(store)
+    assert session.filter_urls([
+        "https://a.com/story",
+        "https://mirror.org/copy",
+        "https://c.com/story",
+        "https://c.com/amp/story",
+        "https://d.com/other",
+        "http://www.d.com/other/",
+        "https://d.com/other",
+    ]) == [None, "https://a.com/story", None, "https://c.com/story", None,
+           "https://d.com/other", "https://d.com/other"]
+
+def test_check_content_withdraws_a_copy_found_after_reading(store):
+    session = DedupeSession(store)
+    assert session.filter_urls(["https://a.com/story", "https://mirror.org/copy"]) == [None, None]
+    store.record("https://a.com/story", article(1))
+    assert session.check_content("https://a.com/story") is None
+    store.record("https://mirror.org/copy", article(1) + " footer")
+    assert session.check_content("https://mirror.org/copy") == "https://a.com/story"
+    assert "mirror.org/copy" not in session.accepted
+
+def test_summarize_results_skips_known_mirror_before_navigation(store):
+    store.record("https://a.com/story", article(1))
+    store.record("https://mirror.org/copy", article(1) + " republished")
+    agent = ResearchAgent(cache=None, fingerprints=store, browser=object())
+    opened = []
+
+    async def summarize(result, page_timeout, refresh):
+        opened.append(result["url"])
+        return {**result, "summary": "text"}
+
+    agent._summarize_result = summarize
+
+    async def collect():
+        results = [{"title": "A", "url": "https://a.com/story"}, {"title": "B", "url": "https://mirror.org/copy"}]
+        return [source async for source in agent.summarize_results(results)]
+
+    sources = asyncio.run(collect())
+    assert opened == ["https://a.com/story"]
+    mirror = next(source for source in sources if source["url"] == "https://mirror.org/copy")
+    assert mirror["duplicate_of"] == "https://a.com/story" and "error" in mirror